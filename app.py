@@ -14,6 +14,8 @@ from routes.conversion_routes import conversion_bp
 from routes.api_routes import api_bp
 from utils.file_utils import allowed_file, get_file_extension, create_temp_directory
 from utils.feature_detector import FeatureDetector
+from utils.conversion_cache import get_conversion_cache
+from utils.workspace import request_workspace
 
 import config
 
@@ -194,100 +196,73 @@ def convert_file_route():
     else:
         output_filename = f"{original_filename}_copy.{output_format}"
     
-    # Save uploaded file to temp directory
-    input_path = os.path.join(app.config['TEMP_FOLDER'], f"temp_input.{input_format}")
-    output_path = os.path.join(app.config['TEMP_FOLDER'], f"temp_output.{output_format}")
-    
-    try:
-        # Save uploaded file
-        file.save(input_path)
-        
-        # Determine file type and use appropriate service
-        file_type = determine_file_type(input_format, output_format)
-        
-        try:
-            if file_type == 'audio':
-                # Convert audio file
-                logger.info(f"Converting audio from {input_format} to {output_format}")
-                audio_service.convert_audio(input_path, output_path)
-                operation = 'convert_audio'
-            elif file_type == 'image':
-                # Convert image file
-                logger.info(f"Converting image from {input_format} to {output_format}")
-                image_service.convert_image(input_path, output_path)
-                operation = 'convert_image'
-            elif file_type == 'document':
-                # Convert document
-                logger.info(f"Converting document from {input_format} to {output_format}")
-                document_service.convert_document(input_path, output_path)
-                operation = 'convert_document'
-            else:
-                return jsonify({'error': 'Unsupported conversion'}), 400
-        except ImportError as e:
-            # Handle missing dependencies errors
-            logger.error(f"Conversion error (missing dependencies): {str(e)}")
-            return jsonify({'error': f'This conversion is not available: {str(e)}'}), 500
-        
-        # Record conversion for logged in users
-        if current_user.is_authenticated:
-            conversion = Conversion(
-                user_id=current_user.id,
-                operation=operation,
-                input_filename=file.filename,
-                output_filename=output_filename
-            )
-            db.session.add(conversion)
-            db.session.commit()
-        
-        # Read the converted file
-        with open(output_path, 'rb') as f:
-            file_data = f.read()
-        
-        # Clean up files
+    # Each request converts in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_path = workspace.path_for(f"input.{input_format}")
+        output_path = workspace.path_for(f"output.{output_format}")
+            
         try:
-            os.remove(input_path)
-            os.remove(output_path)
+            # Save uploaded file
+            file.save(input_path)
+            
+            # Determine file type and use appropriate service
+            file_type = determine_file_type(input_format, output_format)
+            
+            # Identical uploads with identical options are served from the cache
+            cache = get_conversion_cache()
+            
+            try:
+                if file_type == 'audio':
+                    # Reject files that are not audio or are too long before converting
+                    admission_error = audio_service.get_admission_error(audio_service.probe_audio(input_path))
+                    if admission_error:
+                        return jsonify({'error': admission_error}), 400
+                    
+                    # Convert audio file
+                    logger.info(f"Converting audio from {input_format} to {output_format}")
+                    operation = 'convert_audio'
+                    cache.get_or_create(input_path, operation, {},
+                                        lambda: audio_service.convert_audio(input_path, output_path),
+                                        output_format, output_path)
+                elif file_type == 'image':
+                    # Convert image file
+                    logger.info(f"Converting image from {input_format} to {output_format}")
+                    operation = 'convert_image'
+                    cache.get_or_create(input_path, operation, {},
+                                        lambda: image_service.convert_image(input_path, output_path),
+                                        output_format, output_path)
+                elif file_type == 'document':
+                    # Convert document
+                    logger.info(f"Converting document from {input_format} to {output_format}")
+                    operation = 'convert_document'
+                    cache.get_or_create(input_path, operation, {},
+                                        lambda: document_service.convert_document(input_path, output_path),
+                                        output_format, output_path)
+                else:
+                    return jsonify({'error': 'Unsupported conversion'}), 400
+            except ImportError as e:
+                # Handle missing dependencies errors
+                logger.error(f"Conversion error (missing dependencies): {str(e)}")
+                return jsonify({'error': f'This conversion is not available: {str(e)}'}), 500
+            
+            # Record conversion for logged in users
+            if current_user.is_authenticated:
+                conversion = Conversion(
+                    user_id=current_user.id,
+                    operation=operation,
+                    input_filename=file.filename,
+                    output_filename=output_filename
+                )
+                db.session.add(conversion)
+                db.session.commit()
+            
+            # The workspace is removed once the output has been sent
+            return workspace.send_file(output_path, output_filename)
+            
         except Exception as e:
-            logger.error(f"Error cleaning up files: {str(e)}")
-        
-        # Determine MIME type
-        mime_type = mimetypes.guess_type(output_filename)[0]
-        if not mime_type:
-            if output_format in ['mp3', 'ogg', 'wav', 'flac', 'aac', 'm4a']:
-                mime_type = f'audio/{output_format}'
-            elif output_format in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-                mime_type = f'image/{output_format}'
-            elif output_format == 'pdf':
-                mime_type = 'application/pdf'
-            elif output_format == 'docx':
-                mime_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            elif output_format == 'txt':
-                mime_type = 'text/plain'
-            elif output_format == 'md':
-                mime_type = 'text/markdown'
-            elif output_format == 'html':
-                mime_type = 'text/html'
-        
-        # Send the response
-        response = make_response(file_data)
-        response.headers['Content-Type'] = mime_type or 'application/octet-stream'
-        response.headers['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-        return response
-        
-    except Exception as e:
-        logger.error(f"Conversion error: {str(e)}")
-        logger.error(traceback.format_exc())
-        
-        # Clean up files in case of error
-        try:
-            if os.path.exists(input_path):
-                os.remove(input_path)
-            if os.path.exists(output_path):
-                os.remove(output_path)
-        except Exception as cleanup_error:
-            logger.error(f"Error cleaning up files: {str(cleanup_error)}")
-        
-        return jsonify({'error': 'An error occurred during conversion. Please try again.'}), 500
+            logger.error(f"Conversion error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({'error': 'An error occurred during conversion. Please try again.'}), 500
 
 def determine_file_type(input_format, output_format):
     """Determine file type based on input and output formats."""
@@ -0,0 +1,96 @@
+# benchmarks/bench_audio_memory.py
+"""
+Compare peak memory of the pydub and streaming FFmpeg audio conversion paths.
+
+Usage:
+    python benchmarks/bench_audio_memory.py [--minutes 20] [--format mp3]
+
+Each case runs in a fresh subprocess. Peak RSS is reported for the Python
+process and for the largest FFmpeg child it started, since the streaming
+path moves the work into FFmpeg.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+OPTIONS = {'volume': 3, 'normalize': True, 'fade_in': 2.0, 'fade_out': 3.0, 'channels': 1, 'sample_rate': 22050}
+
+CASES = [
+    ('pydub (decode into memory)', 'pydub'),
+    ('ffmpeg filter graph', 'ffmpeg'),
+]
+
+def peak_rss_mb():
+    # VmHWM is per address space; ru_maxrss can carry over the parent's peak
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_case(case, input_path, output_path):
+    """Run one case in this process and return its timing and memory."""
+    from services.audio_service import AudioService
+
+    service = AudioService(temp_dir=os.path.dirname(output_path))
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+
+    if case == 'pydub':
+        service._convert_with_pydub(input_path, output_path, dict(OPTIONS))
+    else:
+        service.convert_audio(input_path, output_path, dict(OPTIONS))
+
+    return {
+        'seconds': time.perf_counter() - start,
+        'peak_mb': peak_rss_mb() - baseline,
+        'child_peak_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=20)
+    parser.add_argument('--format', default='mp3')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.input, args.output)))
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, 'source.wav')
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', f"sine=frequency=440:duration={args.minutes * 60}:sample_rate=44100",
+            '-ac', '2', input_path
+        ], check=True)
+
+        print(f"Source: {args.minutes:g} min stereo 44.1 kHz WAV ({os.path.getsize(input_path) / 1e6:.0f} MB), "
+              f"output: {args.format}")
+        print(f"{'case':<28}  {'time (s)':>9}  {'python peak (MB)':>17}  {'child peak (MB)':>16}")
+        for label, case in CASES:
+            output_path = os.path.join(work_dir, f'{case}.{args.format}')
+            output = subprocess.run(
+                [sys.executable, __file__, '--case', case, '--input', input_path, '--output', output_path],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:<28}  {result['seconds']:>9.2f}  {result['peak_mb']:>17.1f}  {result['child_peak_mb']:>16.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/bench_audio_segments.py
+"""
+Measure wall-clock time of segmented parallel audio encoding by worker count.
+
+Usage:
+    python benchmarks/bench_audio_segments.py [--minutes 30] [--format mp3] [--max-workers 8]
+
+One worker is the single-pass encode; each larger count splits the file into
+that many segments encoded by concurrent FFmpeg processes. The speedup is
+bounded by the number of CPU cores, so run it on the deployment hardware.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+from services.audio_service import AudioService
+
+OPTIONS = {'normalize': True, 'fade_in': 2.0, 'fade_out': 3.0}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=30)
+    parser.add_argument('--format', default='mp3')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    worker_counts = sorted({1, 2, 4, 8, args.max_workers} & set(range(1, args.max_workers + 1)))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, 'source.wav')
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', f"sine=frequency=440:duration={args.minutes * 60}:sample_rate=44100",
+            '-ac', '2', input_path
+        ], check=True)
+        service = AudioService(temp_dir=work_dir)
+
+        print(f"Source: {args.minutes:g} min stereo 44.1 kHz WAV, output: {args.format}, "
+              f"{os.cpu_count()} CPU cores")
+        print(f"{'workers':>7}  {'segments':>8}  {'time (s)':>9}  {'speedup':>7}")
+        baseline = None
+        for workers in worker_counts:
+            output_path = os.path.join(work_dir, f'output_{workers}.{args.format}')
+            with mock.patch.multiple(config.Config, AUDIO_SEGMENT_WORKERS=workers, AUDIO_SEGMENT_MIN_DURATION=0):
+                segments = service._plan_segments(input_path, output_path, OPTIONS) or []
+                start = time.perf_counter()
+                service.convert_audio(input_path, output_path, dict(OPTIONS))
+                seconds = time.perf_counter() - start
+
+            baseline = baseline or seconds
+            print(f"{workers:>7}  {len(segments) or 1:>8}  {seconds:>9.2f}  {baseline / seconds:>6.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_jpeg_draft.py
+"""
+Measure JPEG downscale time and peak memory with and without draft decoding.
+
+Usage:
+    python benchmarks/bench_jpeg_draft.py [--width 6000] [--height 4000]
+
+Each case runs in a fresh subprocess so its peak RSS is not polluted by the
+others. "full decode" forces the whole image to be decoded before resizing,
+which is what convert_image did before reduced-scale decoding.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CASES = [
+    ('resize 1024w, full decode', 'resize_full'),
+    ('resize 1024w, draft', 'resize_draft'),
+    ('thumbnail 200x200, full decode', 'thumbnail_full'),
+    ('thumbnail 200x200, draft', 'thumbnail_draft'),
+]
+
+def peak_rss_mb():
+    # VmHWM is per address space; ru_maxrss can carry over the parent's peak
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_case(case, input_path, output_dir):
+    """Run one case in this process and return its timing and memory."""
+    from PIL import Image
+    from services.image_service import ImageService
+
+    service = ImageService(temp_dir=output_dir)
+    output_path = os.path.join(output_dir, f'{case}.jpg')
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+
+    if case == 'resize_full':
+        img = Image.open(input_path)
+        img.load()
+        img = img.resize(service._get_resize_target(img.size, (1024, None)), Image.LANCZOS)
+        img.save(output_path, quality=95, optimize=True)
+    elif case == 'resize_draft':
+        service.convert_image(input_path, output_path, {'resize': (1024, None)})
+    elif case == 'thumbnail_full':
+        img = Image.open(input_path)
+        img.load()
+        img.thumbnail((200, 200), Image.LANCZOS)
+        img.save(output_path)
+    elif case == 'thumbnail_draft':
+        service.create_thumbnail(input_path, output_path, (200, 200))
+
+    return {'seconds': time.perf_counter() - start, 'peak_mb': peak_rss_mb() - baseline}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--width', type=int, default=6000)
+    parser.add_argument('--height', type=int, default=4000)
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    parser.add_argument('--output-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.input, args.output_dir)))
+        return
+
+    from PIL import Image
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, 'source.jpg')
+        Image.radial_gradient('L').resize((args.width, args.height)).convert('RGB').save(input_path, quality=90)
+
+        print(f"Source: {args.width}x{args.height} JPEG ({os.path.getsize(input_path) / 1e6:.1f} MB)")
+        print(f"{'case':<32}  {'time (s)':>9}  {'peak RSS (MB)':>14}")
+        for label, case in CASES:
+            output = subprocess.run(
+                [sys.executable, __file__, '--case', case, '--input', input_path, '--output-dir', work_dir],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{label:<32}  {result['seconds']:>9.3f}  {result['peak_mb']:>14.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_ocr_warm.py
+"""
+Measure per-page OCR latency on a scanned PDF with cold and warm workers.
+
+Usage:
+    python benchmarks/bench_ocr_warm.py [--pages 50] [--language eng+deu+fra] [--workers 4] [--runs 2]
+
+The cold run starts the OCR pool and loads the language models; later runs
+reuse both. The first page's latency is the wait before any text comes
+back. With tesserocr installed the workers keep each language's engine
+loaded; without it every page still starts a tesseract process and reloads
+the traineddata, so only the pool start is saved. The OCR cache is disabled
+so every page is recognized.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fitz  # PyMuPDF
+import config
+from services import ocr_service
+from services.ocr_service import OCRService, TESSEROCR_AVAILABLE
+from utils.ocr_cache import OCRCache
+
+WORDS = ['invoice', 'contract', 'payment', 'delivery', 'signature', 'address', 'account']
+
+def make_scan(path, pages):
+    """Write a PDF whose pages are only images of a few lines of text."""
+    source = fitz.open()
+    for number in range(pages):
+        page = source.new_page()
+        for line in range(20):
+            words = ' '.join(WORDS[(number + line + i) % len(WORDS)] for i in range(6))
+            page.insert_text((72, 90 + line * 32), words, fontsize=14)
+    scan = fitz.open()
+    for page in source:
+        scan.new_page().insert_image(page.rect, pixmap=page.get_pixmap(dpi=200, colorspace=fitz.csGRAY))
+    scan.save(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--language', default='eng')
+    parser.add_argument('--workers', type=int, default=config.Config.OCR_WORKERS)
+    parser.add_argument('--runs', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, 'scan.pdf')
+        make_scan(input_path, args.pages)
+        service = OCRService(temp_dir=work_dir, cache=OCRCache(work_dir, enabled=False))
+        if not service.has_tesseract:
+            sys.exit('Tesseract is not installed')
+
+        engine = 'tesserocr' if TESSEROCR_AVAILABLE else 'tesseract CLI (a process per page)'
+        print(f"Source: {args.pages}-page scan, language {args.language}, {args.workers} workers, "
+              f"engine: {engine}, {os.cpu_count()} CPU cores")
+        print(f"{'run':>5}  {'first page (s)':>14}  {'per page (ms)':>13}  {'total (s)':>9}")
+
+        ocr_service.shutdown_ocr_pool()
+        ocr_service._engines.__dict__.clear()
+        with mock.patch.object(config.Config, 'OCR_PRELOAD_LANGUAGES', [args.language]):
+            for run in range(args.runs):
+                start = time.perf_counter()
+                first_page = None
+                pages = service._recognize_pages(input_path, list(range(args.pages)), args.language, args.workers)
+                for _ in pages:
+                    first_page = first_page or time.perf_counter() - start
+                seconds = time.perf_counter() - start
+
+                label = 'cold' if run == 0 else 'warm'
+                print(f"{label:>5}  {first_page:>14.2f}  {seconds / args.pages * 1000:>13.1f}  {seconds:>9.2f}")
+        ocr_service.shutdown_ocr_pool()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_pdf_split.py
+"""
+Measure splitting a large PDF into many parts, PyPDF2 versus the split engine.
+
+Usage:
+    python benchmarks/bench_pdf_split.py [--pages 2000] [--ranges 100] [--max-workers 8]
+
+Every page of the generated document shows the same embedded font and logo
+image, as in a scanned or branded report. The PyPDF2 row is the previous
+implementation: one PdfWriter per range. The other rows are
+PDFService.iter_split_pdf by worker count. Total size shows whether shared
+objects were copied once per part or once per page; the speedup of more
+workers is bounded by the number of CPU cores.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fitz  # PyMuPDF
+from PyPDF2 import PdfReader, PdfWriter
+from services.pdf_service import PDFService
+
+def make_document(path, pages):
+    """Write a PDF whose pages share one font and one logo image."""
+    logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 400, 400), False)
+    for y in range(0, 400, 8):
+        for x in range(0, 400, 8):
+            logo.set_rect(fitz.IRect(x, y, x + 8, y + 8), ((x * 7) % 256, (y * 5) % 256, (x + y) % 256))
+    pdf = fitz.open()
+    logo_xref = 0
+    for number in range(pages):
+        page = pdf.new_page()
+        logo_xref = page.insert_image(fitz.Rect(36, 36, 136, 136), pixmap=logo, xref=logo_xref)
+        page.insert_text((72, 200), f'Quarterly report, page {number + 1}', fontname='tiro', fontsize=14)
+    pdf.save(path, garbage=1, deflate=True)
+
+def split_with_pypdf2(input_path, page_ranges, output_dir):
+    """The previous implementation: a fresh PdfWriter per range."""
+    reader = PdfReader(input_path)
+    paths = []
+    for index, page_range in enumerate(page_ranges):
+        start, end = map(int, page_range.split('-'))
+        writer = PdfWriter()
+        for page_num in range(start - 1, end):
+            writer.add_page(reader.pages[page_num])
+        path = os.path.join(output_dir, f'pypdf2_{index}.pdf')
+        with open(path, 'wb') as f:
+            writer.write(f)
+        paths.append(path)
+    return paths
+
+def measure(split):
+    start = time.perf_counter()
+    paths = list(split())
+    seconds = time.perf_counter() - start
+    size = sum(os.path.getsize(path) for path in paths)
+    for path in paths:
+        os.remove(path)
+    return seconds, size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--ranges', type=int, default=100)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    worker_counts = sorted({1, 2, 4, 8, args.max_workers} & set(range(1, args.max_workers + 1)))
+    pages_per_range = args.pages // args.ranges
+    page_ranges = [f'{start + 1}-{start + pages_per_range}' for start in range(0, args.pages, pages_per_range)]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_path = os.path.join(work_dir, 'source.pdf')
+        make_document(input_path, args.pages)
+        service = PDFService(temp_dir=work_dir)
+
+        print(f"Source: {args.pages} pages, {os.path.getsize(input_path) / 1024:.0f} KB, split into "
+              f"{len(page_ranges)} ranges, {os.cpu_count()} CPU cores")
+        print(f"{'engine':>12}  {'time (s)':>9}  {'total size (KB)':>15}")
+
+        seconds, size = measure(lambda: split_with_pypdf2(input_path, page_ranges, work_dir))
+        print(f"{'PyPDF2':>12}  {seconds:>9.2f}  {size / 1024:>15.0f}")
+        for workers in worker_counts:
+            seconds, size = measure(lambda: service.iter_split_pdf(input_path, page_ranges, workers=workers))
+            print(f"{f'{workers} workers':>12}  {seconds:>9.2f}  {size / 1024:>15.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/bench_sepia.py
+"""
+Compare the lookup-table sepia filter against the old per-pixel loop.
+
+Usage:
+    python benchmarks/bench_sepia.py [--sizes 1,12,48] [--legacy-limit 12]
+
+The per-pixel loop is linear in the pixel count, so above --legacy-limit
+megapixels it is timed on a horizontal strip and scaled up (marked "est.").
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageOps
+from services.image_service import ImageService
+
+def legacy_sepia(img):
+    """The original getpixel/putpixel implementation."""
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    gray = ImageOps.grayscale(img)
+    result = Image.new('RGB', gray.size)
+    for x in range(gray.width):
+        for y in range(gray.height):
+            gray_px = gray.getpixel((x, y))
+            r = min(255, int(gray_px * 1.07))
+            g = min(255, int(gray_px * 0.74))
+            b = min(255, int(gray_px * 0.43))
+            result.putpixel((x, y), (r, g, b))
+    return result
+
+def make_image(megapixels):
+    """Build a 4:3 RGB test image with a gradient-like pattern."""
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(megapixels * 1_000_000 / width)
+    return Image.radial_gradient('L').resize((width, height)).convert('RGB')
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1,12,48', help='Comma separated sizes in megapixels')
+    parser.add_argument('--legacy-limit', type=float, default=12,
+                        help='Largest size (MP) the per-pixel loop is run on in full')
+    args = parser.parse_args()
+
+    service = ImageService(temp_dir=os.path.join('temp', 'bench'))
+
+    print(f"{'size':>6}  {'legacy (s)':>14}  {'lut (s)':>9}  {'speedup':>9}")
+    for megapixels in [float(size) for size in args.sizes.split(',')]:
+        img = make_image(megapixels)
+
+        new_seconds = time_call(service._apply_sepia, img)
+
+        if megapixels <= args.legacy_limit:
+            legacy_seconds = time_call(legacy_sepia, img)
+            legacy_label = f"{legacy_seconds:.2f}"
+        else:
+            strip_height = max(1, int(img.height * args.legacy_limit / megapixels))
+            strip = img.crop((0, 0, img.width, strip_height))
+            legacy_seconds = time_call(legacy_sepia, strip) * img.height / strip_height
+            legacy_label = f"{legacy_seconds:.2f} est."
+
+        print(f"{megapixels:>4g}MP  {legacy_label:>14}  {new_seconds:>9.3f}  "
+              f"{legacy_seconds / new_seconds:>8.0f}x")
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,7 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'replace_with_your_super_secret_key')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     TEMP_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp')
+    WORKSPACE_ROOT = os.environ.get('WORKSPACE_ROOT')  # Per-request workspaces, e.g. on tmpfs; defaults to TEMP_FOLDER
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max upload size
     
     # File format settings
@@ -34,6 +35,50 @@ class Config:
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
 
+    # Background task settings
+    TASK_PROCESS_WORKERS = int(os.environ.get('TASK_PROCESS_WORKERS', os.cpu_count() or 1))
+    TASK_THREAD_WORKERS = int(os.environ.get('TASK_THREAD_WORKERS', 4))
+    IMAGE_BATCH_WORKERS = int(os.environ.get('IMAGE_BATCH_WORKERS', os.cpu_count() or 1))
+
+    # Large image settings
+    IMAGE_MEMORY_LIMIT = int(os.environ.get('IMAGE_MEMORY_LIMIT', 512 * 1024 * 1024))  # Above this, process in strips
+    IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 2 * 89478485))  # Reject images above this; can only lower Pillow's own limit (twice Image.MAX_IMAGE_PIXELS)
+
+    # External tools; a downloaded FFmpeg is looked for in FFMPEG_DIR after PATH
+    FFMPEG_DIR = os.environ.get('FFMPEG_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ffmpeg-static'))
+    CAPABILITY_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'capabilities.json')
+
+    # Audio settings
+    AUDIO_MAX_DURATION = float(os.environ.get('AUDIO_MAX_DURATION', 4 * 60 * 60))  # Seconds, 0 disables the limit
+    AUDIO_PROBE_WORKERS = int(os.environ.get('AUDIO_PROBE_WORKERS', 4))  # Concurrent probes for batches
+    AUDIO_PROBE_CACHE_SIZE = int(os.environ.get('AUDIO_PROBE_CACHE_SIZE', 512))  # Probe results kept in memory
+    AUDIO_SEGMENT_WORKERS = int(os.environ.get('AUDIO_SEGMENT_WORKERS', os.cpu_count() or 1))  # Parallel encodes per file
+    AUDIO_SEGMENT_MIN_DURATION = float(os.environ.get('AUDIO_SEGMENT_MIN_DURATION', 10 * 60))  # Seconds; shorter files use one encode
+    AUDIO_SEGMENT_MIN_LENGTH = float(os.environ.get('AUDIO_SEGMENT_MIN_LENGTH', 60))  # Seconds per segment, at least
+
+    # OCR settings
+    OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))  # Pages recognized in parallel
+    OCR_THREAD_LIMIT = int(os.environ.get('OCR_THREAD_LIMIT', 0))  # OpenMP threads per Tesseract; 0 shares the cores between workers
+    OCR_DPI = int(os.environ.get('OCR_DPI', 150))  # Resolution pages are rendered at for recognition
+    OCR_GRAYSCALE = os.environ.get('OCR_GRAYSCALE', 'true').lower() == 'true'  # A third of the data of RGB
+    OCR_MIN_TEXT_CHARS = int(os.environ.get('OCR_MIN_TEXT_CHARS', 50))  # Pages with this much text are not OCR'd
+    OCR_MIN_IMAGE_COVERAGE = float(os.environ.get('OCR_MIN_IMAGE_COVERAGE', 0.5))  # Share of a page images must cover to be OCR'd
+    OCR_PRELOAD_LANGUAGES = [lang for lang in os.environ.get('OCR_PRELOAD_LANGUAGES', 'eng').split(',') if lang]  # Models OCR workers load at start, e.g. 'eng,eng+deu+fra'
+    OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+    OCR_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'ocr')
+    OCR_CACHE_MAX_SIZE = int(os.environ.get('OCR_CACHE_MAX_SIZE', 256 * 1024 * 1024))  # 256MB of recognized pages
+
+    # PDF settings
+    PDF_WORKERS = int(os.environ.get('PDF_WORKERS', os.cpu_count() or 1))  # Processes of the pool shared by all PDF requests (page rendering, splitting)
+    PDF_IMAGE_MAX_DPI = int(os.environ.get('PDF_IMAGE_MAX_DPI', 600))
+    PDF_IMAGE_MAX_PIXELS = int(os.environ.get('PDF_IMAGE_MAX_PIXELS', 64 * 1024 * 1024))  # Per page; larger pages render at a lower DPI
+    PDF_WATERMARK_CACHE_SIZE = int(os.environ.get('PDF_WATERMARK_CACHE_SIZE', 64))  # Watermark overlays kept in memory
+
+    # Conversion result cache settings
+    CONVERSION_CACHE_ENABLED = os.environ.get('CONVERSION_CACHE_ENABLED', 'true').lower() == 'true'
+    CONVERSION_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'conversions')
+    CONVERSION_CACHE_MAX_SIZE = int(os.environ.get('CONVERSION_CACHE_MAX_SIZE', 1024 * 1024 * 1024))  # 1GB
+
 
 class DevelopmentConfig(Config):
     """Development configuration."""
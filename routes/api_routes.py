@@ -2,7 +2,7 @@
 import os
 import logging
 import json
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from models import db
@@ -12,6 +12,8 @@ from services.image_service import ImageService
 from services.document_service import DocumentService
 from services.pdf_service import PDFService
 from utils.file_utils import allowed_file, get_file_extension, save_uploaded_file
+from utils.conversion_cache import get_conversion_cache
+from utils.workspace import request_workspace
 import traceback
 import io
 
@@ -42,6 +44,11 @@ def api_info():
                 'method': 'POST',
                 'description': 'Convert a file from one format to another'
             },
+            {
+                'path': '/api/convert/multi',
+                'method': 'POST',
+                'description': 'Convert an audio file to several formats, returned as a ZIP file'
+            },
             {
                 'path': '/api/pdf/split',
                 'method': 'POST',
@@ -92,87 +99,192 @@ def api_convert():
     else:
         output_filename = f"{original_filename}.{output_format}"
     
-    # Create temp paths
-    temp_dir = current_app.config['TEMP_FOLDER']
-    input_path = os.path.join(temp_dir, f"api_input_{secure_filename(file.filename)}")
-    output_path = os.path.join(temp_dir, f"api_output_{secure_filename(output_filename)}")
-    
-    try:
-        # Save uploaded file
-        file.save(input_path)
-        
-        # Determine file type and convert
-        conversion_type = request.form.get('type') or determine_file_type(input_format, output_format)
+    # Each request works in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_path = workspace.path_for(f"input_{secure_filename(file.filename)}")
+        output_path = workspace.path_for(f"output_{secure_filename(output_filename)}")
         
-        if not conversion_type:
-            return jsonify({'error': 'Could not determine conversion type'}), 400
-        
-        if conversion_type == 'audio':
-            # Parse audio options
-            options = {}
-            if 'options' in request.form:
-                try:
-                    options = json.loads(request.form.get('options'))
-                except json.JSONDecodeError:
-                    pass
+        try:
+            # Save uploaded file
+            file.save(input_path)
             
-            # Convert audio
-            audio_service.convert_audio(input_path, output_path, options)
-            operation = 'convert_audio'
+            # Determine file type and convert
+            conversion_type = request.form.get('type') or determine_file_type(input_format, output_format)
             
-        elif conversion_type == 'image':
-            # Parse image options
-            options = {}
-            if 'options' in request.form:
+            if not conversion_type:
+                return jsonify({'error': 'Could not determine conversion type'}), 400
+            
+            cache = get_conversion_cache()
+            
+            if conversion_type == 'audio':
+                # Reject files that are not audio or are too long before converting
+                admission_error = audio_service.get_admission_error(audio_service.probe_audio(input_path))
+                if admission_error:
+                    return jsonify({'error': admission_error}), 400
+                
+                # Parse audio options
+                options = {}
+                if 'options' in request.form:
+                    try:
+                        options = json.loads(request.form.get('options'))
+                    except json.JSONDecodeError:
+                        pass
                 try:
-                    options = json.loads(request.form.get('options'))
-                except json.JSONDecodeError:
-                    pass
+                    options = audio_service.validate_options(options)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                
+                # Convert audio
+                operation = 'convert_audio'
+                cache.get_or_create(input_path, operation, options,
+                                    lambda: audio_service.convert_audio(input_path, output_path, options),
+                                    output_format, output_path)
+                
+            elif conversion_type == 'image':
+                # Parse image options
+                options = {}
+                if 'options' in request.form:
+                    try:
+                        options = json.loads(request.form.get('options'))
+                    except json.JSONDecodeError:
+                        pass
+                
+                # Convert image
+                operation = 'convert_image'
+                cache.get_or_create(input_path, operation, options,
+                                    lambda: image_service.convert_image(input_path, output_path, options),
+                                    output_format, output_path)
+                
+            elif conversion_type == 'document':
+                # Convert document
+                operation = 'convert_document'
+                cache.get_or_create(input_path, operation, {},
+                                    lambda: document_service.convert_document(input_path, output_path),
+                                    output_format, output_path)
+                
+            else:
+                return jsonify({'error': 'Unsupported conversion type'}), 400
             
-            # Convert image
-            image_service.convert_image(input_path, output_path, options)
-            operation = 'convert_image'
+            # Record conversion for authenticated users
+            if current_user.is_authenticated:
+                conversion = Conversion(
+                    user_id=current_user.id,
+                    operation=operation,
+                    input_filename=file.filename,
+                    output_filename=output_filename
+                )
+                db.session.add(conversion)
+                db.session.commit()
             
-        elif conversion_type == 'document':
-            # Convert document
-            document_service.convert_document(input_path, output_path)
-            operation = 'convert_document'
+            # Return the converted file; the workspace is removed once it has been sent
+            return workspace.send_file(output_path, output_filename)
             
-        else:
-            return jsonify({'error': 'Unsupported conversion type'}), 400
-        
-        # Record conversion for authenticated users
-        if current_user.is_authenticated:
-            conversion = Conversion(
-                user_id=current_user.id,
-                operation=operation,
-                input_filename=file.filename,
-                output_filename=output_filename
-            )
-            db.session.add(conversion)
-            db.session.commit()
-        
-        # Return the converted file
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=output_filename
-        )
-        
-    except Exception as e:
-        logger.error(f"API conversion error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500
-        
-    finally:
-        # Clean up files
+        except Exception as e:
+            logger.error(f"API conversion error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/convert/multi', methods=['POST'])
+def api_convert_multi():
+    """Convert an audio file to several formats at once and return them as a ZIP."""
+    # Check if file is present
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+
+    file = request.files['file']
+    if not file.filename:
+        return jsonify({'error': 'No selected file'}), 400
+
+    # Get output formats, e.g. "mp3,ogg,m4a"
+    output_formats = [f.strip().lower() for f in request.form.get('output_formats', '').split(',') if f.strip()]
+    output_formats = list(dict.fromkeys(output_formats))
+    if not output_formats:
+        return jsonify({'error': 'Output formats not specified'}), 400
+
+    audio_formats = current_app.config['ALLOWED_AUDIO_EXTENSIONS']
+    unsupported = [f for f in output_formats if f not in audio_formats]
+    if unsupported:
+        return jsonify({'error': f"Unsupported audio output formats: {', '.join(unsupported)}"}), 400
+
+    # Options shared by all outputs, and per-format options applied on top,
+    # e.g. {"mp3": {"bitrate": 128}}
+    try:
+        options = json.loads(request.form.get('options') or '{}')
+        format_options = json.loads(request.form.get('format_options') or '{}')
+    except json.JSONDecodeError:
+        return jsonify({'error': 'Invalid options format'}), 400
+    if not isinstance(options, dict) or not isinstance(format_options, dict):
+        return jsonify({'error': 'Options and format options must be objects'}), 400
+    invalid_formats = [f for f, value in format_options.items() if not isinstance(value, dict)]
+    if invalid_formats:
+        return jsonify({'error': f"Format options must be objects: {', '.join(invalid_formats)}"}), 400
+
+    try:
+        output_options_by_format = {
+            output_format: audio_service.validate_options(dict(options, **format_options.get(output_format, {})))
+            for output_format in output_formats
+        }
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    original_filename = os.path.splitext(file.filename)[0]
+    custom_filename = request.form.get('output_filename')
+    base_filename = custom_filename.strip() if custom_filename and custom_filename.strip() else original_filename
+
+    # Each request works in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_path = workspace.path_for(f"input_{secure_filename(file.filename)}")
+
         try:
-            if os.path.exists(input_path):
-                os.remove(input_path)
-            if os.path.exists(output_path):
-                os.remove(output_path)
+            # Save uploaded file
+            file.save(input_path)
+
+            # Reject files that are not audio or are too long before converting
+            admission_error = audio_service.get_admission_error(audio_service.probe_audio(input_path))
+            if admission_error:
+                return jsonify({'error': admission_error}), 400
+
+            # Outputs are cached like single conversions; only the misses are
+            # converted, together, with one decode of the input
+            cache = get_conversion_cache()
+            entries = []
+            pending = []
+            for output_format in output_formats:
+                output_options = output_options_by_format[output_format]
+                output_filename = f"{base_filename}.{output_format}"
+                output_path = workspace.path_for(f"output_{secure_filename(output_filename)}")
+
+                key, cached_path = cache.lookup(input_path, 'convert_audio', output_options, output_format, output_path)
+                if not cached_path:
+                    pending.append((key, output_format, output_path, output_options))
+                entries.append((output_filename, output_path))
+
+            if pending:
+                audio_service.convert_audio_multi(
+                    input_path, [(output_path, output_options) for _, _, output_path, output_options in pending]
+                )
+                for key, output_format, output_path, _ in pending:
+                    if key:
+                        cache.put(key, output_format, output_path)
+
+            # Record conversion for authenticated users
+            if current_user.is_authenticated:
+                conversion = Conversion(
+                    user_id=current_user.id,
+                    operation='convert_audio_multi',
+                    input_filename=file.filename,
+                    output_filename=f"{base_filename}.zip"
+                )
+                db.session.add(conversion)
+                db.session.commit()
+
+            # The workspace is removed once the response has been sent
+            return workspace.send_zip(entries, f"{base_filename}.zip")
+
         except Exception as e:
-            logger.error(f"Error cleaning up files: {str(e)}")
+            logger.error(f"API multi conversion error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/pdf/split', methods=['POST'])
 def api_pdf_split():
@@ -196,67 +308,41 @@ def api_pdf_split():
     except Exception:
         return jsonify({'error': 'Invalid page ranges format'}), 400
     
-    # Create temp paths
-    temp_dir = current_app.config['TEMP_FOLDER']
-    input_path = os.path.join(temp_dir, f"api_input_{secure_filename(file.filename)}")
-    
-    try:
-        # Save uploaded file
-        file.save(input_path)
-        
-        # Split PDF
-        output_paths = pdf_service.split_pdf(input_path, page_ranges)
-        
-        # Record conversion for authenticated users
-        if current_user.is_authenticated:
-            conversion = Conversion(
-                user_id=current_user.id,
-                operation='pdf_split',
-                input_filename=file.filename,
-                output_filename='split_pages.zip'
-            )
-            db.session.add(conversion)
-            db.session.commit()
+    # Each request works in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_path = workspace.path_for(f"input_{secure_filename(file.filename)}")
         
-        # Create ZIP file for multiple outputs
-        if len(output_paths) > 1:
-            import zipfile
-            zip_path = os.path.join(temp_dir, 'split_pages.zip')
-            with zipfile.ZipFile(zip_path, 'w') as zip_file:
-                for i, path in enumerate(output_paths):
-                    zip_file.write(path, f"split_part_{i+1}.pdf")
-            
-            # Return the ZIP file
-            return send_file(
-                zip_path,
-                as_attachment=True,
-                download_name='split_pages.zip'
-            )
-        else:
-            # Return the single file
-            return send_file(
-                output_paths[0],
-                as_attachment=True,
-                download_name='split.pdf'
-            )
-        
-    except Exception as e:
-        logger.error(f"API PDF split error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500
-        
-    finally:
-        # Clean up files
         try:
-            if os.path.exists(input_path):
-                os.remove(input_path)
-            for path in output_paths:
-                if os.path.exists(path):
-                    os.remove(path)
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
+            # Save uploaded file
+            file.save(input_path)
+            
+            # Split PDF; parts are produced lazily as the response is streamed
+            output_paths = pdf_service.iter_split_pdf(input_path, page_ranges)
+            
+            # Record conversion for authenticated users
+            if current_user.is_authenticated:
+                conversion = Conversion(
+                    user_id=current_user.id,
+                    operation='pdf_split',
+                    input_filename=file.filename,
+                    output_filename='split_pages.zip'
+                )
+                db.session.add(conversion)
+                db.session.commit()
+            
+            # The workspace is removed once the response has been sent
+            if len(page_ranges) > 1:
+                # Stream a ZIP file for multiple outputs
+                entries = ((f"split_part_{i+1}.pdf", path) for i, path in enumerate(output_paths))
+                return workspace.send_zip(entries, 'split_pages.zip')
+            else:
+                # Return the single file
+                return workspace.send_file(next(output_paths), 'split.pdf')
+            
         except Exception as e:
-            logger.error(f"Error cleaning up files: {str(e)}")
+            logger.error(f"API PDF split error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/pdf/merge', methods=['POST'])
 def api_pdf_merge():
@@ -269,62 +355,47 @@ def api_pdf_merge():
     if len(files) < 2:
         return jsonify({'error': 'At least two PDF files are required'}), 400
     
-    # Create temp directory
-    temp_dir = current_app.config['TEMP_FOLDER']
-    input_paths = []
-    
-    try:
-        # Save uploaded files
-        for file in files:
-            if file and file.filename.lower().endswith('.pdf'):
-                input_path = os.path.join(temp_dir, f"api_input_{secure_filename(file.filename)}")
-                file.save(input_path)
-                input_paths.append(input_path)
-        
-        if len(input_paths) < 2:
-            return jsonify({'error': 'At least two valid PDF files are required'}), 400
-        
-        # Get output filename
-        output_filename = request.form.get('output_filename', 'merged.pdf')
-        if not output_filename.lower().endswith('.pdf'):
-            output_filename += '.pdf'
-        
-        # Merge PDFs
-        output_path = pdf_service.merge_pdfs(input_paths)
+    # Each request works in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_paths = []
         
-        # Record conversion for authenticated users
-        if current_user.is_authenticated:
-            conversion = Conversion(
-                user_id=current_user.id,
-                operation='pdf_merge',
-                input_filename=','.join([f.filename for f in files]),
-                output_filename=output_filename
-            )
-            db.session.add(conversion)
-            db.session.commit()
-        
-        # Return the merged file
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=output_filename
-        )
-        
-    except Exception as e:
-        logger.error(f"API PDF merge error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500
-        
-    finally:
-        # Clean up files
         try:
-            for path in input_paths:
-                if os.path.exists(path):
-                    os.remove(path)
-            if os.path.exists(output_path):
-                os.remove(output_path)
+            # Save uploaded files
+            for index, file in enumerate(files):
+                if file and file.filename.lower().endswith('.pdf'):
+                    input_path = workspace.path_for(f"input_{index}_{secure_filename(file.filename)}")
+                    file.save(input_path)
+                    input_paths.append(input_path)
+            
+            if len(input_paths) < 2:
+                return jsonify({'error': 'At least two valid PDF files are required'}), 400
+            
+            # Get output filename
+            output_filename = request.form.get('output_filename', 'merged.pdf')
+            if not output_filename.lower().endswith('.pdf'):
+                output_filename += '.pdf'
+            
+            # Merge PDFs
+            output_path = pdf_service.merge_pdfs(input_paths)
+            
+            # Record conversion for authenticated users
+            if current_user.is_authenticated:
+                conversion = Conversion(
+                    user_id=current_user.id,
+                    operation='pdf_merge',
+                    input_filename=','.join([f.filename for f in files]),
+                    output_filename=output_filename
+                )
+                db.session.add(conversion)
+                db.session.commit()
+            
+            # Return the merged file; the workspace is removed once it has been sent
+            return workspace.send_file(output_path, output_filename)
+            
         except Exception as e:
-            logger.error(f"Error cleaning up files: {str(e)}")
+            logger.error(f"API PDF merge error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/pdf/compress', methods=['POST'])
 def api_pdf_compress():
@@ -342,54 +413,42 @@ def api_pdf_compress():
     if quality not in ['low', 'medium', 'high']:
         quality = 'medium'
     
-    # Create temp paths
-    temp_dir = current_app.config['TEMP_FOLDER']
-    input_path = os.path.join(temp_dir, f"api_input_{secure_filename(file.filename)}")
-    
-    try:
-        # Save uploaded file
-        file.save(input_path)
+    # Each request works in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_path = workspace.path_for(f"input_{secure_filename(file.filename)}")
         
-        # Compress PDF
-        output_path = pdf_service.compress_pdf(input_path, quality)
-        
-        # Get output filename
-        output_filename = request.form.get('output_filename', f"compressed_{os.path.basename(file.filename)}")
-        if not output_filename.lower().endswith('.pdf'):
-            output_filename += '.pdf'
-        
-        # Record conversion for authenticated users
-        if current_user.is_authenticated:
-            conversion = Conversion(
-                user_id=current_user.id,
-                operation='pdf_compress',
-                input_filename=file.filename,
-                output_filename=output_filename
-            )
-            db.session.add(conversion)
-            db.session.commit()
-        
-        # Return the compressed file
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=output_filename
-        )
-        
-    except Exception as e:
-        logger.error(f"API PDF compress error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500
-        
-    finally:
-        # Clean up files
         try:
-            if os.path.exists(input_path):
-                os.remove(input_path)
-            if os.path.exists(output_path):
-                os.remove(output_path)
+            # Save uploaded file
+            file.save(input_path)
+            
+            # Compress PDF
+            output_path = get_conversion_cache().get_or_create(
+                input_path, 'pdf_compress', {'quality': quality},
+                lambda: pdf_service.compress_pdf(input_path, quality), 'pdf')
+            
+            # Get output filename
+            output_filename = request.form.get('output_filename', f"compressed_{os.path.basename(file.filename)}")
+            if not output_filename.lower().endswith('.pdf'):
+                output_filename += '.pdf'
+            
+            # Record conversion for authenticated users
+            if current_user.is_authenticated:
+                conversion = Conversion(
+                    user_id=current_user.id,
+                    operation='pdf_compress',
+                    input_filename=file.filename,
+                    output_filename=output_filename
+                )
+                db.session.add(conversion)
+                db.session.commit()
+            
+            # Return the compressed file; the workspace is removed once it has been sent
+            return workspace.send_file(output_path, output_filename)
+            
         except Exception as e:
-            logger.error(f"Error cleaning up files: {str(e)}")
+            logger.error(f"API PDF compress error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({'error': str(e)}), 500
 
 @api_bp.route('/pdf/protect', methods=['POST'])
 def api_pdf_protect():
@@ -409,54 +468,40 @@ def api_pdf_protect():
     if not user_password:
         return jsonify({'error': 'User password is required'}), 400
     
-    # Create temp paths
-    temp_dir = current_app.config['TEMP_FOLDER']
-    input_path = os.path.join(temp_dir, f"api_input_{secure_filename(file.filename)}")
-    
-    try:
-        # Save uploaded file
-        file.save(input_path)
-        
-        # Protect PDF
-        output_path = pdf_service.add_password(input_path, user_password, owner_password)
-        
-        # Get output filename
-        output_filename = request.form.get('output_filename', f"protected_{os.path.basename(file.filename)}")
-        if not output_filename.lower().endswith('.pdf'):
-            output_filename += '.pdf'
-        
-        # Record conversion for authenticated users
-        if current_user.is_authenticated:
-            conversion = Conversion(
-                user_id=current_user.id,
-                operation='pdf_protect',
-                input_filename=file.filename,
-                output_filename=output_filename
-            )
-            db.session.add(conversion)
-            db.session.commit()
-        
-        # Return the protected file
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=output_filename
-        )
-        
-    except Exception as e:
-        logger.error(f"API PDF protect error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500
+    # Each request works in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_path = workspace.path_for(f"input_{secure_filename(file.filename)}")
         
-    finally:
-        # Clean up files
         try:
-            if os.path.exists(input_path):
-                os.remove(input_path)
-            if os.path.exists(output_path):
-                os.remove(output_path)
+            # Save uploaded file
+            file.save(input_path)
+            
+            # Protect PDF
+            output_path = pdf_service.add_password(input_path, user_password, owner_password)
+            
+            # Get output filename
+            output_filename = request.form.get('output_filename', f"protected_{os.path.basename(file.filename)}")
+            if not output_filename.lower().endswith('.pdf'):
+                output_filename += '.pdf'
+            
+            # Record conversion for authenticated users
+            if current_user.is_authenticated:
+                conversion = Conversion(
+                    user_id=current_user.id,
+                    operation='pdf_protect',
+                    input_filename=file.filename,
+                    output_filename=output_filename
+                )
+                db.session.add(conversion)
+                db.session.commit()
+            
+            # Return the protected file; the workspace is removed once it has been sent
+            return workspace.send_file(output_path, output_filename)
+            
         except Exception as e:
-            logger.error(f"Error cleaning up files: {str(e)}")
+            logger.error(f"API PDF protect error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({'error': str(e)}), 500
 
 def determine_file_type(input_format, output_format):
     """Determine file type based on input and output formats."""
@@ -11,6 +11,8 @@ from services.audio_service import AudioService
 from services.image_service import ImageService
 from services.document_service import DocumentService
 from utils.file_utils import allowed_file, get_file_extension, save_uploaded_file
+from utils.conversion_cache import get_conversion_cache
+from utils.workspace import request_workspace
 import traceback
 import io
 import zipfile
@@ -55,108 +57,78 @@ def convert_file():
     else:
         output_filename = f"{original_filename}_copy.{output_format}"
     
-    # Create temp directory if it doesn't exist
-    temp_dir = current_app.config['TEMP_FOLDER']
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    # Save uploaded file to temp directory
-    input_path = os.path.join(temp_dir, f"temp_input.{input_format}")
-    output_path = os.path.join(temp_dir, f"temp_output.{output_format}")
-    
-    try:
-        # Save uploaded file
-        file.save(input_path)
+    # Each request converts in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_path = workspace.path_for(f"input.{input_format}")
+        output_path = workspace.path_for(f"output.{output_format}")
         
-        # Determine file type and use appropriate service
-        file_type = determine_file_type(input_format, output_format)
-        
-        if file_type == 'audio':
-            # Parse audio options
-            options = parse_audio_options(request.form)
+        try:
+            # Save uploaded file
+            file.save(input_path)
             
-            # Convert audio file
-            logger.info(f"Converting audio from {input_format} to {output_format}")
-            audio_service.convert_audio(input_path, output_path, options)
-            operation = 'convert_audio'
+            # Determine file type and use appropriate service
+            file_type = determine_file_type(input_format, output_format)
+            cache = get_conversion_cache()
             
-        elif file_type == 'image':
-            # Parse image options
-            options = parse_image_options(request.form)
+            if file_type == 'audio':
+                # Reject files that are not audio or are too long before converting
+                admission_error = audio_service.get_admission_error(audio_service.probe_audio(input_path))
+                if admission_error:
+                    return jsonify({'error': admission_error}), 400
+                
+                # Parse audio options
+                try:
+                    options = audio_service.validate_options(parse_audio_options(request.form))
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                
+                # Convert audio file
+                logger.info(f"Converting audio from {input_format} to {output_format}")
+                operation = 'convert_audio'
+                cache.get_or_create(input_path, operation, options,
+                                    lambda: audio_service.convert_audio(input_path, output_path, options),
+                                    output_format, output_path)
+                
+            elif file_type == 'image':
+                # Parse image options
+                options = parse_image_options(request.form)
+                
+                # Convert image file
+                logger.info(f"Converting image from {input_format} to {output_format}")
+                operation = 'convert_image'
+                cache.get_or_create(input_path, operation, options,
+                                    lambda: image_service.convert_image(input_path, output_path, options),
+                                    output_format, output_path)
+                
+            elif file_type == 'document':
+                # Convert document
+                logger.info(f"Converting document from {input_format} to {output_format}")
+                operation = 'convert_document'
+                cache.get_or_create(input_path, operation, {},
+                                    lambda: document_service.convert_document(input_path, output_path),
+                                    output_format, output_path)
+                
+            else:
+                return jsonify({'error': 'Unsupported conversion'}), 400
             
-            # Convert image file
-            logger.info(f"Converting image from {input_format} to {output_format}")
-            image_service.convert_image(input_path, output_path, options)
-            operation = 'convert_image'
+            # Record conversion for logged in users
+            if current_user.is_authenticated:
+                conversion = Conversion(
+                    user_id=current_user.id,
+                    operation=operation,
+                    input_filename=file.filename,
+                    output_filename=output_filename
+                )
+                db.session.add(conversion)
+                db.session.commit()
             
-        elif file_type == 'document':
-            # Convert document
-            logger.info(f"Converting document from {input_format} to {output_format}")
-            document_service.convert_document(input_path, output_path)
-            operation = 'convert_document'
+            # The workspace is removed once the output has been sent
+            return workspace.send_file(output_path, output_filename)
             
-        else:
-            return jsonify({'error': 'Unsupported conversion'}), 400
-        
-        # Record conversion for logged in users
-        if current_user.is_authenticated:
-            conversion = Conversion(
-                user_id=current_user.id,
-                operation=operation,
-                input_filename=file.filename,
-                output_filename=output_filename
-            )
-            db.session.add(conversion)
-            db.session.commit()
-        
-        # Read the converted file
-        with open(output_path, 'rb') as f:
-            file_data = f.read()
-        
-        # Clean up files
-        try:
-            os.remove(input_path)
-            os.remove(output_path)
         except Exception as e:
-            logger.error(f"Error cleaning up files: {str(e)}")
-        
-        # Determine MIME type
-        mime_type = mimetypes.guess_type(output_filename)[0]
-        if not mime_type:
-            if output_format in ['mp3', 'ogg', 'wav', 'flac', 'aac', 'm4a']:
-                mime_type = f'audio/{output_format}'
-            elif output_format in ['jpg', 'jpeg', 'png', 'gif', 'webp']:
-                mime_type = f'image/{output_format}'
-            elif output_format == 'pdf':
-                mime_type = 'application/pdf'
-            elif output_format == 'docx':
-                mime_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            elif output_format == 'txt':
-                mime_type = 'text/plain'
-            elif output_format == 'md':
-                mime_type = 'text/markdown'
-            elif output_format == 'html':
-                mime_type = 'text/html'
-        
-        # Send the response
-        response = make_response(file_data)
-        response.headers['Content-Type'] = mime_type or 'application/octet-stream'
-        response.headers['Content-Disposition'] = f'attachment; filename="{output_filename}"'
-        return response
-        
-    except Exception as e:
-        logger.error(f"Conversion error: {str(e)}")
-        logger.error(traceback.format_exc())
-        
-        # Clean up files in case of error
-        try:
-            if os.path.exists(input_path):
-                os.remove(input_path)
-            if os.path.exists(output_path):
-                os.remove(output_path)
-        except Exception as cleanup_error:
-            logger.error(f"Error cleaning up files: {str(cleanup_error)}")
-        
-        return jsonify({'error': 'An error occurred during conversion. Please try again.'}), 500
+            logger.error(f"Conversion error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({'error': 'An error occurred during conversion. Please try again.'}), 500
 
 
 @conversion_bp.route('/batch', methods=['POST'])
@@ -185,48 +157,64 @@ def batch_convert():
     if not output_format:
         return jsonify({'error': 'Output format not specified'}), 400
     
-    # Create temporary directories
-    temp_dir = current_app.config['TEMP_FOLDER']
-    input_dir = os.path.join(temp_dir, 'batch_input')
-    output_dir = os.path.join(temp_dir, 'batch_output')
-    os.makedirs(input_dir, exist_ok=True)
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Prepare to track converted files
-    converted_files = []
-    errors = []
-    
-    try:
-        # Process each file
-        for file in files:
-            if not file.filename:
-                continue
-            
-            input_format = get_file_extension(file.filename)
-            original_filename = os.path.splitext(file.filename)[0]
-            
-            # Set output filename
+    # Each request converts in its own workspace, removed when the request ends
+    with request_workspace() as workspace:
+        input_dir = workspace.make_dir('batch_input')
+        output_dir = workspace.make_dir('batch_output')
+        
+        # Prepare to track converted files
+        converted_files = []
+        errors = []
+        cache = get_conversion_cache()
+        
+        try:
+            # Save the uploads; the index keeps identically named files apart
             prefix = request.form.get('output_prefix', '')
-            output_filename = f"{prefix}{original_filename}.{output_format}"
-            
-            # Save input file
-            input_path = os.path.join(input_dir, secure_filename(file.filename))
-            output_path = os.path.join(output_dir, secure_filename(output_filename))
-            
-            file.save(input_path)
+            jobs = []
+            for index, file in enumerate(files):
+                if not file.filename:
+                    continue
+                
+                original_filename = os.path.splitext(file.filename)[0]
+                output_filename = f"{prefix}{original_filename}.{output_format}"
+                
+                input_path = os.path.join(input_dir, f"{index}_{secure_filename(file.filename)}")
+                output_path = os.path.join(output_dir, f"{index}_{secure_filename(output_filename)}")
+                file.save(input_path)
+                
+                jobs.append((file, output_filename, input_path, output_path))
             
-            try:
-                # Convert file based on type
+            # Convert; image batches are spread over a process pool
+            if conversion_type == 'image':
+                job_errors = convert_image_batch(
+                    [(input_path, output_path) for _, _, input_path, output_path in jobs],
+                    parse_image_options(request.form), output_format, cache
+                )
+            else:
+                # Audio uploads are probed together and rejected ones skipped
                 if conversion_type == 'audio':
-                    options = parse_audio_options(request.form)
-                    audio_service.convert_audio(input_path, output_path, options)
-                    
-                elif conversion_type == 'image':
-                    options = parse_image_options(request.form)
-                    image_service.convert_image(input_path, output_path, options)
-                    
-                elif conversion_type == 'document':
-                    document_service.convert_document(input_path, output_path)
+                    infos = audio_service.probe_audio_files(
+                        [input_path for _, _, input_path, _ in jobs],
+                        workers=current_app.config.get('AUDIO_PROBE_WORKERS')
+                    )
+                    admission_errors = [audio_service.get_admission_error(info) for info in infos]
+                else:
+                    admission_errors = [None] * len(jobs)
+                
+                job_errors = [
+                    admission_error or convert_batch_file(conversion_type, input_path, output_path, output_format, cache)
+                    for (_, _, input_path, output_path), admission_error in zip(jobs, admission_errors)
+                ]
+            
+            # Collect results in upload order
+            for (file, output_filename, _, output_path), error in zip(jobs, job_errors):
+                if error:
+                    logger.error(f"Error converting {file.filename}: {error}")
+                    errors.append({
+                        'file': file.filename,
+                        'error': error
+                    })
+                    continue
                 
                 # Add to converted files
                 converted_files.append({
@@ -245,87 +233,92 @@ def batch_convert():
                     )
                     db.session.add(conversion)
             
-            except Exception as e:
-                logger.error(f"Error converting {file.filename}: {str(e)}")
-                errors.append({
-                    'file': file.filename,
-                    'error': str(e)
-                })
-        
-        # Commit conversions to database
-        if current_user.is_authenticated:
-            db.session.commit()
-        
-        # Prepare response
-        if len(converted_files) == 0:
-            return jsonify({
-                'success': False,
-                'message': 'No files were converted successfully',
-                'errors': errors
-            }), 400
-        
-        # Create ZIP if requested or if multiple files
-        download_as_zip = request.form.get('download_as_zip') == 'true' or len(converted_files) > 1
-        
-        if download_as_zip:
-            # Create ZIP file
-            zip_path = os.path.join(temp_dir, 'batch_result.zip')
-            with zipfile.ZipFile(zip_path, 'w') as zip_file:
-                for file_info in converted_files:
-                    zip_file.write(file_info['path'], file_info['converted'])
+            # Commit conversions to database
+            if current_user.is_authenticated:
+                db.session.commit()
             
-            # Read ZIP file
-            with open(zip_path, 'rb') as f:
-                file_data = f.read()
+            # Prepare response
+            if len(converted_files) == 0:
+                return jsonify({
+                    'success': False,
+                    'message': 'No files were converted successfully',
+                    'errors': errors
+                }), 400
             
-            # Clean up
-            try:
-                os.remove(zip_path)
-            except Exception as e:
-                logger.error(f"Error removing ZIP file: {str(e)}")
+            # Create ZIP if requested or if multiple files
+            download_as_zip = request.form.get('download_as_zip') == 'true' or len(converted_files) > 1
             
-            # Send ZIP response
-            response = make_response(file_data)
-            response.headers['Content-Type'] = 'application/zip'
-            response.headers['Content-Disposition'] = f'attachment; filename="converted_files.zip"'
+            # The workspace is removed once the response has been sent
+            if download_as_zip:
+                # Stream the converted files into a ZIP
+                entries = [(file_info['converted'], file_info['path']) for file_info in converted_files]
+                return workspace.send_zip(entries, 'converted_files.zip')
+                
+            else:
+                # Send single file
+                file_info = converted_files[0]
+                return workspace.send_file(file_info['path'], file_info['converted'])
             
+        except Exception as e:
+            logger.error(f"Batch conversion error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({
+                'success': False,
+                'message': 'An error occurred during batch conversion',
+                'error': str(e)
+            }), 500
+
+
+def convert_batch_file(conversion_type, input_path, output_path, output_format, cache):
+    """Convert one audio or document batch item, returning an error message or None."""
+    try:
+        if conversion_type == 'audio':
+            options = parse_audio_options(request.form)
+            convert = lambda: audio_service.convert_audio(input_path, output_path, options)
         else:
-            # Send single file
-            file_info = converted_files[0]
-            with open(file_info['path'], 'rb') as f:
-                file_data = f.read()
-            
-            # Determine MIME type
-            mime_type = mimetypes.guess_type(file_info['converted'])[0] or 'application/octet-stream'
-            
-            # Send response
-            response = make_response(file_data)
-            response.headers['Content-Type'] = mime_type
-            response.headers['Content-Disposition'] = f'attachment; filename="{file_info["converted"]}"'
-        
-        # Clean up
-        for file_path in os.listdir(input_dir):
-            try:
-                os.remove(os.path.join(input_dir, file_path))
-            except Exception:
-                pass
-        
-        for file_path in os.listdir(output_dir):
-            try:
-                os.remove(os.path.join(output_dir, file_path))
-            except Exception:
-                pass
-        
-        return response
+            options = {}
+            convert = lambda: document_service.convert_document(input_path, output_path)
         
+        cache.get_or_create(input_path, f'convert_{conversion_type}', options,
+                            convert, output_format, output_path)
+        return None
+    
     except Exception as e:
-        logger.error(f"Batch conversion error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return jsonify({
-            'success': False,
-            'message': 'An error occurred during batch conversion',
-            'error': str(e)
-        }), 500
+        return str(e)
+
+
+def convert_image_batch(jobs, options, output_format, cache):
+    """
+    Convert a batch of images in parallel, serving repeats from the cache.
+    
+    Args:
+        jobs (list): (input_path, output_path) pairs
+        options (dict): Image processing options
+        output_format (str): Output file extension
+        cache (ConversionCache): Conversion result cache
+    
+    Returns:
+        list: Error message or None for each job, in input order
+    """
+    job_errors = [None] * len(jobs)
+    misses = []
+    for index, (input_path, output_path) in enumerate(jobs):
+        key, cached_path = cache.lookup(input_path, 'convert_image', options, output_format, output_path)
+        if not cached_path:
+            misses.append((index, key))
+    
+    results = image_service.batch_convert_images(
+        [jobs[index] for index, _ in misses], options,
+        workers=current_app.config.get('IMAGE_BATCH_WORKERS')
+    )
+    
+    for (index, key), result in zip(misses, results):
+        if result['error']:
+            job_errors[index] = result['error']
+        elif key:
+            cache.put(key, output_format, result['output_path'])
+    
+    return job_errors
 
 
 def determine_file_type(input_format, output_format):
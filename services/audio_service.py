@@ -1,13 +1,18 @@
 # Modified services/audio_service.py to handle missing dependencies
 
 import os
+import re
+import math
 import subprocess
 import logging
-import platform
-import requests
-import zipfile
 import shutil
+import platform
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import config
+from utils.capabilities import get_registry
+from utils.media_probe import AudioInfo, ProbeCache, parse_ffprobe_output, parse_ffmpeg_output
+from utils.workspace import get_workspace_dir
 
 # Import handling for pydub with graceful fallback
 try:
@@ -28,128 +33,109 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Shared by all AudioService instances in the process
+probe_cache = ProbeCache(config.Config.AUDIO_PROBE_CACHE_SIZE)
+
+# Default encoder for each output format
+DEFAULT_ENCODERS = {'mp3': 'libmp3lame', 'aac': 'aac', 'm4a': 'aac', 'ogg': 'libvorbis', 'flac': 'flac'}
+
+# Encoders whose output can be encoded in segments and joined gaplessly:
+# frame size and encoder delay (priming samples) in samples, and extra
+# arguments. MP3 frames must not borrow bits from earlier frames (the bit
+# reservoir), as those frames are dropped at the joins. Lossless encoders
+# are cheap enough to run in one pass, and copying FLAC frames would leave
+# the first segment's stream header (and length) on the output.
+SEGMENT_ENCODERS = {
+    'libmp3lame': (1152, 1105, ['-reservoir', '0']),
+    'aac': (1024, 1024, []),
+}
+
+# Input formats whose seek positions are estimated rather than exact
+INEXACT_SEEK_FORMATS = {'mp3', 'aac'}
+
+# Accepted range of each numeric option: (type, minimum, maximum)
+AUDIO_OPTION_LIMITS = {
+    'bitrate': (int, 8, 640),  # kbit/s
+    'sample_rate': (int, 8000, 192000),
+    'channels': (int, 1, 8),
+    'volume': (float, -60.0, 60.0),  # dB
+    'fade_in': (float, 0.0, 24 * 60 * 60),  # Seconds
+    'fade_out': (float, 0.0, 24 * 60 * 60),
+}
+
+# FFmpeg encoder names, e.g. 'libmp3lame'
+CODEC_NAME_PATTERN = re.compile(r'^[a-z0-9_]+$')
+
 class AudioService:
     """Service for audio conversion operations."""
     
-    def __init__(self, temp_dir='temp', ffmpeg_dir='ffmpeg-static'):
-        """Initialize audio service with temporary directory for processing."""
+    def __init__(self, temp_dir='temp', ffmpeg_dir=None):
+        """
+        Initialize audio service with temporary directory for processing.
+        
+        Tools are looked up in the process-wide capability registry, so
+        creating more instances does not run ffmpeg again.
+        
+        Args:
+            temp_dir (str): Directory for temporary files
+            ffmpeg_dir (str, optional): Extra directory with a downloaded FFmpeg,
+                                        defaults to FFMPEG_DIR
+        """
         self.temp_dir = temp_dir
-        self.ffmpeg_dir = ffmpeg_dir
-        self.features_available = self._check_features()
+        self.ffmpeg_dir = ffmpeg_dir or config.Config.FFMPEG_DIR
         
         # Create directories
         os.makedirs(temp_dir, exist_ok=True)
-        os.makedirs(ffmpeg_dir, exist_ok=True)
         
         # Set up FFmpeg path
         self.ffmpeg_path = self._get_ffmpeg_path()
+        self.ffprobe_path = self._get_ffprobe_path()
+        self.features_available = self._check_features()
     
     def _check_features(self):
         """Check which audio features are available"""
         features = {
             "pydub": PYDUB_AVAILABLE,
-            "ffmpeg": self._is_ffmpeg_installed()
+            "ffmpeg": self.ffmpeg_path is not None
         }
         
         logger.info(f"Audio service features: {features}")
         return features
     
     def _get_ffmpeg_path(self):
-        """Get or download FFmpeg executable path."""
-        # Check if FFmpeg is already available in the system
-        if self._is_ffmpeg_installed():
-            logger.info("System FFmpeg found")
-            return 'ffmpeg'
-        
-        # Check if we have a downloaded FFmpeg
-        ffmpeg_binary = self._get_ffmpeg_binary_path()
-        if os.path.exists(ffmpeg_binary):
-            logger.info(f"Using downloaded FFmpeg binary: {ffmpeg_binary}")
-            return ffmpeg_binary
-        
-        # Download FFmpeg
-        return self._download_ffmpeg()
+        """Get the FFmpeg executable path, or None if FFmpeg is not installed."""
+        ffmpeg_path = get_registry().path('ffmpeg') or self._find_in_ffmpeg_dir('ffmpeg')
+        if not ffmpeg_path:
+            logger.warning("FFmpeg not found; install it or run python -m utils.capabilities --download-ffmpeg")
+        return ffmpeg_path
     
-    def _is_ffmpeg_installed(self):
-        """Check if FFmpeg is installed on the system."""
-        try:
-            subprocess.run(['ffmpeg', '-version'], 
-                          stdout=subprocess.PIPE, 
-                          stderr=subprocess.PIPE, 
-                          check=False)
-            return True
-        except Exception:
-            return False
+    def _get_ffprobe_path(self):
+        """Get the ffprobe executable path, or None to probe with ffmpeg instead."""
+        ffprobe_path = get_registry().path('ffprobe') or self._find_in_ffmpeg_dir('ffprobe')
+        if not ffprobe_path:
+            logger.info("ffprobe not found, probing audio with ffmpeg")
+        return ffprobe_path
     
-    def _get_ffmpeg_binary_path(self):
-        """Get FFmpeg binary path based on platform."""
-        system = platform.system()
-        if system == 'Windows':
-            return os.path.join(self.ffmpeg_dir, 'ffmpeg.exe')
-        else:  # Linux, Darwin
-            return os.path.join(self.ffmpeg_dir, 'ffmpeg')
+    def _find_in_ffmpeg_dir(self, name):
+        """Get the path of a binary in ffmpeg_dir, if it is there."""
+        if platform.system() == 'Windows':
+            name = f"{name}.exe"
+        binary_path = os.path.join(self.ffmpeg_dir, name)
+        return binary_path if os.path.isfile(binary_path) else None
     
-    def _download_ffmpeg(self):
-        """Download FFmpeg for the current platform."""
-        system = platform.system()
-        
-        if system == 'Windows':
-            ffmpeg_url = "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/ffmpeg-master-latest-win64-gpl.zip"
-            binary_path = os.path.join(self.ffmpeg_dir, 'ffmpeg.exe')
-        elif system == 'Darwin':  # macOS
-            ffmpeg_url = "https://evermeet.cx/ffmpeg/getrelease/ffmpeg/zip"
-            binary_path = os.path.join(self.ffmpeg_dir, 'ffmpeg')
-        else:  # Linux
-            ffmpeg_url = "https://johnvansickle.com/ffmpeg/releases/ffmpeg-release-amd64-static.tar.xz"
-            binary_path = os.path.join(self.ffmpeg_dir, 'ffmpeg')
-        
-        # Download and extract FFmpeg
-        try:
-            logger.info(f"Downloading FFmpeg from {ffmpeg_url}")
-            
-            with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                with requests.get(ffmpeg_url, stream=True) as r:
-                    r.raise_for_status()
-                    for chunk in r.iter_content(chunk_size=8192):
-                        tmp_file.write(chunk)
-                
-                tmp_file_path = tmp_file.name
-            
-            # Extract downloaded archive
-            extract_dir = tempfile.mkdtemp()
-            
-            if system == 'Windows' or system == 'Darwin':
-                with zipfile.ZipFile(tmp_file_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_dir)
-            else:  # Linux
-                import tarfile
-                with tarfile.open(tmp_file_path) as tar:
-                    tar.extractall(extract_dir)
-            
-            # Find and move the FFmpeg binary
-            for root, _, files in os.walk(extract_dir):
-                for file in files:
-                    if file == 'ffmpeg' or file == 'ffmpeg.exe':
-                        source_path = os.path.join(root, file)
-                        shutil.move(source_path, binary_path)
-                        os.chmod(binary_path, 0o755)  # Make executable
-                        break
-            
-            # Clean up
-            os.unlink(tmp_file_path)
-            shutil.rmtree(extract_dir)
-            
-            logger.info(f"FFmpeg installed at {binary_path}")
-            return binary_path
-            
-        except Exception as e:
-            logger.error(f"Error downloading FFmpeg: {str(e)}")
-            raise
+    def _require_ffmpeg(self):
+        if not self.ffmpeg_path:
+            raise RuntimeError("FFmpeg is not installed; audio conversion is not available")
     
     def convert_audio(self, input_path, output_path, options=None):
         """
         Convert an audio file using FFmpeg.
         
+        Processing options are expressed as an FFmpeg filter chain so the audio
+        is streamed from input to output in one process with constant memory.
+        pydub, which decodes the whole file into memory, is only used for
+        options the filter chain cannot express.
+        
         Args:
             input_path (str): Path to the input audio file
             output_path (str): Path where the converted audio will be saved
@@ -159,70 +145,31 @@ class AudioService:
             str: Path to the converted audio file
         """
         try:
-            # Check if we can use pydub for conversion
-            if not self.features_available["pydub"]:
-                logger.warning("pydub is not available, falling back to direct FFmpeg usage")
-                return self._convert_with_ffmpeg(input_path, output_path, options)
+            self._require_ffmpeg()
             
             # Ensure paths are absolute
             input_path = os.path.abspath(input_path)
             output_path = os.path.abspath(output_path)
             
-            # Get output format from file extension
-            output_format = output_path.split('.')[-1].lower()
-            
-            logger.info(f"Converting {input_path} to {output_path} (format: {output_format})")
-            
-            # Set default options if not provided
-            if options is None:
-                options = {}
-            
-            # Use pydub for common audio conversions
-            audio = AudioSegment.from_file(input_path)
-            
-            # Apply volume adjustment if specified
-            if 'volume' in options:
-                audio = audio.apply_gain(options['volume'])
-            
-            # Apply normalize if specified
-            if options.get('normalize', False):
-                audio = audio.normalize()
+            options = self.validate_options(options)
             
-            # Apply fade in/out if specified
-            if 'fade_in' in options:
-                audio = audio.fade_in(int(options['fade_in'] * 1000))
+            logger.info(f"Converting {input_path} to {output_path}")
             
-            if 'fade_out' in options:
-                audio = audio.fade_out(int(options['fade_out'] * 1000))
+            filters = self._build_audio_filters(input_path, options)
+            if filters is None and self.features_available["pydub"]:
+                logger.info("Options need the whole file in memory, converting with pydub")
+                return self._convert_with_pydub(input_path, output_path, options)
             
-            # Apply channel conversion if specified
-            if 'channels' in options:
-                audio = audio.set_channels(options['channels'])
+            if filters is None:
+                logger.warning("Audio duration unknown and pydub is not available, skipping fade out")
+                options = {key: value for key, value in options.items() if key != 'fade_out'}
+                filters = self._build_audio_filters(input_path, options)
             
-            # Apply sample rate conversion if specified
-            if 'sample_rate' in options:
-                audio = audio.set_frame_rate(options['sample_rate'])
+            segments = self._plan_segments(input_path, output_path, options)
+            if segments:
+                return self._convert_in_segments(input_path, output_path, options, filters, segments)
             
-            # For complex conversions or specific codecs, use FFmpeg directly
-            if ('codec' in options or 'bitrate' in options or 
-                output_format in ['m4a', 'aac', 'flac']):
-                # Export to a temporary file with format matching input
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{output_format}")
-                audio.export(temp_file.name, format=output_format)
-                temp_file.close()
-                
-                # Use FFmpeg for final conversion with all options
-                return self._convert_with_ffmpeg(temp_file.name, output_path, options)
-            else:
-                # For simple conversions, use pydub directly
-                audio.export(
-                    output_path,
-                    format=output_format,
-                    bitrate=f"{options.get('bitrate', 192)}k" if 'bitrate' in options else None
-                )
-            
-            logger.info("Conversion successful")
-            return output_path
+            return self._convert_with_ffmpeg(input_path, output_path, options, filters)
             
         except ImportError:
             # Fall back to FFmpeg if pydub fails
@@ -232,8 +179,431 @@ class AudioService:
             logger.error(f"Unexpected error during conversion: {str(e)}")
             raise
 
-    def _convert_with_ffmpeg(self, input_path, output_path, options=None):
-        """Convert audio using FFmpeg directly."""
+    def convert_audio_multi(self, input_path, outputs):
+        """
+        Convert an audio file to several outputs with a single decode.
+        
+        All outputs are written by one FFmpeg process that decodes the input
+        once and feeds each output its own filter chain and encoder. When
+        several outputs normalize, the peak level is measured only once.
+        
+        Args:
+            input_path (str): Path to the input audio file
+            outputs (list): (output_path, options) pairs; options may be None
+        
+        Returns:
+            list: Paths to the converted audio files, in the order given
+        """
+        self._require_ffmpeg()
+        input_path = os.path.abspath(input_path)
+        outputs = [(os.path.abspath(output_path), self.validate_options(options)) for output_path, options in outputs]
+        
+        peak_volume = None
+        if any(options.get('normalize', False) for _, options in outputs):
+            peak_volume = self._detect_peak_volume(input_path)
+        
+        command = [self.ffmpeg_path, '-y', '-i', input_path]
+        separate = []
+        for output_path, options in outputs:
+            filters = self._build_audio_filters(input_path, options, peak_volume)
+            if filters is None:
+                # Needs the whole file in memory; convert it on its own
+                separate.append((output_path, options))
+                continue
+            
+            command.extend(['-map', '0:a'])
+            if filters:
+                command.extend(['-af', ','.join(filters)])
+            command.extend(self._get_encoder_args(output_path, options))
+            command.append(output_path)
+        
+        if len(separate) < len(outputs):
+            logger.info(f"Running FFmpeg command: {' '.join(command)}")
+            subprocess.run(command, check=True, capture_output=True, text=True)
+            logger.info(f"Converted {input_path} to {len(outputs) - len(separate)} outputs in one pass")
+        
+        for output_path, options in separate:
+            self.convert_audio(input_path, output_path, options)
+        
+        return [output_path for output_path, _ in outputs]
+
+    def validate_options(self, options):
+        """
+        Coerce and range-check audio conversion options.
+        
+        Options are interpolated into FFmpeg filter strings and arguments, so
+        every value is converted to its type and checked before a command is
+        built. Unknown options are dropped.
+        
+        Args:
+            options (dict): Options as received, e.g. decoded from JSON; may be None
+        
+        Returns:
+            dict: The options with numeric values as int or float
+        
+        Raises:
+            ValueError: If options is not a dict or a value is invalid or out of range
+        """
+        if options is None:
+            return {}
+        if not isinstance(options, dict):
+            raise ValueError("Audio options must be an object")
+        
+        validated = {}
+        for name, (kind, minimum, maximum) in AUDIO_OPTION_LIMITS.items():
+            if options.get(name) is None:
+                continue
+            value = options[name]
+            try:
+                if isinstance(value, bool):
+                    raise ValueError
+                number = float(value)
+                if not math.isfinite(number) or (kind is int and not number.is_integer()):
+                    raise ValueError
+            except (TypeError, ValueError):
+                raise ValueError(f"Audio option '{name}' must be a number") from None
+            if not minimum <= number <= maximum:
+                raise ValueError(f"Audio option '{name}' must be between {minimum:g} and {maximum:g}")
+            validated[name] = kind(number)
+        
+        normalize = options.get('normalize')
+        if normalize is not None:
+            if isinstance(normalize, str) and normalize.lower() in ('true', 'false'):
+                normalize = normalize.lower() == 'true'
+            if not isinstance(normalize, bool):
+                raise ValueError("Audio option 'normalize' must be true or false")
+            validated['normalize'] = normalize
+        
+        codec = options.get('codec')
+        if codec:
+            if not isinstance(codec, str) or not CODEC_NAME_PATTERN.match(codec):
+                raise ValueError("Audio option 'codec' must be an encoder name")
+            validated['codec'] = codec
+        
+        return validated
+
+    def _build_audio_filters(self, input_path, options, peak_volume=None):
+        """
+        Build an FFmpeg audio filter chain equivalent to the pydub processing.
+        
+        Args:
+            input_path (str): Path to the input audio file
+            options (dict): Conversion options
+            peak_volume (float, optional): Peak level in dBFS if already measured
+        
+        Returns:
+            list: Filters to join into an -af graph, or None if an option
+                  cannot be applied while streaming
+        """
+        filters = []
+        info = None
+        if 'fade_out' in options or 'channels' in options:
+            info = self.probe_audio(input_path)
+        
+        if options.get('normalize', False):
+            # Like pydub's normalize(): bring the peak to -0.1 dBFS. Any volume
+            # change before it is cancelled out, so only the source peak matters.
+            peak = peak_volume if peak_volume is not None else self._detect_peak_volume(input_path)
+            if peak is not None:
+                filters.append(f"volume={-0.1 - peak:.2f}dB")
+        elif 'volume' in options:
+            filters.append(f"volume={options['volume']}dB")
+        
+        if 'fade_in' in options:
+            filters.append(f"afade=t=in:st=0:d={options['fade_in']}")
+        
+        if 'fade_out' in options:
+            # The fade has to start at a known position, which needs the duration
+            duration = info.duration
+            if not duration:
+                return None
+            start = max(0.0, duration - options['fade_out'])
+            filters.append(f"afade=t=out:st={start:.3f}:d={options['fade_out']}")
+        
+        if 'channels' in options:
+            channels = int(options['channels'])
+            source_channels = info.channels
+            if channels == 1 and source_channels and source_channels > 1:
+                # Average the channels like pydub; FFmpeg's default downmix adds gain
+                mix = '+'.join(f"c{index}" for index in range(source_channels))
+                filters.append(f"pan=mono|c0<{mix}")
+            elif channels == 2 and source_channels == 1:
+                filters.append("pan=stereo|c0=c0|c1=c0")
+            elif channels != source_channels:
+                layouts = {1: 'mono', 2: 'stereo'}
+                filters.append(f"aformat=channel_layouts={layouts.get(channels, f'{channels}c')}")
+        
+        if 'sample_rate' in options:
+            filters.append(f"aresample={int(options['sample_rate'])}")
+        
+        return filters
+
+    def _plan_segments(self, input_path, output_path, options, workers=None, min_duration=None):
+        """
+        Plan a parallel, segmented encode for long audio.
+        
+        The output timeline is cut into frame-aligned segments of fixed
+        length, one per worker. Each segment is encoded with a couple of
+        frames of overlap on both sides so that, after trimming, the kept
+        frames line up exactly with those of a single-pass encode and the
+        priming of later segments is dropped.
+        
+        Args:
+            input_path (str): Path to the input audio file
+            output_path (str): Output path; its extension selects the encoder
+            options (dict): Conversion options
+            workers (int, optional): Parallel encodes, defaults to AUDIO_SEGMENT_WORKERS
+            min_duration (float, optional): Shortest input that is segmented,
+                                            defaults to AUDIO_SEGMENT_MIN_DURATION
+        
+        Returns:
+            list: Segment dicts, or None if the file should be encoded in one pass
+        """
+        workers = workers or config.Config.AUDIO_SEGMENT_WORKERS
+        min_duration = min_duration if min_duration is not None else config.Config.AUDIO_SEGMENT_MIN_DURATION
+        output_format = output_path.split('.')[-1].lower()
+        codec = options.get('codec') or DEFAULT_ENCODERS.get(output_format)
+        if workers < 2 or codec not in SEGMENT_ENCODERS:
+            return None
+        
+        info = self.probe_audio(input_path)
+        sample_rate = int(options.get('sample_rate') or info.sample_rate or 0)
+        if not info.duration or not sample_rate or info.duration < min_duration:
+            return None
+        
+        # Every segment has to be long enough to hold its fade
+        count = min(workers, int(info.duration // config.Config.AUDIO_SEGMENT_MIN_LENGTH))
+        if count < 2:
+            return None
+        segment_seconds = info.duration / count
+        if options.get('fade_in', 0) >= segment_seconds or options.get('fade_out', 0) >= segment_seconds:
+            return None
+        
+        frame_size, delay, _ = SEGMENT_ENCODERS[codec]
+        total = int(info.duration * sample_rate)
+        step = -(-total // count // frame_size) * frame_size
+        bounds = [index * step for index in range(count)] + [None]
+        
+        # Overlap before a segment: enough that the encoder is warmed up and
+        # the first kept sample starts a frame once the priming is added
+        preroll = 2 * frame_size - delay if delay else 0
+        postroll = 2 * frame_size if delay else 0
+        
+        segments = []
+        for index in range(count):
+            keep_start, keep_end = bounds[index], bounds[index + 1]
+            # Encoder input range, in samples at the output rate
+            start = 0 if index == 0 else keep_start - delay - preroll
+            end = None if keep_end is None else keep_end - delay + postroll
+            # Output samples to keep, in the segment's decoded timeline: the
+            # container hides the priming, so the first real sample is at 0
+            inpoint = keep_start - start - delay
+            segments.append({
+                'index': index,
+                'codec': codec,
+                'sample_rate': sample_rate,
+                'delay': delay,
+                'start': start,
+                'end': end,
+                'inpoint': inpoint if index else None,
+                'outpoint': None if keep_end is None else inpoint + keep_end - keep_start,
+                # The same range in encoded frames, for outputs cut frame by frame
+                'skip_frames': (keep_start - start) // frame_size,
+                'keep_frames': None if keep_end is None else (keep_end - keep_start) // frame_size,
+                'first': index == 0,
+                'last': keep_end is None,
+            })
+        return segments
+
+    def _convert_in_segments(self, input_path, output_path, options, filters, segments, workers=None):
+        """
+        Encode planned segments in parallel and join them with the concat demuxer.
+        
+        Args:
+            input_path (str): Path to the input audio file
+            output_path (str): Path where the converted audio will be saved
+            options (dict): Conversion options
+            filters (list): Filter graph from _build_audio_filters
+            segments (list): Plan from _plan_segments
+            workers (int, optional): Parallel encodes, defaults to one per segment
+        
+        Returns:
+            str: Path to the converted audio file
+        """
+        output_format = output_path.split('.')[-1].lower()
+        info = self.probe_audio(input_path)
+        
+        # Fades are positioned per segment; everything else applies as is
+        base_filters = [f for f in filters if not f.startswith('afade=')]
+        
+        segment_dir = tempfile.mkdtemp(prefix='segments_', dir=get_workspace_dir(self.temp_dir))
+        try:
+            # MP3 frames stand alone without the bit reservoir, so the overlap
+            # is dropped as each segment is written. Other segments are kept in
+            # MP4, which (unlike raw ADTS) can be seeked to an exact frame, and
+            # are cut at the join
+            cut_frames = output_format == 'mp3'
+            segment_format = 'mp3' if cut_frames else 'mp4'
+            encoder_args = self._get_encoder_args(output_path, options) + SEGMENT_ENCODERS[segments[0]['codec']][2]
+            
+            def encode(segment):
+                segment_path = os.path.join(segment_dir, f"segment_{segment['index']:04d}.{segment_format}")
+                args = list(encoder_args)
+                if cut_frames:
+                    drop = [f"lt(n\\,{segment['skip_frames']})"]
+                    if segment['keep_frames'] is not None:
+                        drop.append(f"gte(n\\,{segment['skip_frames'] + segment['keep_frames']})")
+                    args.extend(['-bsf:a', f"noise=drop={'+'.join(drop)}"])
+                self._encode_segment(input_path, segment_path, options, base_filters, args, segment, info)
+                return segment_path
+            
+            logger.info(f"Encoding {input_path} in {len(segments)} parallel segments")
+            # Each encode runs in its own FFmpeg process, threads only wait on them
+            with ThreadPoolExecutor(max_workers=workers or len(segments)) as executor:
+                segment_paths = list(executor.map(encode, segments))
+            
+            # Keep only each segment's own frames; the overlap is dropped
+            list_path = os.path.join(segment_dir, 'segments.txt')
+            with open(list_path, 'w') as f:
+                for segment, segment_path in zip(segments, segment_paths):
+                    f.write(f"file '{segment_path}'\n")
+                    if cut_frames:
+                        continue
+                    if segment['inpoint'] is not None:
+                        f.write(f"inpoint {segment['inpoint'] / segment['sample_rate']:.9f}\n")
+                    if segment['outpoint'] is not None:
+                        f.write(f"outpoint {segment['outpoint'] / segment['sample_rate']:.9f}\n")
+            
+            command = [
+                self.ffmpeg_path, '-y',
+                '-f', 'concat', '-safe', '0', '-i', list_path,
+                '-i', input_path,  # Only for its tags
+                '-map', '0:a', '-map_metadata', '1',
+                '-c', 'copy',
+            ]
+            if output_format in ('m4a', 'mp4') and segments[0]['delay']:
+                # Shift the priming before zero so the muxer writes an edit
+                # list that hides it, as a single-pass encode does
+                command.extend(['-output_ts_offset', f"{-segments[0]['delay'] / segments[0]['sample_rate']:.9f}"])
+            command.append(output_path)
+            
+            logger.info(f"Running FFmpeg command: {' '.join(command)}")
+            subprocess.run(command, check=True, capture_output=True, text=True)
+            
+            logger.info("Segmented conversion successful")
+            return output_path
+            
+        finally:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+    def _encode_segment(self, input_path, segment_path, options, base_filters, encoder_args, segment, info):
+        """Encode one planned segment of the input to segment_path."""
+        sample_rate = segment['sample_rate']
+        
+        # Seek to a whole second before the segment (so the trim points stay
+        # whole samples) unless the input can't be seeked exactly
+        seek_seconds = 0
+        if info.format_name not in INEXACT_SEEK_FORMATS:
+            seek_seconds = max(0, segment['start'] // sample_rate - 1)
+        offset = seek_seconds * sample_rate
+        
+        filters = list(base_filters)
+        if segment['first'] and 'fade_in' in options:
+            filters.append(f"afade=t=in:st=0:d={options['fade_in']}")
+        if segment['last'] and 'fade_out' in options:
+            start = max(0.0, info.duration - options['fade_out']) - seek_seconds
+            filters.append(f"afade=t=out:st={start:.3f}:d={options['fade_out']}")
+        
+        trim = f"atrim=start_sample={segment['start'] - offset}"
+        if segment['end'] is not None:
+            trim += f":end_sample={segment['end'] - offset}"
+        filters.extend([trim, 'asetpts=N/SR/TB'])
+        
+        command = [self.ffmpeg_path, '-y']
+        if seek_seconds:
+            command.extend(['-ss', str(seek_seconds)])
+        command.extend(['-i', input_path, '-vn', '-af', ','.join(filters)])
+        command.extend(encoder_args)
+        command.append(segment_path)
+        
+        subprocess.run(command, check=True, capture_output=True, text=True)
+
+    def _detect_peak_volume(self, input_path):
+        """
+        Measure the peak level of an audio file with a streaming decode pass.
+        
+        Returns:
+            float: Peak level in dBFS, or None for silence or if it can't be measured
+        """
+        import re
+        result = subprocess.run(
+            [self.ffmpeg_path, '-i', input_path, '-vn', '-af', 'volumedetect', '-f', 'null', '-'],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        peak_match = re.search(r'max_volume: (-?\d+(?:\.\d+)?) dB', result.stderr)
+        return float(peak_match.group(1)) if peak_match else None
+
+    def _convert_with_pydub(self, input_path, output_path, options):
+        """Convert audio by decoding it into memory with pydub."""
+        # Use pydub for common audio conversions
+        audio = AudioSegment.from_file(input_path)
+        
+        # Apply volume adjustment if specified
+        if 'volume' in options:
+            audio = audio.apply_gain(options['volume'])
+        
+        # Apply normalize if specified
+        if options.get('normalize', False):
+            audio = audio.normalize()
+        
+        # Apply fade in/out if specified
+        if 'fade_in' in options:
+            audio = audio.fade_in(int(options['fade_in'] * 1000))
+        
+        if 'fade_out' in options:
+            audio = audio.fade_out(int(options['fade_out'] * 1000))
+        
+        # Apply channel conversion if specified
+        if 'channels' in options:
+            audio = audio.set_channels(options['channels'])
+        
+        # Apply sample rate conversion if specified
+        if 'sample_rate' in options:
+            audio = audio.set_frame_rate(options['sample_rate'])
+        
+        # Hand the processed samples to a single FFmpeg encode, which applies
+        # the same codec and bitrate plan as the streaming path
+        sample_formats = {1: 's8', 2: 's16le', 3: 's24le', 4: 's32le'}
+        command = [
+            self.ffmpeg_path,
+            '-y',  # Overwrite output if exists
+            '-f', sample_formats[audio.sample_width],
+            '-ar', str(audio.frame_rate),
+            '-ac', str(audio.channels),
+            '-i', 'pipe:0',  # Raw samples on stdin
+        ]
+        command.extend(self._get_encoder_args(output_path, options))
+        command.append(output_path)
+        
+        logger.info(f"Running FFmpeg command: {' '.join(command)}")
+        subprocess.run(command, input=audio.raw_data, check=True, capture_output=True)
+        
+        logger.info("Conversion successful")
+        return output_path
+
+    def _convert_with_ffmpeg(self, input_path, output_path, options=None, filters=None):
+        """
+        Convert audio using FFmpeg directly.
+        
+        Args:
+            input_path (str): Path to the input audio file
+            output_path (str): Path where the converted audio will be saved
+            options (dict, optional): Conversion options
+            filters (list, optional): Audio filter chain from _build_audio_filters;
+                                      when given it also handles channels and sample rate
+        """
         if options is None:
             options = {}
             
@@ -244,63 +614,83 @@ class AudioService:
             '-i', input_path,  # Input file
         ]
         
-        # Add codec parameter if specified
-        if 'codec' in options:
-            command.extend(['-acodec', options['codec']])
+        if filters:
+            command.extend(['-af', ','.join(filters)])
         
-        # Add bitrate parameter if specified
-        if 'bitrate' in options:
-            command.extend(['-b:a', f"{options['bitrate']}k"])
-            
         # Add sample rate parameter if specified
-        if 'sample_rate' in options:
+        if 'sample_rate' in options and filters is None:
             command.extend(['-ar', str(options['sample_rate'])])
             
         # Add channels parameter if specified
-        if 'channels' in options:
+        if 'channels' in options and filters is None:
             command.extend(['-ac', str(options['channels'])])
         
+        command.extend(self._get_encoder_args(output_path, options))
+        
+        # Add output file to command
+        command.append(output_path)
+        
+        # Run FFmpeg command
+        logger.info(f"Running FFmpeg command: {' '.join(command)}")
+        
+        result = subprocess.run(
+            command,
+            check=True,
+            capture_output=True,
+            text=True
+        )
+        
+        logger.info("FFmpeg conversion successful")
+        return output_path
+
+    def _get_encoder_args(self, output_path, options):
+        """
+        Get the FFmpeg output arguments that select the encoder and its settings.
+        
+        Args:
+            output_path (str): Output path; its extension selects the defaults
+            options (dict): Conversion options, 'codec' and 'bitrate' override the defaults
+        
+        Returns:
+            list: FFmpeg arguments
+        """
+        args = []
+        
+        # Add codec parameter if specified
+        if 'codec' in options:
+            args.extend(['-acodec', options['codec']])
+        
+        # Add bitrate parameter if specified
+        if 'bitrate' in options:
+            args.extend(['-b:a', f"{options['bitrate']}k"])
+        
         # Get output format from file extension
         output_format = output_path.split('.')[-1].lower()
         
         # Format-specific options
         if output_format == 'mp3':
             if 'codec' not in options:
-                command.extend(['-acodec', 'libmp3lame'])
+                args.extend(['-acodec', 'libmp3lame'])
             if 'bitrate' not in options:
-                command.extend(['-b:a', '192k'])
+                args.extend(['-b:a', '192k'])
         
         elif output_format == 'aac' or output_format == 'm4a':
             if 'codec' not in options:
-                command.extend(['-acodec', 'aac'])
+                args.extend(['-acodec', 'aac'])
             if 'bitrate' not in options:
-                command.extend(['-b:a', '192k'])
+                args.extend(['-b:a', '192k'])
         
         elif output_format == 'ogg':
             if 'codec' not in options:
-                command.extend(['-acodec', 'libvorbis'])
+                args.extend(['-acodec', 'libvorbis'])
             if 'bitrate' not in options:
-                command.extend(['-q:a', '4'])
+                args.extend(['-q:a', '4'])
         
         elif output_format == 'flac':
             if 'codec' not in options:
-                command.extend(['-acodec', 'flac'])
-        
-        # Add output file to command
-        command.append(output_path)
-        
-        # Run FFmpeg command
-        logger.info(f"Running FFmpeg command: {' '.join(command)}")
-        
-        result = subprocess.run(
-            command,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+                args.extend(['-acodec', 'flac'])
         
-        logger.info("FFmpeg conversion successful")
-        return output_path
+        return args
 
     def get_audio_info(self, file_path):
         """
@@ -312,65 +702,92 @@ class AudioService:
         Returns:
             dict: Audio information (duration, bitrate, etc.)
         """
+        return self.probe_audio(file_path).to_dict()
+
+    def probe_audio(self, file_path):
+        """
+        Probe an audio file, reusing the result while the file is unchanged.
+        
+        Args:
+            file_path (str): Path to the audio file
+        
+        Returns:
+            AudioInfo: Typed metadata; has_audio is False if it is not an audio file
+        """
         try:
-            command = [
-                self.ffmpeg_path,
-                '-i', file_path
-            ]
+            key = probe_cache.key_for(file_path)
+            info = probe_cache.get(key)
+            if info is None:
+                info = self._run_probe(file_path)
+                probe_cache.put(key, info)
+            return info
             
-            # FFmpeg outputs to stderr, not stdout
+        except Exception as e:
+            logger.error(f"Error getting audio info: {str(e)}")
+            raise
+
+    def probe_audio_files(self, file_paths, workers=None):
+        """
+        Probe many audio files, running up to `workers` probe processes at once.
+        
+        Args:
+            file_paths (list): Paths to the audio files
+            workers (int, optional): Concurrent probes, defaults to AUDIO_PROBE_WORKERS
+        
+        Returns:
+            list: AudioInfo for each file, in input order
+        """
+        if not file_paths:
+            return []
+        
+        workers = max(1, min(workers or config.Config.AUDIO_PROBE_WORKERS, len(file_paths)))
+        # The work happens in the probe subprocesses, threads only wait on them
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.probe_audio, file_paths))
+
+    def get_admission_error(self, info, max_duration=None):
+        """
+        Check probed metadata against the limits for accepting a conversion.
+        
+        Args:
+            info (AudioInfo): Result of probe_audio
+            max_duration (float, optional): Longest accepted duration in seconds,
+                                            defaults to AUDIO_MAX_DURATION (0 disables)
+        
+        Returns:
+            str: Reason the file is rejected, or None if it is accepted
+        """
+        if not info.has_audio:
+            return "File has no audio stream"
+        
+        max_duration = max_duration if max_duration is not None else config.Config.AUDIO_MAX_DURATION
+        if max_duration and info.duration and info.duration > max_duration:
+            return f"Audio is too long ({info.duration:.0f}s, limit is {max_duration:.0f}s)"
+        
+        return None
+
+    def _run_probe(self, file_path):
+        """Run ffprobe (or ffmpeg -i without it) on a file and parse the result."""
+        if self.ffprobe_path:
             result = subprocess.run(
-                command,
+                [self.ffprobe_path, '-v', 'error', '-print_format', 'json',
+                 '-show_streams', '-show_format', file_path],
                 capture_output=True,
                 text=True,
                 check=False
             )
-            
-            # Parse the output
-            info = {}
-            output = result.stderr
-            
-            # Extract duration
-            import re
-            duration_match = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', output)
-            if duration_match:
-                h, m, s = duration_match.groups()
-                info['duration'] = float(h) * 3600 + float(m) * 60 + float(s)
-            
-            # Extract bitrate
-            bitrate_match = re.search(r'bitrate: (\d+) kb/s', output)
-            if bitrate_match:
-                info['bitrate'] = int(bitrate_match.group(1))
-            
-            # Extract audio stream info
-            audio_match = re.search(r'Stream.*Audio: (.*)', output)
-            if audio_match:
-                audio_info = audio_match.group(1)
-                
-                # Extract codec
-                codec_match = re.search(r'^(\w+)', audio_info)
-                if codec_match:
-                    info['codec'] = codec_match.group(1)
-                
-                # Extract sample rate
-                sample_rate_match = re.search(r'(\d+) Hz', audio_info)
-                if sample_rate_match:
-                    info['sample_rate'] = int(sample_rate_match.group(1))
-                
-                # Extract channels
-                channels_match = re.search(r'(mono|stereo|(\d+) channels)', audio_info)
-                if channels_match:
-                    if channels_match.group(1) == 'mono':
-                        info['channels'] = 1
-                    elif channels_match.group(1) == 'stereo':
-                        info['channels'] = 2
-                    else:
-                        info['channels'] = int(channels_match.group(2))
-            
-            return info
-            
-        except Exception as e:
-            logger.error(f"Error getting audio info: {str(e)}")
-            raise
+            # Files ffprobe can't read are reported as having no audio
+            return parse_ffprobe_output(result.stdout) if result.returncode == 0 else AudioInfo()
+        
+        self._require_ffmpeg()
+        
+        # FFmpeg outputs to stderr, not stdout
+        result = subprocess.run(
+            [self.ffmpeg_path, '-i', file_path],
+            capture_output=True,
+            text=True,
+            check=False
+        )
+        return parse_ffmpeg_output(result.stderr)
             
     # Other methods remain mostly the same but with appropriate error handling...
\ No newline at end of file
@@ -1,17 +1,79 @@
 # services/image_service.py
 import os
+import math
+import struct
 import logging
+import threading
 from PIL import Image, ImageOps, ImageEnhance
 import io
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+import config
+from utils.image_tiling import StripReader, decoded_size, open_image, open_strip_writer, strip_height
 
 logger = logging.getLogger(__name__)
 
+# Point-wise coordinate maps (x right, y down) of each transpose, used to
+# fold rotations by multiples of 90 degrees and flips into a single transpose
+IDENTITY_MATRIX = ((1, 0), (0, 1))
+TRANSPOSE_MATRICES = {
+    Image.FLIP_LEFT_RIGHT: ((-1, 0), (0, 1)),
+    Image.FLIP_TOP_BOTTOM: ((1, 0), (0, -1)),
+    Image.ROTATE_90: ((0, 1), (-1, 0)),
+    Image.ROTATE_180: ((-1, 0), (0, -1)),
+    Image.ROTATE_270: ((0, -1), (1, 0)),
+    Image.TRANSPOSE: ((0, 1), (1, 0)),
+    Image.TRANSVERSE: ((0, -1), (-1, 0)),
+}
+ROTATE_TRANSPOSES = {90: Image.ROTATE_90, 180: Image.ROTATE_180, 270: Image.ROTATE_270}
+FLIP_TRANSPOSES = {'horizontal': Image.FLIP_LEFT_RIGHT, 'vertical': Image.FLIP_TOP_BOTTOM}
+
+# Modes brightness and contrast can be applied to with a single lookup table
+TONE_CURVE_MODES = ('L', 'RGB', 'RGBA')
+
+# ITU-R 601-2 luma weights, as used by convert('L')
+GRAY_WEIGHTS = (0.299, 0.587, 0.114)
+
+# Minimum ratio between a draft-decoded JPEG and the final resize target
+DRAFT_REDUCING_GAP = 2
+
+# Worker pool shared by all image batches, so concurrent batches queue on one
+# bounded set of processes instead of each starting their own
+_pool_lock = threading.Lock()
+_pool = None
+_pool_workers = None
+
+# Options the strip-by-strip path can apply; the rest need the whole image
+STRIP_OPTIONS = {'quality', 'resize', 'crop', 'brightness', 'contrast', 'filter'}
+
+# Filter support of LANCZOS in source pixels, used as the overlap between strips
+LANCZOS_SUPPORT = 3
+
+# Per-channel lookup table mapping a gray level to its sepia tone
+SEPIA_LUT = (
+    [min(255, int(level * 1.07)) for level in range(256)] +
+    [min(255, int(level * 0.74)) for level in range(256)] +
+    [min(255, int(level * 0.43)) for level in range(256)]
+)
+
 class ImageService:
     """Service for image conversion and processing operations."""
     
-    def __init__(self, temp_dir='temp'):
-        """Initialize image service with temporary directory for processing."""
+    def __init__(self, temp_dir='temp', memory_limit=None, max_pixels=None):
+        """
+        Initialize image service with temporary directory for processing.
+        
+        Args:
+            temp_dir (str): Directory for temporary files
+            memory_limit (int, optional): Decoded image size in bytes above which
+                                          images are processed in strips
+                                          (defaults to IMAGE_MEMORY_LIMIT)
+            max_pixels (int, optional): Pixel count above which images are
+                                        rejected (defaults to IMAGE_MAX_PIXELS)
+        """
         self.temp_dir = temp_dir
+        self.memory_limit = memory_limit or config.Config.IMAGE_MEMORY_LIMIT
+        self.max_pixels = max_pixels or config.Config.IMAGE_MAX_PIXELS
         os.makedirs(temp_dir, exist_ok=True)
     
     def convert_image(self, input_path, output_path, options=None):
@@ -24,31 +86,41 @@ class ImageService:
             options (dict, optional): Processing options like quality, resize, etc.
         """
         try:
-            # Open the image
-            img = Image.open(input_path)
+            # Open the image; only the header is read at this point
+            img = open_image(input_path, self.max_pixels)
+            
+            # Decode large JPEGs at a reduced DCT scale when downscaling
+            draft_size = None
+            if options and options.get('resize') and img.format == 'JPEG':
+                target_size = self._get_resize_target(img.size, options['resize'])
+                if target_size:
+                    draft_size = self._draft_for_size(img, target_size)
+                    # Keep the target computed from the full-size aspect ratio
+                    options = dict(options, resize=target_size)
+            
+            output_format = os.path.splitext(output_path)[1].lower()
+            save_kwargs = self._get_save_kwargs(output_format, options)
+            
+            # Images too large to hold in memory are processed strip by strip
+            if decoded_size(img) > self.memory_limit:
+                img.close()
+                unsupported = set(options or {}) - STRIP_OPTIONS
+                if unsupported:
+                    raise ValueError(
+                        f"Image is too large for options that need the whole image in memory "
+                        f"({', '.join(sorted(unsupported))}); at this size only "
+                        f"{', '.join(sorted(STRIP_OPTIONS))} are supported"
+                    )
+                return self._convert_image_in_strips(input_path, output_path, options, save_kwargs,
+                                                     draft_size=draft_size)
             
             # Apply processing options if provided
             if options:
                 img = self._apply_image_processing(img, options)
             
             # Convert RGBA to RGB if saving as JPEG
-            output_format = os.path.splitext(output_path)[1].lower()
             if output_format in ['.jpg', '.jpeg'] and img.mode == 'RGBA':
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
-                img = background
-            
-            # Set quality for JPG/JPEG
-            save_kwargs = {}
-            if output_format in ['.jpg', '.jpeg']:
-                quality = options.get('quality', 95) if options else 95
-                save_kwargs['quality'] = quality
-                save_kwargs['optimize'] = True
-            elif output_format == '.png':
-                save_kwargs['optimize'] = True
-            elif output_format == '.webp':
-                quality = options.get('quality', 90) if options else 90
-                save_kwargs['quality'] = quality
+                img = self._flatten_alpha(img)
             
             # Save the processed image
             img.save(output_path, **save_kwargs)
@@ -61,10 +133,150 @@ class ImageService:
             logger.error(f"Error converting image: {str(e)}")
             raise
     
+    def _get_save_kwargs(self, output_format, options):
+        """Return Image.save arguments for an output extension such as '.jpg'."""
+        # Set quality for JPG/JPEG
+        save_kwargs = {}
+        if output_format in ['.jpg', '.jpeg']:
+            quality = options.get('quality', 95) if options else 95
+            save_kwargs['quality'] = quality
+            save_kwargs['optimize'] = True
+        elif output_format == '.png':
+            save_kwargs['optimize'] = True
+        elif output_format == '.webp':
+            quality = options.get('quality', 90) if options else 90
+            save_kwargs['quality'] = quality
+        return save_kwargs
+    
+    def _flatten_alpha(self, img):
+        """Composite an RGBA image onto white, for formats without transparency."""
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
+        return background
+    
+    def _convert_image_in_strips(self, input_path, output_path, options, save_kwargs, draft_size=None, watermark=None):
+        """
+        Convert an image a horizontal strip at a time.
+        
+        Used for images whose decoded size exceeds memory_limit. Each strip is
+        sized so that it and its intermediate copies fit in memory_limit;
+        uncompressed sources are only ever decoded a strip at a time and PNG
+        output is written as it is produced. Supports the STRIP_OPTIONS and
+        matches the whole-image path to within a rounding step: strips are
+        read with enough overlap for the LANCZOS filter and the contrast
+        pivot comes from a histogram of the whole image.
+        
+        Args:
+            input_path (str): Path to the input image file
+            output_path (str): Path where the converted image will be saved
+            options (dict): Processing options, limited to STRIP_OPTIONS
+            save_kwargs (dict): Arguments for Image.save
+            draft_size (tuple, optional): Reduced JPEG decode size, see _draft_for_size
+            watermark (tuple, optional): (RGBA patch, (x, y)) to composite onto the output
+        
+        Returns:
+            str: Path to the converted image
+        """
+        options = options or {}
+        output_format = os.path.splitext(output_path)[1].lower()
+        
+        with StripReader(input_path, draft_size, self.memory_limit, self.max_pixels) as reader:
+            source_width, source_height = reader.size
+            work_mode = reader.mode if reader.mode in TONE_CURVE_MODES else ('RGBA' if reader.has_alpha else 'RGB')
+            
+            # Output geometry, as _plan_image_processing would compute it
+            target_size = reader.size
+            if options.get('resize'):
+                target_size = self._get_resize_target(reader.size, options['resize']) or reader.size
+            crop_box = tuple(options['crop']) if 'crop' in options else (0, 0) + target_size
+            if not self._box_within(crop_box, target_size):
+                raise ValueError(f"Crop box {crop_box} lies outside the {target_size[0]}x{target_size[1]} image")
+            
+            left, top, right, bottom = crop_box
+            scale_x = source_width / target_size[0]
+            scale_y = source_height / target_size[1]
+            source_box = (left * scale_x, top * scale_y, right * scale_x, bottom * scale_y)
+            output_size = (right - left, bottom - top)
+            resample = target_size != reader.size
+            
+            # Overlap between strips so the filter sees the same neighbours
+            overlap = int(LANCZOS_SUPPORT * max(scale_y, 1)) + 2 if resample else 0
+            source_rows = strip_height(source_width, reader.mode, self.memory_limit)
+            output_rows = max(1, int((source_rows - 2 * overlap) / scale_y))
+            
+            def read_strip(output_top, output_bottom):
+                source_top = source_box[1] + output_top * scale_y
+                source_bottom = source_box[1] + output_bottom * scale_y
+                read_top = max(0, math.floor(source_top) - overlap)
+                read_bottom = min(source_height, math.ceil(source_bottom) + overlap)
+                strip = reader.read(read_top, read_bottom)
+                if strip.mode != work_mode:
+                    strip = strip.convert(work_mode)
+                box = (source_box[0], source_top - read_top, source_box[2], source_bottom - read_top)
+                if resample:
+                    return strip.resize((output_size[0], output_bottom - output_top), Image.LANCZOS, box=box)
+                return strip.crop(tuple(int(value) for value in box))
+            
+            strips = [
+                (output_top, min(output_size[1], output_top + output_rows))
+                for output_top in range(0, output_size[1], output_rows)
+            ]
+            
+            # The contrast pivot depends on the whole image
+            brightness = options.get('brightness', 1.0)
+            contrast = options.get('contrast', 1.0)
+            histogram = None
+            if contrast != 1.0:
+                histogram = [0] * (256 * len(work_mode))
+                for output_top, output_bottom in strips:
+                    strip_histogram = read_strip(output_top, output_bottom).histogram()
+                    histogram = [total + count for total, count in zip(histogram, strip_histogram)]
+            
+            writer = None
+            try:
+                for output_top, output_bottom in strips:
+                    strip = read_strip(output_top, output_bottom)
+                    
+                    # Adjustments
+                    if brightness != 1.0 or contrast != 1.0:
+                        strip = self._apply_tone_curve(strip, brightness, contrast, histogram)
+                    
+                    # Filters
+                    filter_type = options.get('filter')
+                    if filter_type == 'grayscale':
+                        strip = ImageOps.grayscale(strip)
+                    elif filter_type == 'sepia':
+                        strip = self._apply_sepia(strip)
+                    elif filter_type == 'negative':
+                        strip = ImageOps.invert(strip)
+                    
+                    if watermark:
+                        strip = strip.convert('RGBA')
+                        patch, (x, y) = watermark
+                        self._composite_patch(strip, patch, (x, y - output_top))
+                        if output_format in ['.jpg', '.jpeg']:
+                            strip = strip.convert('RGB')
+                    elif output_format in ['.jpg', '.jpeg'] and strip.mode == 'RGBA':
+                        strip = self._flatten_alpha(strip)
+                    
+                    if writer is None:
+                        writer = open_strip_writer(output_path, output_size, strip.mode, save_kwargs, self.memory_limit)
+                    writer.write(strip)
+            finally:
+                if writer is not None:
+                    writer.close()
+        
+        logger.info(f"Image converted in {len(strips)} strips and saved to {output_path}")
+        
+        return output_path
+    
     def _apply_image_processing(self, img, options):
         """
         Apply various image processing operations.
         
+        The options are planned into as few passes as possible first (see
+        _plan_image_processing), then run in order.
+        
         Args:
             img (PIL.Image): Image to process
             options (dict): Processing options
@@ -72,67 +284,207 @@ class ImageService:
         Returns:
             PIL.Image: Processed image
         """
-        # Resize
-        if 'resize' in options:
-            width, height = options['resize']
-            if width and height:
-                img = img.resize((width, height), Image.LANCZOS)
-            elif width:
-                # Calculate height to maintain aspect ratio
-                wpercent = width / float(img.size[0])
-                hsize = int(float(img.size[1]) * float(wpercent))
-                img = img.resize((width, hsize), Image.LANCZOS)
-            elif height:
-                # Calculate width to maintain aspect ratio
-                hpercent = height / float(img.size[1])
-                wsize = int(float(img.size[0]) * float(hpercent))
-                img = img.resize((wsize, height), Image.LANCZOS)
-        
-        # Crop
-        if 'crop' in options:
-            left, top, right, bottom = options['crop']
-            img = img.crop((left, top, right, bottom))
-        
-        # Rotate
-        if 'rotate' in options:
-            angle = options['rotate']
-            img = img.rotate(angle, expand=True, resample=Image.BICUBIC)
-        
-        # Flip
-        if 'flip' in options:
-            flip_mode = options['flip']
-            if flip_mode == 'horizontal':
-                img = ImageOps.mirror(img)
-            elif flip_mode == 'vertical':
-                img = ImageOps.flip(img)
+        steps = self._plan_image_processing(img, options)
         
-        # Adjustments
-        if 'brightness' in options:
-            factor = options['brightness']
-            enhancer = ImageEnhance.Brightness(img)
-            img = enhancer.enhance(factor)
+        allocations = 0
+        for _, step, step_allocations in steps:
+            img = step(img)
+            allocations += step_allocations
+        
+        logger.debug(
+            f"Image processing: {len(steps)} passes, {allocations} allocations "
+            f"({', '.join(name for name, _, _ in steps) or 'no-op'})"
+        )
+        
+        return img
+    
+    def _plan_image_processing(self, img, options):
+        """
+        Plan processing options as a list of fused passes.
+        
+        The result is the same as running resize, crop, rotate, flip,
+        brightness, contrast, sharpness and filter one after another, except:
+        
+        - crop is folded into the resize, so only the kept region is resampled
+        - right-angle rotation and flip become a single transpose
+        - brightness and contrast become a single lookup table
+        - options that would not change the image are dropped
+        
+        Args:
+            img (PIL.Image): Image the plan will run on
+            options (dict): Processing options
+        
+        Returns:
+            list: (name, callable, allocations) tuples in execution order
+        """
+        steps = []
+        size = img.size
+        
+        # Resize and crop; the crop box is given in resized coordinates
+        target_size = None
+        if options.get('resize'):
+            target_size = self._get_resize_target(size, options['resize'])
+            if target_size == size:
+                target_size = None
+        
+        crop_box = tuple(options['crop']) if 'crop' in options else None
+        
+        if target_size and crop_box and self._box_within(crop_box, target_size):
+            # Resample only the source region that ends up in the crop
+            left, top, right, bottom = crop_box
+            scale_x = size[0] / target_size[0]
+            scale_y = size[1] / target_size[1]
+            source_box = (left * scale_x, top * scale_y, right * scale_x, bottom * scale_y)
+            crop_size = (right - left, bottom - top)
+            steps.append(('crop+resize', lambda im: im.resize(crop_size, Image.LANCZOS, box=source_box), 1))
+        else:
+            if target_size:
+                steps.append(('resize', lambda im: im.resize(target_size, Image.LANCZOS), 1))
+                size = target_size
+            if crop_box and crop_box != (0, 0) + size:
+                steps.append(('crop', lambda im: im.crop(crop_box), 1))
         
-        if 'contrast' in options:
-            factor = options['contrast']
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(factor)
+        # Rotate and flip
+        matrix = IDENTITY_MATRIX
+        angle = options.get('rotate')
+        if angle and angle % 90 == 0:
+            matrix = TRANSPOSE_MATRICES[ROTATE_TRANSPOSES[angle % 360]] if angle % 360 else IDENTITY_MATRIX
+        elif angle:
+            steps.append(('rotate', lambda im: im.rotate(angle, expand=True, resample=Image.BICUBIC), 1))
         
-        if 'sharpness' in options:
-            factor = options['sharpness']
-            enhancer = ImageEnhance.Sharpness(img)
-            img = enhancer.enhance(factor)
+        flip = options.get('flip')
+        if flip in FLIP_TRANSPOSES:
+            matrix = _multiply_matrices(TRANSPOSE_MATRICES[FLIP_TRANSPOSES[flip]], matrix)
+        
+        if matrix != IDENTITY_MATRIX:
+            method = next(method for method, m in TRANSPOSE_MATRICES.items() if m == matrix)
+            steps.append(('transpose', lambda im: im.transpose(method), 1))
+        
+        # Adjustments
+        brightness = options.get('brightness', 1.0)
+        contrast = options.get('contrast', 1.0)
+        if brightness != 1.0 or contrast != 1.0:
+            if img.mode in TONE_CURVE_MODES:
+                steps.append(('brightness+contrast', lambda im: self._apply_tone_curve(im, brightness, contrast), 1))
+            else:
+                if brightness != 1.0:
+                    steps.append(('brightness', lambda im: ImageEnhance.Brightness(im).enhance(brightness), 2))
+                if contrast != 1.0:
+                    steps.append(('contrast', lambda im: ImageEnhance.Contrast(im).enhance(contrast), 3))
+        
+        sharpness = options.get('sharpness', 1.0)
+        if sharpness != 1.0:
+            steps.append(('sharpness', lambda im: ImageEnhance.Sharpness(im).enhance(sharpness), 2))
         
         # Filters
-        if 'filter' in options:
-            filter_type = options['filter']
-            if filter_type == 'grayscale':
-                img = ImageOps.grayscale(img)
-            elif filter_type == 'sepia':
-                img = self._apply_sepia(img)
-            elif filter_type == 'negative':
-                img = ImageOps.invert(img)
+        filter_type = options.get('filter')
+        if filter_type == 'grayscale':
+            steps.append(('grayscale', ImageOps.grayscale, 1))
+        elif filter_type == 'sepia':
+            steps.append(('sepia', self._apply_sepia, 3 if img.mode == 'RGB' else 4))
+        elif filter_type == 'negative':
+            steps.append(('negative', ImageOps.invert, 1))
         
-        return img
+        return steps
+    
+    def _box_within(self, box, size):
+        """Check that a crop box is non-empty and lies inside an image of the given size."""
+        left, top, right, bottom = box
+        return 0 <= left < right <= size[0] and 0 <= top < bottom <= size[1]
+    
+    def _apply_tone_curve(self, img, brightness, contrast, histogram=None):
+        """
+        Apply brightness and then contrast with one lookup table.
+        
+        Produces the same levels as ImageEnhance.Brightness followed by
+        ImageEnhance.Contrast. The contrast pivot (the mean gray level of the
+        brightened image) is taken from the histogram instead of a converted
+        copy, so it can differ from ImageEnhance by a rounding step.
+        
+        Args:
+            img (PIL.Image): Image in L, RGB or RGBA mode
+            brightness (float): Brightness factor, 1.0 leaves the image unchanged
+            contrast (float): Contrast factor, 1.0 leaves the image unchanged
+            histogram (list, optional): Histogram to take the contrast pivot
+                                        from instead of img's own, for images
+                                        processed in strips
+        
+        Returns:
+            PIL.Image: Adjusted image
+        """
+        def blend(base, level, factor):
+            # Same single-precision arithmetic and clamping as Image.blend
+            factor = _to_float32(factor)
+            return max(0, min(255, int(_to_float32(base + _to_float32(factor * (level - base))))))
+        
+        brighten = [blend(0, level, brightness) for level in range(256)]
+        
+        bands = img.getbands()
+        color_bands = [index for index, band in enumerate(bands) if band != 'A']
+        
+        if contrast != 1.0:
+            # Mean gray level after brightening, from the per-band histograms
+            histogram = histogram or img.histogram()
+            pixel_count = sum(histogram[:256])
+            band_means = []
+            for index in color_bands:
+                counts = histogram[index * 256:(index + 1) * 256]
+                band_means.append(sum(count * brighten[level] for level, count in enumerate(counts)) / pixel_count)
+            
+            gray_mean = band_means[0] if len(band_means) == 1 else sum(
+                weight * band_mean for weight, band_mean in zip(GRAY_WEIGHTS, band_means)
+            )
+            mean = int(gray_mean + 0.5)
+            curve = [blend(mean, brighten[level], contrast) for level in range(256)]
+        else:
+            curve = brighten
+        
+        # Alpha is left untouched, as ImageEnhance does
+        table = []
+        for index in range(len(bands)):
+            table.extend(curve if index in color_bands else range(256))
+        
+        return img.point(table)
+    
+    def _get_resize_target(self, size, resize):
+        """
+        Work out the output size for a resize option.
+        
+        Args:
+            size (tuple): Current image size (width, height)
+            resize (tuple): Requested (width, height); either may be None to
+                            keep the aspect ratio
+        
+        Returns:
+            tuple: Target size, or None if neither dimension was given
+        """
+        width, height = resize
+        if width and height:
+            return (width, height)
+        elif width:
+            # Calculate height to maintain aspect ratio
+            wpercent = width / float(size[0])
+            return (width, int(float(size[1]) * float(wpercent)))
+        elif height:
+            # Calculate width to maintain aspect ratio
+            hpercent = height / float(size[1])
+            return (int(float(size[0]) * float(hpercent)), height)
+        return None
+    
+    def _draft_for_size(self, img, target_size):
+        """
+        Ask the JPEG decoder for a reduced-scale decode (1/2, 1/4 or 1/8).
+        
+        The scale is chosen so the decoded image is still at least twice the
+        target size, leaving the final LANCZOS pass to do the actual filtering.
+        Must be called before the image is loaded; other formats are unaffected.
+        
+        Returns:
+            tuple: Size passed to Image.draft
+        """
+        draft_size = (target_size[0] * DRAFT_REDUCING_GAP, target_size[1] * DRAFT_REDUCING_GAP)
+        img.draft(None, draft_size)
+        return draft_size
     
     def _apply_sepia(self, img):
         """Apply sepia filter to image."""
@@ -142,19 +494,10 @@ class ImageService:
         # Convert to grayscale
         gray = ImageOps.grayscale(img)
         
-        # Apply sepia tone
-        result = Image.new('RGB', gray.size)
-        for x in range(gray.width):
-            for y in range(gray.height):
-                gray_px = gray.getpixel((x, y))
-                r = min(255, int(gray_px * 1.07))
-                g = min(255, int(gray_px * 0.74))
-                b = min(255, int(gray_px * 0.43))
-                result.putpixel((x, y), (r, g, b))
-        
-        return result
+        # Apply sepia tone with one lookup table per channel, in a single pass
+        return gray.convert('RGB').point(SEPIA_LUT)
     
-    def batch_process_images(self, input_paths, output_dir, format, options=None):
+    def batch_process_images(self, input_paths, output_dir, format, options=None, workers=1, max_in_flight=None):
         """
         Process multiple images with the same options.
         
@@ -163,29 +506,94 @@ class ImageService:
             output_dir (str): Directory where converted images will be saved
             format (str): Output format (jpg, png, etc.)
             options (dict, optional): Processing options
+            workers (int, optional): Worker processes to convert with (see batch_convert_images)
+            max_in_flight (int, optional): Maximum number of images submitted at once
         
         Returns:
-            list: List of paths to converted images
+            list: List of paths to converted images, in input order
         """
         os.makedirs(output_dir, exist_ok=True)
         
-        output_paths = []
+        jobs = []
         for input_path in input_paths:
+            # Generate output filename
+            filename = os.path.basename(input_path)
+            name, _ = os.path.splitext(filename)
+            jobs.append((input_path, os.path.join(output_dir, f"{name}.{format}")))
+        
+        output_paths = []
+        for result in self.batch_convert_images(jobs, options, workers, max_in_flight):
+            if result['error']:
+                # Continue with other images even if one fails
+                logger.error(f"Error processing image {result['input_path']}: {result['error']}")
+            else:
+                output_paths.append(result['output_path'])
+        
+        return output_paths
+    
+    def batch_convert_images(self, jobs, options=None, workers=None, max_in_flight=None):
+        """
+        Convert many images, in parallel on the shared image pool when workers > 1.
+        
+        At most max_in_flight images are submitted to the pool at a time, so
+        memory stays flat however long the batch is.
+        
+        Args:
+            jobs (iterable): (input_path, output_path) pairs
+            options (dict, optional): Processing options applied to every image
+            workers (int, optional): Worker processes of the shared pool, see
+                                     get_image_pool; defaults to
+                                     IMAGE_BATCH_WORKERS. 1 converts in the
+                                     current process
+            max_in_flight (int, optional): Maximum number of images submitted at
+                                           once, defaults to twice the workers
+        
+        Returns:
+            list: One dict per job in input order, with 'input_path',
+                  'output_path' (None on failure) and 'error' (None on success)
+        """
+        jobs = list(jobs)
+        results = [None] * len(jobs)
+        workers = workers or config.Config.IMAGE_BATCH_WORKERS
+        
+        if workers == 1 or len(jobs) <= 1:
+            for index, (input_path, output_path) in enumerate(jobs):
+                results[index] = _convert_image_job(self.temp_dir, input_path, output_path, options)
+            return results
+        
+        max_in_flight = max(workers, max_in_flight or workers * 2)
+        
+        def collect(future, index):
             try:
-                # Generate output filename
-                filename = os.path.basename(input_path)
-                name, _ = os.path.splitext(filename)
-                output_path = os.path.join(output_dir, f"{name}.{format}")
-                
-                # Convert image
-                self.convert_image(input_path, output_path, options)
-                output_paths.append(output_path)
-                
+                results[index] = future.result()
             except Exception as e:
+                # The worker itself died, e.g. killed for running out of memory
+                input_path, _ = jobs[index]
                 logger.error(f"Error processing image {input_path}: {str(e)}")
-                # Continue with other images even if one fails
+                results[index] = {'input_path': input_path, 'output_path': None, 'error': str(e)}
+                if isinstance(e, BrokenProcessPool):
+                    _discard_image_pool(pool)
         
-        return output_paths
+        pool = get_image_pool(workers)
+        in_flight = {}
+        for index, (input_path, output_path) in enumerate(jobs):
+            try:
+                future = pool.submit(_convert_image_job, self.temp_dir, input_path, output_path, options)
+            except BrokenProcessPool as e:
+                results[index] = {'input_path': input_path, 'output_path': None, 'error': str(e)}
+                continue
+            in_flight[future] = index
+            
+            # Wait for a slot before submitting more
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future, in_flight.pop(future))
+        
+        for future in as_completed(in_flight):
+            collect(future, in_flight[future])
+        
+        return results
     
     def create_thumbnail(self, input_path, output_path, size=(200, 200)):
         """
@@ -203,8 +611,8 @@ class ImageService:
             # Open the image
             img = Image.open(input_path)
             
-            # Create thumbnail
-            img.thumbnail(size, Image.LANCZOS)
+            # Create thumbnail; reducing_gap also makes JPEGs decode at a reduced DCT scale
+            img.thumbnail(size, Image.LANCZOS, reducing_gap=DRAFT_REDUCING_GAP)
             
             # Convert RGBA to RGB if saving as JPEG
             output_format = os.path.splitext(output_path)[1].lower()
@@ -237,49 +645,25 @@ class ImageService:
             str: Path to the watermarked image
         """
         try:
-            # Open the image
-            img = Image.open(input_path)
-            
-            # Create a transparent text layer
-            from PIL import ImageDraw, ImageFont
-            
-            # Create a blank image for the text
-            txt = Image.new('RGBA', img.size, (255, 255, 255, 0))
+            # Open the image; only the header is read at this point
+            img = open_image(input_path, self.max_pixels)
             
-            # Get a font
-            try:
-                font = ImageFont.truetype('arial.ttf', 36)
-            except IOError:
-                # Fallback to default font
-                font = ImageFont.load_default()
-            
-            # Get a drawing context
-            d = ImageDraw.Draw(txt)
-            
-            # Calculate position
-            w, h = d.textsize(watermark_text, font)
-            x, y = 0, 0
+            # Render the text onto a patch the size of the text only
+            watermark = self._render_watermark(watermark_text, img.size, position, opacity)
             
-            if position == 'center':
-                x = (img.width - w) // 2
-                y = (img.height - h) // 2
-            elif position == 'topleft':
-                x, y = 10, 10
-            elif position == 'topright':
-                x, y = img.width - w - 10, 10
-            elif position == 'bottomleft':
-                x, y = 10, img.height - h - 10
-            elif position == 'bottomright':
-                x, y = img.width - w - 10, img.height - h - 10
+            output_format = os.path.splitext(output_path)[1].lower()
             
-            # Draw text with semi-transparency
-            d.text((x, y), watermark_text, fill=(0, 0, 0, int(255 * opacity)), font=font)
+            # Images too large to hold in memory are watermarked strip by strip
+            if decoded_size(img) > self.memory_limit:
+                img.close()
+                return self._convert_image_in_strips(input_path, output_path, None, {}, watermark=watermark)
             
-            # Combine the image with the watermark
-            watermarked = Image.alpha_composite(img.convert('RGBA'), txt)
+            # Combine the image with the watermark, touching only the text area
+            watermarked = img.convert('RGBA')
+            patch, (x, y) = watermark
+            self._composite_patch(watermarked, patch, (x, y))
             
             # Convert RGBA to RGB if saving as JPEG
-            output_format = os.path.splitext(output_path)[1].lower()
             if output_format in ['.jpg', '.jpeg']:
                 watermarked = watermarked.convert('RGB')
             
@@ -290,4 +674,123 @@ class ImageService:
             
         except Exception as e:
             logger.error(f"Error adding watermark: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def _render_watermark(self, watermark_text, image_size, position, opacity):
+        """
+        Draw watermark text onto a transparent patch just big enough for it.
+        
+        Args:
+            watermark_text (str): Text to use as watermark
+            image_size (tuple): Size of the image being watermarked
+            position (str): Position of watermark ('center', 'topleft', etc.)
+            opacity (float): Opacity of watermark (0-1)
+        
+        Returns:
+            tuple: (RGBA patch, (x, y)) where (x, y) is the patch position on the image
+        """
+        from PIL import ImageDraw, ImageFont
+        
+        # Get a font
+        try:
+            font = ImageFont.truetype('arial.ttf', 36)
+        except IOError:
+            # Fallback to default font
+            font = ImageFont.load_default()
+        
+        # Text extent measured from the drawing origin
+        _, _, w, h = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), watermark_text, font=font)
+        width, height = image_size
+        x, y = 0, 0
+        
+        if position == 'center':
+            x = (width - w) // 2
+            y = (height - h) // 2
+        elif position == 'topleft':
+            x, y = 10, 10
+        elif position == 'topright':
+            x, y = width - w - 10, 10
+        elif position == 'bottomleft':
+            x, y = 10, height - h - 10
+        elif position == 'bottomright':
+            x, y = width - w - 10, height - h - 10
+        
+        # Draw text with semi-transparency
+        patch = Image.new('RGBA', (max(1, w), max(1, h)), (255, 255, 255, 0))
+        ImageDraw.Draw(patch).text((0, 0), watermark_text, fill=(0, 0, 0, int(255 * opacity)), font=font)
+        
+        return patch, (x, y)
+    
+    def _composite_patch(self, img, patch, position):
+        """Alpha-composite patch onto an RGBA image in place, clipped to the image."""
+        x, y = position
+        left, top = max(0, -x), max(0, -y)
+        right, bottom = min(patch.width, img.width - x), min(patch.height, img.height - y)
+        if left < right and top < bottom:
+            img.alpha_composite(patch, dest=(x + left, y + top), source=(left, top, right, bottom))
+
+def get_image_pool(workers=None):
+    """
+    Return the shared image batch pool, starting it on first use.
+    
+    The pool is kept between calls, so its workers start once per process
+    and batches that arrive together share IMAGE_BATCH_WORKERS processes. A
+    call with another worker count replaces the pool.
+    
+    Args:
+        workers (int, optional): Worker processes, defaults to IMAGE_BATCH_WORKERS
+    
+    Returns:
+        ProcessPoolExecutor: The pool
+    """
+    global _pool, _pool_workers
+    
+    workers = workers or config.Config.IMAGE_BATCH_WORKERS
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                # Images already submitted to the old pool still finish
+                _pool.shutdown(wait=False)
+            logger.info(f"Starting image pool: {workers} workers")
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+def shutdown_image_pool():
+    """Stop the shared image batch pool; the next call starts a new one."""
+    global _pool, _pool_workers
+    
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool = None
+        _pool_workers = None
+
+def _discard_image_pool(pool):
+    """Drop a pool whose worker died, so the next batch starts a working one."""
+    global _pool, _pool_workers
+    
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            _pool_workers = None
+    pool.shutdown(wait=False)
+
+def _convert_image_job(temp_dir, input_path, output_path, options):
+    """Convert a single batch image; runs in a pool worker process."""
+    try:
+        ImageService(temp_dir).convert_image(input_path, output_path, options)
+        return {'input_path': input_path, 'output_path': output_path, 'error': None}
+    except Exception as e:
+        return {'input_path': input_path, 'output_path': None, 'error': str(e)}
+
+def _multiply_matrices(a, b):
+    """Compose two 2x2 coordinate maps; the result applies b first, then a."""
+    return tuple(
+        tuple(sum(a[row][k] * b[k][col] for k in range(2)) for col in range(2))
+        for row in range(2)
+    )
+
+def _to_float32(value):
+    """Round a Python float to single precision."""
+    return struct.unpack('f', struct.pack('f', value))[0]
\ No newline at end of file
@@ -1,17 +1,52 @@
 # services/ocr_service.py
 import os
+import io
 import logging
 import tempfile
 import shutil
+import threading
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import config
+from utils.capabilities import get_registry
+from utils.workspace import get_workspace_dir
+from utils.ocr_cache import OCRCache, get_ocr_cache
 
 logger = logging.getLogger(__name__)
 
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# Pages per pool task, per worker: a few tasks each keeps the workers busy
+# when some pages take longer than others
+OCR_TASKS_PER_WORKER = 4
+
+# Worker pool shared by all OCR calls, so workers and the language models
+# they loaded stay warm between documents
+_pool_lock = threading.Lock()
+_pool = None
+_pool_key = None
+
+# Tesseract engines of this process by language, one set per thread
+_engines = threading.local()
+
 class OCRService:
     """Service for OCR (Optical Character Recognition) operations."""
     
-    def __init__(self, temp_dir='temp'):
-        """Initialize OCR service with temporary directory for processing."""
+    def __init__(self, temp_dir='temp', cache=None):
+        """
+        Initialize OCR service with temporary directory for processing.
+        
+        Args:
+            temp_dir (str): Directory for temporary and output files
+            cache (OCRCache, optional): Cache of recognized pages, defaults to
+                                        the one configured in config.Config
+        """
         self.temp_dir = temp_dir
+        self.cache = cache if cache is not None else get_ocr_cache()
         os.makedirs(temp_dir, exist_ok=True)
         self.has_tesseract = self._check_tesseract()
     
@@ -19,34 +54,51 @@ class OCRService:
         """Check if Tesseract OCR is available."""
         try:
             import pytesseract
-            return True
         except ImportError:
             logger.warning("pytesseract is not installed. OCR functionality will be limited.")
             return False
+        
+        tesseract_path = get_registry().path('tesseract')
+        if not tesseract_path:
+            logger.warning("Tesseract is not installed. OCR functionality will be limited.")
+            return False
+        
+        # Use the binary the registry found instead of a PATH lookup per call
+        pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        return True
     
-    def perform_ocr(self, input_path, output_format='pdf', language='eng'):
+    def perform_ocr(self, input_path, output_format='pdf', language='eng', report=None):
         """
         Perform OCR on an image or PDF file.
         
+        PDF pages that already have a text layer are not recognized again;
+        their text is extracted instead.
+        
         Args:
             input_path (str): Path to the input file
             output_format (str): Output format ('pdf' or 'txt')
             language (str): OCR language code
+            report (dict, optional): Filled with the page counts of a PDF:
+                                     'pages', 'ocr_pages' and 'skipped_pages';
+                                     'fallback' is set when the result is a
+                                     notice, an error message or a copy of
+                                     the input instead of recognized text
         
         Returns:
             str: Path to the OCR result file
         """
         if not self.has_tesseract:
             logger.warning("OCR attempted but Tesseract is not available")
+            _report_fallback(report)
             # Create a simple output file indicating OCR is not available
             if output_format == 'txt':
-                output_path = os.path.join(self.temp_dir, f"ocr_result_{os.path.basename(input_path)}.txt")
+                output_path = os.path.join(get_workspace_dir(self.temp_dir), f"ocr_result_{os.path.basename(input_path)}.txt")
                 with open(output_path, 'w') as f:
                     f.write("OCR is not available. Please install pytesseract.")
                 return output_path
             else:
                 # Just copy the original file for PDF format
-                output_path = os.path.join(self.temp_dir, f"ocr_result_{os.path.basename(input_path)}")
+                output_path = os.path.join(get_workspace_dir(self.temp_dir), f"ocr_result_{os.path.basename(input_path)}")
                 shutil.copy(input_path, output_path)
                 return output_path
         
@@ -60,63 +112,39 @@ class OCRService:
             if is_pdf:
                 # For PDFs, we need to convert to images first
                 try:
-                    import fitz  # PyMuPDF
-                    pdf = fitz.open(input_path)
-                    
-                    # Process each page
-                    text_results = []
-                    for page_num in range(len(pdf)):
-                        page = pdf.load_page(page_num)
-                        pix = page.get_pixmap()
-                        
-                        # Save as temporary image
-                        img_path = os.path.join(self.temp_dir, f"ocr_temp_{page_num}.png")
-                        pix.save(img_path)
-                        
-                        # Perform OCR on the image
-                        text = pytesseract.image_to_string(Image.open(img_path), lang=language)
-                        text_results.append(text)
-                        
-                        # Clean up
-                        os.remove(img_path)
-                    
-                    # Create output based on format
+                    # Process each page, in parallel for multi-page documents
                     if output_format == 'txt':
-                        output_path = os.path.join(self.temp_dir, f"ocr_result_{os.path.basename(input_path)}.txt")
+                        text_results = self._ocr_pdf_pages(input_path, language, report=report)
+                        output_path = os.path.join(get_workspace_dir(self.temp_dir), f"ocr_result_{os.path.basename(input_path)}.txt")
                         with open(output_path, 'w') as f:
                             f.write('\n\n'.join(text_results))
                     else:  # PDF
-                        # Create a searchable PDF
-                        from fpdf import FPDF
-                        output_path = os.path.join(self.temp_dir, f"ocr_result_{os.path.basename(input_path)}")
-                        pdf_out = FPDF()
-                        for text in text_results:
-                            pdf_out.add_page()
-                            pdf_out.set_font("Arial", size=12)
-                            pdf_out.multi_cell(0, 10, text)
-                        pdf_out.output(output_path)
+                        # Keep the original pages and add an invisible text layer to the scans
+                        output_path = os.path.join(get_workspace_dir(self.temp_dir), f"ocr_result_{os.path.basename(input_path)}")
+                        self._make_searchable_pdf(input_path, output_path, language, report=report)
                 
                 except ImportError:
                     logger.warning("PyMuPDF not available for PDF processing")
                     # Fall back to processing just the first page
+                    _report_fallback(report)
                     try:
                         from pdf2image import convert_from_path
                         images = convert_from_path(input_path, first_page=1, last_page=1)
                         text = pytesseract.image_to_string(images[0], lang=language)
                         
                         if output_format == 'txt':
-                            output_path = os.path.join(self.temp_dir, f"ocr_result_{os.path.basename(input_path)}.txt")
+                            output_path = os.path.join(get_workspace_dir(self.temp_dir), f"ocr_result_{os.path.basename(input_path)}.txt")
                             with open(output_path, 'w') as f:
                                 f.write(text)
                         else:
                             # Just copy the original PDF as we can't create a searchable PDF without PyMuPDF
-                            output_path = os.path.join(self.temp_dir, f"ocr_result_{os.path.basename(input_path)}")
+                            output_path = os.path.join(get_workspace_dir(self.temp_dir), f"ocr_result_{os.path.basename(input_path)}")
                             shutil.copy(input_path, output_path)
                     
                     except ImportError:
                         logger.warning("pdf2image not available for PDF processing")
                         # No PDF conversion libraries, return a message
-                        output_path = os.path.join(self.temp_dir, "ocr_error.txt")
+                        output_path = os.path.join(get_workspace_dir(self.temp_dir), "ocr_error.txt")
                         with open(output_path, 'w') as f:
                             f.write("PDF OCR requires either PyMuPDF or pdf2image.")
             
@@ -125,13 +153,13 @@ class OCRService:
                 text = pytesseract.image_to_string(Image.open(input_path), lang=language)
                 
                 if output_format == 'txt':
-                    output_path = os.path.join(self.temp_dir, f"ocr_result_{os.path.basename(input_path)}.txt")
+                    output_path = os.path.join(get_workspace_dir(self.temp_dir), f"ocr_result_{os.path.basename(input_path)}.txt")
                     with open(output_path, 'w') as f:
                         f.write(text)
                 else:
                     # Create a PDF with the text
                     from fpdf import FPDF
-                    output_path = os.path.join(self.temp_dir, f"ocr_result_{os.path.basename(input_path)}.pdf")
+                    output_path = os.path.join(get_workspace_dir(self.temp_dir), f"ocr_result_{os.path.basename(input_path)}.pdf")
                     pdf = FPDF()
                     pdf.add_page()
                     pdf.set_font("Arial", size=12)
@@ -142,8 +170,488 @@ class OCRService:
         
         except Exception as e:
             logger.error(f"Error performing OCR: {str(e)}")
+            _report_fallback(report)
             # Create an error output file
-            output_path = os.path.join(self.temp_dir, "ocr_error.txt")
+            output_path = os.path.join(get_workspace_dir(self.temp_dir), "ocr_error.txt")
             with open(output_path, 'w') as f:
                 f.write(f"OCR processing error: {str(e)}")
-            return output_path
\ No newline at end of file
+            return output_path
+    
+    def _ocr_pdf_pages(self, input_path, language='eng', workers=None, dpi=None, grayscale=None, report=None):
+        """
+        Get the text of every page of a PDF, recognizing scanned pages with OCR.
+        
+        Pages are classified first (see _classify_page): born-digital pages
+        keep their extracted text and only scanned pages go to Tesseract.
+        
+        Tesseract recognizes one page on a single core, so pages are split into
+        contiguous runs and recognized by separate worker processes. Each
+        worker limits Tesseract's OpenMP threads (OMP_THREAD_LIMIT) to its share
+        of the cores, so the pool never runs more threads than there are CPUs.
+        
+        Args:
+            input_path (str): Path to the input PDF file
+            language (str): OCR language code
+            workers (int, optional): Worker processes, defaults to OCR_WORKERS;
+                                     1 recognizes the pages in this process
+            dpi (int, optional): Render resolution, defaults to OCR_DPI
+            grayscale (bool, optional): Render in grayscale, defaults to OCR_GRAYSCALE
+            report (dict, optional): Filled with 'pages', 'ocr_pages' and 'skipped_pages'
+        
+        Returns:
+            list: Text of each page, in page order
+        """
+        text_results, ocr_pages = self._classify_pages(input_path, report)
+        
+        recognized = self._recognize_pages(input_path, ocr_pages, language, workers, dpi, grayscale)
+        for page_num, text in zip(ocr_pages, recognized):
+            text_results[page_num] = text
+        return text_results
+    
+    def _make_searchable_pdf(self, input_path, output_path, language='eng', workers=None, dpi=None,
+                             grayscale=None, report=None):
+        """
+        Add an invisible OCR text layer to the scanned pages of a PDF.
+        
+        The original pages, images included, are kept as they are. Each
+        recognized word is positioned over the page image in invisible text
+        (see _text_layer), so the output can be searched and copied from. Pages
+        are recognized in parallel and each page's layer is stamped onto its
+        page as soon as it arrives, so time and size grow linearly with the
+        number of scanned pages.
+        
+        Args:
+            input_path (str): Path to the input PDF file
+            output_path (str): Path where the searchable PDF will be saved
+            language (str): OCR language code
+            workers (int, optional): Worker processes, defaults to OCR_WORKERS
+            dpi (int, optional): Render resolution, defaults to OCR_DPI
+            grayscale (bool, optional): Render in grayscale, defaults to OCR_GRAYSCALE
+            report (dict, optional): Filled with 'pages', 'ocr_pages' and 'skipped_pages'
+        
+        Returns:
+            str: Path to the searchable PDF
+        """
+        import fitz  # PyMuPDF
+        
+        _, ocr_pages = self._classify_pages(input_path, report)
+        
+        with fitz.open(input_path) as pdf:
+            layers = self._recognize_pages(input_path, ocr_pages, language, workers, dpi, grayscale, renderer='pdf')
+            for page_num, layer_data in zip(ocr_pages, layers):
+                with fitz.open('pdf', layer_data) as layer:
+                    page = pdf[page_num]
+                    # The layer was recognized from the page as displayed, i.e.
+                    # rotated; place it on the unrotated page, turned the same way
+                    page.show_pdf_page(page.rect * page.derotation_matrix, layer, 0, rotate=page.rotation)
+            pdf.save(output_path, garbage=1, deflate=True)
+        
+        return output_path
+    
+    def _classify_pages(self, input_path, report=None):
+        """
+        Classify every page of a PDF with _classify_page.
+        
+        Args:
+            input_path (str): Path to the input PDF file
+            report (dict, optional): Filled with 'pages', 'ocr_pages' and 'skipped_pages'
+        
+        Returns:
+            tuple: (extracted text of each page, numbers of the pages that need OCR)
+        """
+        import fitz  # PyMuPDF
+        
+        with fitz.open(input_path) as pdf:
+            text_results = []
+            ocr_pages = []
+            for page in pdf:
+                needs_ocr, text = _classify_page(page)
+                text_results.append(text)
+                if needs_ocr:
+                    ocr_pages.append(page.number)
+        
+        page_count = len(text_results)
+        logger.info(f"OCR of {input_path}: {len(ocr_pages)} of {page_count} pages need recognition")
+        if report is not None:
+            report.update(pages=page_count, ocr_pages=len(ocr_pages), skipped_pages=page_count - len(ocr_pages))
+        return text_results, ocr_pages
+    
+    def _recognize_pages(self, input_path, page_numbers, language, workers=None, dpi=None, grayscale=None,
+                         renderer='txt'):
+        """
+        OCR the given PDF pages on a process pool.
+        
+        Each page is looked up in the OCR cache by its rendered pixels, so
+        only pages that were never recognized at this language and DPI reach
+        Tesseract; a rerun of an edited document recognizes the changed pages.
+        The cache holds words and boxes, so a page recognized for one
+        renderer is not recognized again for the other.
+        
+        Args:
+            input_path (str): Path to the input PDF file
+            page_numbers (list): 0-based numbers of the pages to recognize
+            language (str): OCR language code
+            workers (int, optional): Worker processes, defaults to OCR_WORKERS;
+                                     1 recognizes the pages in this process
+            dpi (int, optional): Render resolution, defaults to OCR_DPI
+            grayscale (bool, optional): Render in grayscale, defaults to OCR_GRAYSCALE
+            renderer (str): 'txt' for plain text, 'pdf' for a text-only PDF page
+        
+        Yields:
+            str or bytes: Result of each page, in the order of page_numbers
+        """
+        page_count = len(page_numbers)
+        if not page_count:
+            return
+        
+        render = {
+            'dpi': dpi or config.Config.OCR_DPI,
+            'grayscale': config.Config.OCR_GRAYSCALE if grayscale is None else grayscale,
+            'renderer': renderer,
+            # Workers open the cache directory themselves
+            'cache': (self.cache.cache_dir, self.cache.max_size) if self.cache.enabled else None,
+        }
+        tesseract_cmd = get_registry().path('tesseract')
+        workers = max(1, min(workers or config.Config.OCR_WORKERS, page_count))
+        
+        hits = misses = 0
+        try:
+            for result, cached in self._run_ocr_pages(input_path, page_numbers, language, render,
+                                                      tesseract_cmd, workers):
+                if cached:
+                    hits += 1
+                else:
+                    misses += 1
+                yield result
+        finally:
+            self.cache.record(hits, misses)
+            if misses:
+                # Once per document; workers only add entries
+                self.cache.evict()
+        logger.info(f"OCR cache: {hits} of {page_count} pages were already recognized")
+    
+    def _run_ocr_pages(self, input_path, page_numbers, language, render, tesseract_cmd, workers):
+        """Yield (result, cached) for each page, from this process or a pool."""
+        page_count = len(page_numbers)
+        if workers == 1:
+            yield from _ocr_pages(input_path, page_numbers, language, render, tesseract_cmd)
+            return
+        
+        # Contiguous runs keep each worker reading neighbouring pages
+        chunk_size = -(-page_count // (workers * OCR_TASKS_PER_WORKER))
+        chunks = [page_numbers[start:start + chunk_size] for start in range(0, page_count, chunk_size)]
+        thread_limit = config.Config.OCR_THREAD_LIMIT or max(1, (os.cpu_count() or 1) // workers)
+        
+        logger.info(f"OCR of {page_count} pages on {workers} workers ({thread_limit} threads each)")
+        pool = get_ocr_pool(workers, thread_limit)
+        futures = [pool.submit(_ocr_pages, input_path, chunk, language, render, tesseract_cmd) for chunk in chunks]
+        try:
+            # Collect in submission order, which is page order
+            for future in futures:
+                yield from future.result()
+        finally:
+            # The pool outlives this document; don't leave its pages queued
+            for future in futures:
+                future.cancel()
+
+def get_ocr_pool(workers, thread_limit):
+    """
+    Return the shared OCR worker pool, starting it on first use.
+    
+    The pool is kept between calls, so its workers do not start again and,
+    with tesserocr, keep the models of OCR_PRELOAD_LANGUAGES and of every
+    language they recognized since loaded. A call with another worker
+    count or thread limit replaces the pool.
+    
+    Args:
+        workers (int): Worker processes
+        thread_limit (int): OpenMP threads per worker
+    
+    Returns:
+        ProcessPoolExecutor: The pool
+    """
+    global _pool, _pool_key
+    
+    languages = tuple(config.Config.OCR_PRELOAD_LANGUAGES)
+    key = (workers, thread_limit, languages)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                # Pages already submitted to the old pool still finish
+                _pool.shutdown(wait=False)
+            logger.info(f"Starting OCR pool: {workers} workers, languages {', '.join(languages) or 'none'} preloaded")
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker,
+                                        initargs=(thread_limit, languages))
+            _pool_key = key
+        return _pool
+
+def shutdown_ocr_pool():
+    """Stop the shared OCR worker pool; the next call starts a new one."""
+    global _pool, _pool_key
+    
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool = None
+        _pool_key = None
+
+def _init_ocr_worker(thread_limit, languages=()):
+    """Limit the OpenMP threads of this worker's Tesseract and load its language models."""
+    os.environ['OMP_THREAD_LIMIT'] = str(thread_limit)
+    if TESSEROCR_AVAILABLE:
+        for language in languages:
+            try:
+                _get_engine(language)
+            except Exception as e:
+                logger.warning(f"Could not preload OCR language {language}: {str(e)}")
+
+def _get_engine(language):
+    """
+    Return this thread's Tesseract engine for a language, loading it once.
+    
+    Loading the traineddata takes longer than recognizing a typical page,
+    more so for combined languages like 'eng+deu+fra'; the engine keeps it.
+    
+    Args:
+        language (str): OCR language code, '+' joining several
+    
+    Returns:
+        tesserocr.PyTessBaseAPI: Initialized engine
+    """
+    engines = getattr(_engines, 'by_language', None)
+    if engines is None:
+        engines = _engines.by_language = {}
+    if language not in engines:
+        engines[language] = tesserocr.PyTessBaseAPI(lang=language)
+    return engines[language]
+
+def _report_fallback(report):
+    """Mark an OCR report as describing a fallback result, which must not be cached."""
+    if report is not None:
+        report['fallback'] = True
+
+def _classify_page(page, min_text_chars=None, min_image_coverage=None):
+    """
+    Decide whether a PDF page needs OCR, from its text layer and images.
+    
+    A page needs OCR when images cover most of it and it has (next to) no
+    text layer, as is the case for a scan. Pages with real text, including
+    scans that were OCR'd before, keep their extracted text, and pages
+    without images have nothing to recognize.
+    
+    Args:
+        page: PyMuPDF page
+        min_text_chars (int, optional): Characters of text that make a page
+                                        born-digital, defaults to OCR_MIN_TEXT_CHARS
+        min_image_coverage (float, optional): Share of the page images must
+                                              cover, defaults to OCR_MIN_IMAGE_COVERAGE
+    
+    Returns:
+        tuple: (needs_ocr, extracted_text)
+    """
+    min_text_chars = config.Config.OCR_MIN_TEXT_CHARS if min_text_chars is None else min_text_chars
+    min_image_coverage = config.Config.OCR_MIN_IMAGE_COVERAGE if min_image_coverage is None else min_image_coverage
+    
+    text = page.get_text()
+    if len(''.join(text.split())) >= min_text_chars:
+        return False, text
+    
+    page_area = abs(page.rect)
+    covered = 0.0
+    for image in page.get_image_info():
+        bbox = page.rect & image['bbox']  # Only the visible part counts
+        if not bbox.is_empty:
+            covered += abs(bbox)
+    coverage = min(1.0, covered / page_area) if page_area else 0.0
+    return coverage >= min_image_coverage, text
+
+def _render_page(page, dpi, grayscale):
+    """
+    Render a PDF page as an uncompressed PNM image for Tesseract.
+    
+    Args:
+        page: PyMuPDF page
+        dpi (int): Render resolution
+        grayscale (bool): Render one gray channel instead of RGB
+    
+    Returns:
+        bytes: PGM (grayscale) or PPM (RGB) image
+    """
+    import fitz  # PyMuPDF
+    
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+    return pix.tobytes('pnm')
+
+def _recognize(image_data, language, tesseract_cmd, dpi):
+    """
+    Recognize the words of a page image with Tesseract.
+    
+    With tesserocr the page goes to this process's warm engine (see
+    _get_engine); otherwise a tesseract process reads it from stdin and
+    writes its TSV output. Both plain text (_page_text) and the PDF text
+    layer (_page_layer) are built from the result, which is what the OCR
+    cache stores.
+    
+    Args:
+        image_data (bytes): Image in a format Tesseract reads, e.g. PNM
+        language (str): OCR language code
+        tesseract_cmd (str): Path to the tesseract binary
+        dpi (int): Resolution of the image; PNM does not record it
+    
+    Returns:
+        dict: 'width' and 'height' of the image in pixels, and 'words': a
+              [text, [x0, y0, x1, y1], baseline_y, [block, paragraph, line]]
+              list per word in reading order, in image pixels; baseline_y
+              may be None
+    """
+    if TESSEROCR_AVAILABLE:
+        return _recognize_with_engine(image_data, language, dpi)
+    
+    command = [tesseract_cmd, 'stdin', 'stdout', '-l', language, '--dpi', str(dpi), 'tsv']
+    result = subprocess.run(command, input=image_data, capture_output=True, check=True)
+    return _parse_tsv(result.stdout.decode('utf-8'))
+
+def _recognize_with_engine(image_data, language, dpi):
+    """Recognize a page image on this process's warm engine; see _recognize."""
+    from PIL import Image
+    
+    image = Image.open(io.BytesIO(image_data))
+    api = _get_engine(language)
+    api.SetImage(image)
+    api.SetSourceResolution(dpi)
+    try:
+        api.Recognize()
+        words = []
+        block = paragraph = line = -1
+        for word in tesserocr.iterate_level(api.GetIterator(), tesserocr.RIL.WORD):
+            if word.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                block += 1
+            if word.IsAtBeginningOf(tesserocr.RIL.PARA):
+                paragraph += 1
+            if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                line += 1
+            text = word.GetUTF8Text(tesserocr.RIL.WORD)
+            if text and text.strip():
+                baseline = word.Baseline(tesserocr.RIL.WORD)
+                words.append([text.strip(), list(word.BoundingBox(tesserocr.RIL.WORD)),
+                              baseline and baseline[0][1], [block, paragraph, line]])
+        return {'width': image.width, 'height': image.height, 'words': words}
+    finally:
+        api.Clear()
+
+def _parse_tsv(tsv):
+    """
+    Turn Tesseract's TSV output into a recognized page; see _recognize.
+    
+    Args:
+        tsv (str): Output of the tsv renderer for one page
+    
+    Returns:
+        dict: Recognized page
+    """
+    page = {'width': 0, 'height': 0, 'words': []}
+    for row in tsv.splitlines()[1:]:
+        fields = row.split('\t', 11)
+        if len(fields) < 11:
+            continue
+        level, _, block, paragraph, line, _, left, top, width, height = map(int, fields[:10])
+        text = fields[11].strip() if len(fields) > 11 else ''
+        if level == 1:
+            page['width'], page['height'] = width, height
+        elif level == 5 and text:
+            page['words'].append([text, [left, top, left + width, top + height], None, [block, paragraph, line]])
+    return page
+
+def _page_text(page):
+    """
+    Build the plain text of a recognized page.
+    
+    Words of a line are joined by spaces and lines by newlines, with a
+    blank line between paragraphs, as in Tesseract's text output.
+    
+    Args:
+        page (dict): Recognized page from _recognize
+    
+    Returns:
+        str: Text of the page
+    """
+    lines = []
+    previous = None
+    for text, _, _, line in page['words']:
+        if line == previous:
+            lines[-1] += f" {text}"
+            continue
+        if previous is not None and line[:2] != previous[:2]:
+            lines.append('')
+        lines.append(text)
+        previous = line
+    return '\n'.join(lines)
+
+def _page_layer(page, dpi):
+    """Build the invisible text layer of a recognized page; see _text_layer."""
+    return _text_layer(page['words'], page['width'], page['height'], dpi)
+
+def _text_layer(words, width, height, dpi):
+    """
+    Build a PDF page with only invisible text, like Tesseract's text-only PDF renderer.
+    
+    Each word is stretched over its box so selecting and searching it
+    highlights the word on the page image underneath.
+    
+    Args:
+        words (list): (text, (x0, y0, x1, y1), baseline_y, line) per word, in
+                      image pixels, as _recognize gives them; baseline_y may
+                      be None
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        dpi (int): Resolution of the image
+    
+    Returns:
+        bytes: PDF data of one page sized like the original page
+    """
+    import fitz  # PyMuPDF
+    
+    scale = 72 / dpi
+    with fitz.open() as layer:
+        page = layer.new_page(width=width * scale, height=height * scale)
+        for text, bbox, baseline_y, _ in words:
+            box = fitz.Rect(bbox) * scale
+            if box.is_empty:
+                continue
+            fontsize = box.height
+            origin = fitz.Point(box.x0, box.y1 if baseline_y is None else baseline_y * scale)
+            stretch = box.width / max(fitz.get_text_length(text, fontsize=fontsize), 0.01)
+            page.insert_text(origin, text, fontsize=fontsize, render_mode=3,
+                             morph=(origin, fitz.Matrix(stretch, 1)))
+        return layer.tobytes()
+
+def _ocr_pages(input_path, page_numbers, language, render, tesseract_cmd):
+    """
+    OCR a run of PDF pages; runs in a pool worker process.
+    
+    Returns:
+        list: (result, cached) for each page, cached telling whether the
+              result came from the OCR cache
+    """
+    import fitz  # PyMuPDF
+    
+    dpi = render['dpi']
+    cache = OCRCache(*render['cache']) if render.get('cache') else None
+    results = []
+    with fitz.open(input_path) as pdf:
+        for page_num in page_numbers:
+            # The page goes to Tesseract in memory, without a temporary file
+            image_data = _render_page(pdf.load_page(page_num), dpi, render['grayscale'])
+            
+            key = cache.make_key(image_data, language, dpi) if cache else None
+            page = cache.get(key) if cache else None
+            cached = page is not None
+            if not cached:
+                page = _recognize(image_data, language, tesseract_cmd, dpi)
+                if cache:
+                    cache.put(key, page)
+            
+            result = _page_layer(page, dpi) if render['renderer'] == 'pdf' else _page_text(page)
+            results.append((result, cached))
+    return results
\ No newline at end of file
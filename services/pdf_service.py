@@ -4,11 +4,38 @@ import logging
 import tempfile
 from PyPDF2 import PdfReader, PdfWriter, PdfMerger
 import io
+import math
 import uuid
 import shutil
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import config
+from utils.workspace import get_workspace_dir
+from utils.image_tiling import open_converted
+from services.ocr_service import OCRService
 
 logger = logging.getLogger(__name__)
 
+# Pillow format names of the image types pages can be rendered to
+PAGE_IMAGE_FORMATS = {'png': 'PNG', 'jpg': 'JPEG', 'jpeg': 'JPEG', 'webp': 'WEBP', 'tiff': 'TIFF', 'bmp': 'BMP'}
+PAGE_IMAGE_QUALITY = 90  # JPEG and WebP
+
+# Page runs per worker: a few runs each keep the workers busy when some
+# pages take longer, and let images stream out before the last run is done
+PAGE_RUNS_PER_WORKER = 4
+
+# Worker pool shared by all PDF calls, so concurrent requests queue on one
+# bounded set of processes instead of each starting their own
+_pool_lock = threading.Lock()
+_pool = None
+_pool_workers = None
+
+# Watermark overlays by (text, position, opacity, page size), shared by all requests
+_watermark_overlays = OrderedDict()
+_watermark_overlays_lock = threading.Lock()
+
 class PDFService:
     """Service for handling various PDF operations with reduced dependencies."""
     
@@ -17,54 +44,119 @@ class PDFService:
         self.temp_dir = temp_dir
         os.makedirs(temp_dir, exist_ok=True)
     
-    def _get_temp_path(self, prefix='pdf_', suffix='.pdf'):
-        """Generate a temporary file path."""
-        return os.path.join(self.temp_dir, f"{prefix}{uuid.uuid4()}{suffix}")
+    def _get_temp_path(self, prefix='pdf_', suffix='.pdf', directory=None):
+        """Generate a temporary file path in the active request workspace."""
+        directory = directory or get_workspace_dir(self.temp_dir)
+        return os.path.join(directory, f"{prefix}{uuid.uuid4()}{suffix}")
     
-    def split_pdf(self, input_path, page_ranges):
+    def _parse_page_range(self, page_range, page_count):
         """
-        Split a PDF file according to specified page ranges.
+        Convert a page range string into 0-based start and end indices.
+        
+        Args:
+            page_range (str): Page range, e.g. '1-3' or '5'
+            page_count (int): Number of pages in the document
+        
+        Returns:
+            tuple: (start, end) inclusive 0-based page indices
+        """
+        # Parse page range (e.g., '1-3' or '5')
+        if '-' in page_range:
+            start, end = map(int, page_range.split('-'))
+        else:
+            start = end = int(page_range)
+        
+        # Adjust for 0-based indexing
+        start = max(0, start - 1)
+        end = min(page_count - 1, end - 1)
+        return start, end
+    
+    def iter_split_pdf(self, input_path, page_ranges, workers=None):
+        """
+        Split a PDF file lazily, producing each part when it is requested.
+        
+        The input is opened and the page ranges are validated immediately, so
+        errors surface before any part is consumed. Parts are written in runs
+        of consecutive parts on the shared PDF pool: each run parses the input
+        once and copies only the objects the pages of a part reference, each
+        font or image once per part. A few runs ahead of the consumer are
+        written in parallel; the rest wait until the returned iterator advances.
         
         Args:
             input_path (str): Path to the input PDF file
             page_ranges (list): List of page ranges, e.g. ['1-3', '5-7', '9']
+            workers (int, optional): Worker processes of the shared pool, see
+                                     get_pdf_pool; defaults to PDF_WORKERS. 1,
+                                     or a call from a worker process, writes
+                                     the parts in the current process
         
         Returns:
-            list: List of paths to split PDF files
+            iterator: Paths to split PDF files, in page range order
         """
         try:
-            reader = PdfReader(input_path)
-            output_paths = []
+            import fitz  # PyMuPDF
             
-            for page_range in page_ranges:
-                writer = PdfWriter()
-                
-                # Parse page range (e.g., '1-3' or '5')
-                if '-' in page_range:
-                    start, end = map(int, page_range.split('-'))
-                else:
-                    start = end = int(page_range)
-                
-                # Adjust for 0-based indexing
-                start = max(0, start - 1)
-                end = min(len(reader.pages) - 1, end - 1)
-                
-                # Add pages to writer
-                for page_num in range(start, end + 1):
-                    writer.add_page(reader.pages[page_num])
-                
-                # Save split PDF
-                output_path = self._get_temp_path(prefix=f'split_{page_range}_')
-                with open(output_path, 'wb') as output_file:
-                    writer.write(output_file)
-                
-                output_paths.append(output_path)
-            
-            return output_paths
+            with fitz.open(input_path) as pdf:
+                page_count = len(pdf)
             
+            # Resolve now: parts may be written after the request workspace is exited
+            output_dir = get_workspace_dir(self.temp_dir)
+            jobs = []
+            for page_range in page_ranges:
+                start, end = self._parse_page_range(page_range, page_count)
+                if start > end:
+                    raise ValueError(f"Page range {page_range} selects no pages")
+                jobs.append((start, end, self._get_temp_path(prefix=f'split_{page_range}_', directory=output_dir)))
+            workers = workers or config.Config.PDF_WORKERS
+            if _in_worker_process():
+                workers = 1
         except Exception as e:
             logger.error(f"Error splitting PDF: {str(e)}")
             raise
+        
+        def generate_parts():
+            try:
+                if workers == 1 or len(jobs) == 1:
+                    yield from _write_split_parts(input_path, jobs)
+                    return
+                
+                run_size = -(-len(jobs) // (workers * PAGE_RUNS_PER_WORKER))
+                runs = [jobs[start:start + run_size] for start in range(0, len(jobs), run_size)]
+                pool = get_pdf_pool(workers)
+                
+                # Stay a bounded distance ahead of the consumer
+                max_in_flight = workers * 2
+                futures = []
+                try:
+                    for run in runs:
+                        futures.append(pool.submit(_write_split_parts, input_path, run))
+                        if len(futures) >= max_in_flight:
+                            yield from futures.pop(0).result()
+                    while futures:
+                        yield from futures.pop(0).result()
+                finally:
+                    # The pool outlives this document; stop its queued runs
+                    # when the consumer goes away
+                    for future in futures:
+                        future.cancel()
+            except Exception as e:
+                logger.error(f"Error splitting PDF: {str(e)}")
+                raise
+        
+        return generate_parts()
+    
+    def split_pdf(self, input_path, page_ranges):
+        """
+        Split a PDF file according to specified page ranges.
+        
+        Args:
+            input_path (str): Path to the input PDF file
+            page_ranges (list): List of page ranges, e.g. ['1-3', '5-7', '9']
+        
+        Returns:
+            list: List of paths to split PDF files
+        """
+        return list(self.iter_split_pdf(input_path, page_ranges))
     
     def merge_pdfs(self, input_paths, output_filename=None):
         """
@@ -322,22 +414,14 @@ class PDFService:
             else:
                 output_path = self._get_temp_path(prefix='images_to_pdf_')
             
-            # Use Pillow to create a PDF
-            from PIL import Image
-            
-            # Open the first image to get dimensions
-            images = []
-            for path in image_paths:
-                img = Image.open(path).convert('RGB')
-                images.append(img)
-            
-            # Save as PDF
-            if images:
-                images[0].save(
-                    output_path, 
-                    save_all=True, 
-                    append_images=images[1:] if len(images) > 1 else []
-                )
+            # Use Pillow to create a PDF, one page at a time so that only one
+            # decoded image is held in memory
+            for index, path in enumerate(image_paths):
+                img = open_converted(path, 'RGB')
+                try:
+                    img.save(output_path, 'PDF', append=index > 0)
+                finally:
+                    img.close()
             
             return output_path
             
@@ -345,18 +429,127 @@ class PDFService:
             logger.error(f"Error converting images to PDF: {str(e)}")
             raise
     
-    def perform_ocr(self, input_path, output_format='pdf', language='eng'):
+    def iter_pdf_to_images(self, input_path, image_format='png', dpi=200, pages='all', workers=None):
+        """
+        Render PDF pages to images lazily, producing them as they are finished.
+        
+        The pages are split into contiguous runs that worker processes render
+        with PyMuPDF, each opening the document once per run. Images are
+        yielded in page order as soon as their run is done, so a caller can
+        stream them out while later pages are still rendering.
+        
+        The input is opened and the arguments are validated immediately, so
+        errors surface before any image is consumed.
+        
+        Args:
+            input_path (str): Path to the input PDF file
+            image_format (str): 'png', 'jpg', 'jpeg', 'webp', 'tiff' or 'bmp'
+            dpi (int): Render resolution, capped at PDF_IMAGE_MAX_DPI; pages
+                       above PDF_IMAGE_MAX_PIXELS are rendered at a lower DPI
+            pages (str or list): 'all' or list of 1-based page numbers
+            workers (int, optional): Worker processes of the shared pool, see
+                                     get_pdf_pool; defaults to PDF_WORKERS. 1,
+                                     or a call from a worker process, renders
+                                     in the current process
+        
+        Returns:
+            iterator: (page_number, image_path) pairs, 1-based, in page order
+        """
+        try:
+            import fitz  # PyMuPDF
+            
+            image_format = image_format.lower()
+            if image_format not in PAGE_IMAGE_FORMATS:
+                raise ValueError(f"Unsupported image format: {image_format}")
+            dpi = max(1, min(int(dpi), config.Config.PDF_IMAGE_MAX_DPI))
+            
+            with fitz.open(input_path) as pdf:
+                page_count = len(pdf)
+            if pages == 'all':
+                page_numbers = list(range(page_count))
+            else:
+                # Convert page numbers to 0-based indices, once each
+                page_numbers = sorted({p - 1 for p in pages if 0 < p <= page_count})
+            if not page_numbers:
+                raise ValueError("No pages to convert")
+            
+            # Resolve now: images may be rendered after the request workspace is exited
+            output_dir = get_workspace_dir(self.temp_dir)
+            jobs = [(page_num, self._get_temp_path(prefix=f'page_{page_num + 1}_', suffix=f'.{image_format}',
+                                                   directory=output_dir))
+                    for page_num in page_numbers]
+            workers = workers or config.Config.PDF_WORKERS
+            if _in_worker_process():
+                workers = 1
+        except Exception as e:
+            logger.error(f"Error converting PDF to images: {str(e)}")
+            raise
+        
+        render = {'format': image_format, 'dpi': dpi, 'max_pixels': config.Config.PDF_IMAGE_MAX_PIXELS}
+        
+        def generate_images():
+            try:
+                if workers == 1 or len(jobs) == 1:
+                    yield from _render_page_images(input_path, jobs, render)
+                    return
+                
+                run_size = -(-len(jobs) // (workers * PAGE_RUNS_PER_WORKER))
+                runs = [jobs[start:start + run_size] for start in range(0, len(jobs), run_size)]
+                pool = get_pdf_pool(workers)
+                futures = [pool.submit(_render_page_images, input_path, run, render) for run in runs]
+                try:
+                    # Collect in submission order, which is page order
+                    for future in futures:
+                        yield from future.result()
+                finally:
+                    # The pool outlives this document; stop its queued runs
+                    # when the consumer goes away
+                    for future in futures:
+                        future.cancel()
+            except Exception as e:
+                logger.error(f"Error converting PDF to images: {str(e)}")
+                raise
+        
+        return generate_images()
+    
+    def pdf_to_images(self, input_path, image_format='png', dpi=200, pages='all'):
+        """
+        Render PDF pages to images.
+        
+        Args:
+            input_path (str): Path to the input PDF file
+            image_format (str): 'png', 'jpg', 'jpeg', 'webp', 'tiff' or 'bmp'
+            dpi (int): Render resolution
+            pages (str or list): 'all' or list of 1-based page numbers
+        
+        Returns:
+            list: Paths to the images, in page order
+        """
+        return [path for _, path in self.iter_pdf_to_images(input_path, image_format, dpi, pages)]
+    
+    def perform_ocr(self, input_path, output_format='pdf', language='eng', report=None):
         """
-        Placeholder for OCR functionality.
+        Perform OCR on a PDF with OCRService, when Tesseract is installed.
         
         Args:
             input_path (str): Path to the input PDF file
             output_format (str): Output format ('pdf' or 'txt')
             language (str): OCR language code
+            report (dict, optional): Filled with the number of pages, of pages
+                                     OCR'd and of pages skipped; 'fallback' is
+                                     set when OCR did not run
         
         Returns:
-            str: Path to the OCR result file (original file copied)
+            str: Path to the OCR result file (a copy of the original, or a
+                 notice, when OCR is not available)
         """
+        ocr_service = OCRService(self.temp_dir)
+        if ocr_service.has_tesseract:
+            return ocr_service.perform_ocr(input_path, output_format, language, report)
+        
+        if report is not None:
+            report['fallback'] = True
+        
         try:
             # For now, just return a text file or copy of PDF stating OCR is not available
             if output_format == 'txt':
@@ -378,7 +571,12 @@ class PDFService:
     
     def add_watermark(self, input_path, watermark_text, position='center', opacity=0.3):
         """
-        Simple placeholder for watermark functionality.
+        Add a text watermark to every page of a PDF.
+        
+        The watermark is drawn once per page size into a form XObject (see
+        _get_watermark_overlay), and every page of that size only references
+        it: all pages share one content stream that shows the XObject, so the
+        output grows by a few bytes per page whatever the watermark.
         
         Args:
             input_path (str): Path to the input PDF file
@@ -387,14 +585,55 @@ class PDFService:
             opacity (float): Opacity of watermark (0-1)
         
         Returns:
-            str: Path to the watermarked PDF (original file copied)
+            str: Path to the watermarked PDF
         """
+        import fitz  # PyMuPDF
+        
         try:
-            # Just copy the original PDF for now
             output_path = self._get_temp_path(prefix='watermarked_')
-            shutil.copy(input_path, output_path)
             
-            logger.warning("Watermark functionality not available - file was copied without watermark")
+            with fitz.open(input_path) as pdf:
+                # Resources and streams added once per document
+                font_xref = pdf.get_new_xref()
+                pdf.update_object(font_xref, '<</Type/Font/Subtype/Type1/BaseFont/Helvetica/Encoding/WinAnsiEncoding>>')
+                state_xref = pdf.get_new_xref()
+                pdf.update_object(state_xref, f'<</Type/ExtGState/ca {opacity:g}/CA {opacity:g}>>')
+                save_xref = pdf.get_new_xref()
+                pdf.update_object(save_xref, '<<>>')
+                pdf.update_stream(save_xref, b'q', new=True)
+                
+                # Pages laid out alike share one XObject and one content stream
+                stamps = {}
+                for page in pdf:
+                    width, height = round(page.rect.width, 2), round(page.rect.height, 2)
+                    # Maps the overlay, drawn upright for the page as displayed,
+                    # onto the page's own coordinates
+                    matrix = fitz.Matrix(1, 0, 0, -1, 0, page.rect.height) * page.derotation_matrix * ~page.transformation_matrix
+                    layout = (width, height, tuple(round(v, 4) for v in matrix))
+                    
+                    if layout not in stamps:
+                        content = _get_watermark_overlay(watermark_text, position, opacity, width, height)
+                        xobject_xref = pdf.get_new_xref()
+                        pdf.update_object(xobject_xref, (
+                            f'<</Type/XObject/Subtype/Form/BBox[0 0 {width:g} {height:g}]'
+                            f'/Matrix[{" ".join(f"{v:g}" for v in layout[2])}]'
+                            f'/Resources<</Font<</WmF {font_xref} 0 R>>/ExtGState<</WmGS {state_xref} 0 R>>>>>>'
+                        ))
+                        pdf.update_stream(xobject_xref, content, new=True)
+                        
+                        # Restores the page's graphics state, then shows the watermark
+                        show_xref = pdf.get_new_xref()
+                        pdf.update_object(show_xref, '<<>>')
+                        pdf.update_stream(show_xref, f'Q q /Wm{xobject_xref} Do Q'.encode('ascii'), new=True)
+                        stamps[layout] = (xobject_xref, show_xref)
+                    
+                    xobject_xref, show_xref = stamps[layout]
+                    _add_xobject_resource(pdf, page.xref, f'Wm{xobject_xref}', xobject_xref)
+                    contents = _page_contents(pdf, page.xref)
+                    pdf.xref_set_key(page.xref, 'Contents', f'[{save_xref} 0 R {contents} {show_xref} 0 R]')
+                
+                pdf.save(output_path, garbage=1, deflate=True)
+            
             return output_path
             
         except Exception as e:
@@ -421,4 +660,199 @@ class PDFService:
                     if os.path.isfile(file_path):
                         os.remove(file_path)
         except Exception as e:
-            logger.error(f"Error cleaning up temporary files: {str(e)}")
\ No newline at end of file
+            logger.error(f"Error cleaning up temporary files: {str(e)}")
+
+def get_pdf_pool(workers=None):
+    """
+    Return the shared PDF worker pool, starting it on first use.
+    
+    The pool is kept between calls, so its workers start once per process
+    and requests that arrive together share PDF_WORKERS processes. A call
+    with another worker count replaces the pool.
+    
+    Args:
+        workers (int, optional): Worker processes, defaults to PDF_WORKERS
+    
+    Returns:
+        ProcessPoolExecutor: The pool
+    """
+    global _pool, _pool_workers
+    
+    workers = workers or config.Config.PDF_WORKERS
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                # Work already submitted to the old pool still finishes
+                _pool.shutdown(wait=False)
+            logger.info(f"Starting PDF pool: {workers} workers")
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+def shutdown_pdf_pool():
+    """Stop the shared PDF worker pool; the next call starts a new one."""
+    global _pool, _pool_workers
+    
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool = None
+        _pool_workers = None
+
+def _in_worker_process():
+    """Check whether this is a pool worker, which must not start a pool of its own."""
+    return multiprocessing.parent_process() is not None
+
+def _write_split_parts(input_path, jobs):
+    """
+    Write a run of split parts, parsing the source document once; runs in a pool worker process.
+    
+    insert_pdf copies what the pages reference through one graft map, so
+    a font or image shared by several pages of a part is copied once.
+    
+    Args:
+        input_path (str): Path to the input PDF file
+        jobs (list): (first page, last page, output path) triples; pages are
+                     0-based and the last page is included
+    
+    Returns:
+        list: The output paths, in the order of jobs
+    """
+    import fitz  # PyMuPDF
+    
+    with fitz.open(input_path) as source:
+        for start, end, output_path in jobs:
+            with fitz.open() as part:
+                part.insert_pdf(source, from_page=start, to_page=end)
+                part.save(output_path)
+    return [output_path for _, _, output_path in jobs]
+
+def _render_page_images(input_path, jobs, render):
+    """
+    Render a run of PDF pages to image files; runs in a pool worker process.
+    
+    Args:
+        input_path (str): Path to the input PDF file
+        jobs (list): (0-based page number, output path) pairs
+        render (dict): 'format', 'dpi' and 'max_pixels'
+    
+    Returns:
+        list: (1-based page number, output path) pairs
+    """
+    import fitz  # PyMuPDF
+    from PIL import Image
+    
+    results = []
+    with fitz.open(input_path) as pdf:
+        for page_num, output_path in jobs:
+            page = pdf.load_page(page_num)
+            
+            # Lower the resolution of pages that would exceed the pixel cap
+            dpi = render['dpi']
+            area = page.rect.width * page.rect.height / (72 * 72)  # Square inches
+            if area and area * dpi * dpi > render['max_pixels']:
+                dpi = max(1, int((render['max_pixels'] / area) ** 0.5))
+            
+            pix = page.get_pixmap(dpi=dpi, alpha=False)
+            if render['format'] == 'png':
+                pix.save(output_path)
+            elif render['format'] in ('jpg', 'jpeg'):
+                pix.save(output_path, jpg_quality=PAGE_IMAGE_QUALITY)
+            else:
+                image = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+                image.save(output_path, PAGE_IMAGE_FORMATS[render['format']], quality=PAGE_IMAGE_QUALITY)
+            results.append((page_num + 1, output_path))
+    return results
+
+def _get_watermark_overlay(text, position, opacity, width, height):
+    """
+    Return the content stream that draws a watermark on a page of the given size.
+    
+    The text is set in Helvetica at 50% gray: diagonally across the page
+    for 'center', or as a line at the top or bottom margin. Overlays are
+    kept in a small LRU so repeated watermarks are not laid out again.
+    
+    Args:
+        text (str): Watermark text; characters outside WinAnsi become '?'
+        position (str): 'center', 'top' or 'bottom'
+        opacity (float): Opacity of watermark (0-1), applied through the
+                         /WmGS graphics state of the XObject
+        width (float): Page width in points, as displayed
+        height (float): Page height in points, as displayed
+    
+    Returns:
+        bytes: Form XObject content using the /WmF font and /WmGS state
+    """
+    import fitz  # PyMuPDF
+    
+    key = (text, position, opacity, width, height)
+    with _watermark_overlays_lock:
+        content = _watermark_overlays.get(key)
+        if content is not None:
+            _watermark_overlays.move_to_end(key)
+            return content
+    
+    encoded = text.encode('cp1252', 'replace')
+    text_width = max(fitz.get_text_length(encoded.decode('cp1252'), fontname='helv', fontsize=1), 0.01)
+    margin = 36
+    if position == 'center':
+        # Corner to corner, bottom left to top right
+        angle = math.atan2(height, width)
+        fontsize = min(0.6 * math.hypot(width, height) / text_width, 0.2 * min(width, height))
+        # Start of the baseline such that the text is centered on the page
+        dx, dy = -text_width * fontsize / 2, -0.35 * fontsize
+        x = width / 2 + dx * math.cos(angle) - dy * math.sin(angle)
+        y = height / 2 + dx * math.sin(angle) + dy * math.cos(angle)
+    else:
+        angle = 0.0
+        fontsize = min(0.8 * width / text_width, 36)
+        x = (width - text_width * fontsize) / 2
+        y = height - margin - 0.72 * fontsize if position == 'top' else margin
+    
+    escaped = encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+    cos, sin = math.cos(angle), math.sin(angle)
+    content = (
+        f'q /WmGS gs 0.5 g BT /WmF {fontsize:.2f} Tf '
+        f'{cos:.5f} {sin:.5f} {-sin:.5f} {cos:.5f} {x:.2f} {y:.2f} Tm ('
+    ).encode('ascii') + escaped + b') Tj ET Q'
+    
+    with _watermark_overlays_lock:
+        _watermark_overlays[key] = content
+        while len(_watermark_overlays) > config.Config.PDF_WATERMARK_CACHE_SIZE:
+            _watermark_overlays.popitem(last=False)
+    return content
+
+def _add_xobject_resource(pdf, page_xref, name, xobject_xref):
+    """Add an XObject to the resources a page uses, which may be shared or inherited."""
+    # Pages without /Resources inherit them from a Pages node
+    holder = page_xref
+    while pdf.xref_get_key(holder, 'Resources')[0] == 'null':
+        kind, parent = pdf.xref_get_key(holder, 'Parent')
+        if kind != 'xref':
+            holder = page_xref
+            break
+        holder = int(parent.split()[0])
+    
+    # Follow indirect objects; a key path may not run through them
+    key = 'Resources'
+    kind, value = pdf.xref_get_key(holder, key)
+    if kind == 'xref':
+        holder, key = int(value.split()[0]), ''
+    key = f'{key}/XObject' if key else 'XObject'
+    kind, value = pdf.xref_get_key(holder, key)
+    if kind == 'xref':
+        holder, key = int(value.split()[0]), ''
+    pdf.xref_set_key(holder, f'{key}/{name}' if key else name, f'{xobject_xref} 0 R')
+
+def _page_contents(pdf, page_xref):
+    """Return a page's content streams as references for a /Contents array."""
+    kind, value = pdf.xref_get_key(page_xref, 'Contents')
+    if kind == 'array':
+        return value.strip()[1:-1]
+    if kind == 'xref':
+        xref = int(value.split()[0])
+        if not pdf.xref_is_stream(xref):
+            # An indirect array of streams
+            return pdf.xref_object(xref, compressed=True).strip()[1:-1]
+        return value
+    return ''
@@ -4,17 +4,39 @@ import logging
 import threading
 import queue
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from models import db, Conversion
 from services.audio_service import AudioService
 from services.image_service import ImageService
 from services.document_service import DocumentService
 from services.pdf_service import PDFService
+import config
 
 logger = logging.getLogger(__name__)
 
-# Task processing queue
-task_queue = queue.Queue()
+# Operation routing table: CPU-bound Python work (Pillow, PyPDF2) runs in
+# worker processes, work that mostly waits on an external binary runs in
+# threads. Operations that fan out to a shared pool of their own (splitting
+# on the PDF pool, OCR on the OCR pool) also run in threads: in a worker
+# process they could not start their pool and would run on a single core.
+# Operations not listed here run in threads.
+OPERATION_EXECUTORS = {
+    'convert_audio': 'thread',
+    'convert_audio_multi': 'thread',
+    'convert_image': 'process',
+    'convert_document': 'thread',
+    'pdf_split': 'thread',
+    'pdf_merge': 'process',
+    'pdf_compress': 'process',
+    'pdf_ocr': 'thread',
+}
+
+# Task processing queues, one per executor kind
+task_queues = {
+    'process': queue.Queue(),
+    'thread': queue.Queue(),
+}
 
 # Service instances
 audio_service = AudioService()
@@ -22,108 +44,323 @@ image_service = ImageService()
 document_service = DocumentService()
 pdf_service = PDFService()
 
-def process_task_worker():
-    """Background worker that processes tasks from the queue."""
+# Worker pool state
+_workers_lock = threading.Lock()
+_worker_threads = []
+_worker_counts = {}
+_process_pool = None
+_stopping = False
+
+# Throughput statistics
+_stats_lock = threading.Lock()
+_stats = {
+    'started_at': None,
+    'in_flight': {'process': 0, 'thread': 0},
+    'operations': {},
+}
+
+def execute_operation(task):
+    """
+    Run the service call for a single task.
+
+    This runs inside a pool worker, so the task must not carry anything that
+    cannot be pickled when it is routed to the process pool.
+
+    Args:
+        task (dict): Task data dictionary
+
+    Returns:
+        str or list: Path(s) to the task output
+    """
+    operation = task['operation']
+
+    if operation == 'convert_audio':
+        return audio_service.convert_audio(
+            task['input_path'],
+            task['output_path'],
+            task.get('options', {})
+        )
+
+    elif operation == 'convert_audio_multi':
+        return audio_service.convert_audio_multi(
+            task['input_path'],
+            task['outputs']
+        )
+
+    elif operation == 'convert_image':
+        return image_service.convert_image(
+            task['input_path'],
+            task['output_path'],
+            task.get('options', {})
+        )
+
+    elif operation == 'convert_document':
+        document_service.convert_document(
+            task['input_path'],
+            task['output_path']
+        )
+        return task['output_path']
+
+    elif operation == 'pdf_split':
+        return pdf_service.split_pdf(
+            task['input_path'],
+            task['page_ranges']
+        )
+
+    elif operation == 'pdf_merge':
+        return pdf_service.merge_pdfs(
+            task['input_paths'],
+            task.get('output_filename')
+        )
+
+    elif operation == 'pdf_compress':
+        return pdf_service.compress_pdf(
+            task['input_path'],
+            task.get('quality', 'medium')
+        )
+
+    elif operation == 'pdf_ocr':
+        return pdf_service.perform_ocr(
+            task['input_path'],
+            task.get('output_format', 'pdf'),
+            task.get('language', 'eng')
+        )
+
+    raise ValueError(f"Unknown task operation: {operation}")
+
+def _update_conversion_status(task, status, error_message=None):
+    """Update the conversion record for a task if user_id is provided."""
+    if not (task.get('user_id') and task.get('conversion_id')):
+        return
+
+    from app import app
+    with app.app_context():
+        conversion = Conversion.query.get(task['conversion_id'])
+        if conversion:
+            conversion.status = status
+            if status == 'completed':
+                conversion.completed_at = datetime.utcnow()
+            if error_message:
+                conversion.error_message = error_message
+            db.session.commit()
+
+def _record_result(operation, duration, succeeded):
+    """Record the outcome of a task for the throughput report."""
+    with _stats_lock:
+        op_stats = _stats['operations'].setdefault(
+            operation, {'completed': 0, 'failed': 0, 'total_seconds': 0.0}
+        )
+        op_stats['completed' if succeeded else 'failed'] += 1
+        op_stats['total_seconds'] += duration
+
+def process_task_worker(executor_kind):
+    """
+    Background worker that processes tasks from one of the task queues.
+
+    Thread workers run the task directly; process workers hand it to the shared
+    process pool and wait for the result, so the number of worker threads bounds
+    how many tasks are in flight per pool.
+
+    Args:
+        executor_kind (str): 'process' or 'thread'
+    """
+    task_queue = task_queues[executor_kind]
+
     while True:
         try:
             # Get task from queue
             task = task_queue.get()
-            
+
             if task is None:  # Shutdown signal
                 break
-                
-            logger.info(f"Processing task: {task['operation']}")
-            
-            # Process task based on operation type
-            if task['operation'] == 'convert_audio':
-                output_path = audio_service.convert_audio(
-                    task['input_path'], 
-                    task['output_path'],
-                    task.get('options', {})
-                )
-                
-            elif task['operation'] == 'convert_image':
-                output_path = image_service.convert_image(
-                    task['input_path'], 
-                    task['output_path'],
-                    task.get('options', {})
-                )
-                
-            elif task['operation'] == 'convert_document':
-                output_path = document_service.convert_document(
-                    task['input_path'], 
-                    task['output_path']
-                )
-                
-            elif task['operation'] == 'pdf_split':
-                pdf_service.split_pdf(
-                    task['input_path'], 
-                    task['page_ranges']
-                )
-                
-            elif task['operation'] == 'pdf_merge':
-                pdf_service.merge_pdfs(
-                    task['input_paths'], 
-                    task.get('output_filename')
-                )
-                
-            elif task['operation'] == 'pdf_compress':
-                pdf_service.compress_pdf(
-                    task['input_path'], 
-                    task.get('quality', 'medium')
-                )
-                
-            # Update conversion status if user_id is provided
-            if task.get('user_id') and task.get('conversion_id'):
-                from app import app
-                with app.app_context():
-                    conversion = Conversion.query.get(task['conversion_id'])
-                    if conversion:
-                        conversion.status = 'completed'
-                        conversion.completed_at = datetime.utcnow()
-                        db.session.commit()
-            
-            # Execute callback if provided
-            if 'callback' in task and callable(task['callback']):
-                task['callback'](output_path if 'output_path' in locals() else None)
-                
-            logger.info(f"Task completed: {task['operation']}")
-            
-        except Exception as e:
-            logger.error(f"Error processing task: {str(e)}")
-            
-            # Update conversion status to 'failed' if user_id is provided
-            if task.get('user_id') and task.get('conversion_id'):
-                from app import app
-                with app.app_context():
-                    conversion = Conversion.query.get(task['conversion_id'])
-                    if conversion:
-                        conversion.status = 'failed'
-                        conversion.error_message = str(e)
-                        db.session.commit()
-        
+
+            logger.info(f"Processing task: {task['operation']} ({executor_kind} pool)")
+            started = time.monotonic()
+
+            with _stats_lock:
+                _stats['in_flight'][executor_kind] += 1
+
+            try:
+                if executor_kind == 'process':
+                    payload = {key: value for key, value in task.items() if key != 'callback'}
+                    output_path = _process_pool.submit(execute_operation, payload).result()
+                else:
+                    output_path = execute_operation(task)
+
+                # Update conversion status
+                _update_conversion_status(task, 'completed')
+
+                # Execute callback if provided
+                if callable(task.get('callback')):
+                    task['callback'](output_path)
+
+                _record_result(task['operation'], time.monotonic() - started, succeeded=True)
+                logger.info(f"Task completed: {task['operation']}")
+
+            except Exception as e:
+                logger.error(f"Error processing task: {str(e)}")
+                _record_result(task['operation'], time.monotonic() - started, succeeded=False)
+
+                # Update conversion status to 'failed'
+                try:
+                    _update_conversion_status(task, 'failed', str(e))
+                except Exception as status_error:
+                    logger.error(f"Error updating conversion status: {str(status_error)}")
+
+            finally:
+                with _stats_lock:
+                    _stats['in_flight'][executor_kind] -= 1
+
         finally:
             # Mark task as done
             task_queue.task_done()
 
-# Start background worker thread
-worker_thread = threading.Thread(target=process_task_worker, daemon=True)
-worker_thread.start()
+def start_workers(process_workers=None, thread_workers=None):
+    """
+    Start the background worker pools if they are not already running.
+
+    Args:
+        process_workers (int, optional): Size of the process pool
+        thread_workers (int, optional): Number of thread workers
+    """
+    global _process_pool
+
+    with _workers_lock:
+        # Workers that outlived a shutdown still count as running, so they
+        # are never joined by a second set
+        if _worker_threads:
+            if _stopping:
+                logger.warning(f"{len(_worker_threads)} task workers are still stopping; not starting new ones")
+            return
+
+        process_workers = max(1, process_workers or config.Config.TASK_PROCESS_WORKERS)
+        thread_workers = max(1, thread_workers or config.Config.TASK_THREAD_WORKERS)
+
+        _process_pool = ProcessPoolExecutor(max_workers=process_workers)
+        _worker_counts.update({'process': process_workers, 'thread': thread_workers})
+
+        for executor_kind, count in _worker_counts.items():
+            for index in range(count):
+                worker = threading.Thread(
+                    target=process_task_worker,
+                    args=(executor_kind,),
+                    name=f"task-{executor_kind}-{index}",
+                    daemon=True
+                )
+                worker.start()
+                _worker_threads.append(worker)
+
+        with _stats_lock:
+            _stats['started_at'] = time.monotonic()
+
+        logger.info(f"Started task workers: {process_workers} process, {thread_workers} thread")
 
 def queue_task(task_data):
     """
     Queue a task for background processing.
-    
+
     Args:
         task_data (dict): Task data dictionary
-        
+
     Returns:
         int: Queue size after adding the task
     """
-    task_queue.put(task_data)
-    return task_queue.qsize()
+    # Workers start lazily so importing this module (including from a pool
+    # worker process) does not spawn another pool
+    start_workers()
+
+    executor_kind = OPERATION_EXECUTORS.get(task_data['operation'], 'thread')
+    task_queues[executor_kind].put(task_data)
+    return sum(task_queue.qsize() for task_queue in task_queues.values())
+
+def get_worker_stats():
+    """
+    Report queue depth and throughput of the worker pools.
+
+    Returns:
+        dict: Worker counts, queue depth, in-flight tasks and per-operation
+              completion counts and average durations
+    """
+    with _stats_lock:
+        started_at = _stats['started_at']
+        uptime = time.monotonic() - started_at if started_at else 0.0
+        in_flight = dict(_stats['in_flight'])
+
+        operations = {}
+        for operation, op_stats in _stats['operations'].items():
+            finished = op_stats['completed'] + op_stats['failed']
+            operations[operation] = {
+                'completed': op_stats['completed'],
+                'failed': op_stats['failed'],
+                'avg_seconds': round(op_stats['total_seconds'] / finished, 3) if finished else 0.0,
+            }
+
+    completed = sum(op['completed'] for op in operations.values())
+    failed = sum(op['failed'] for op in operations.values())
+
+    return {
+        'workers': dict(_worker_counts),
+        'queue_depth': {kind: task_queue.qsize() for kind, task_queue in task_queues.items()},
+        'in_flight': in_flight,
+        'completed': completed,
+        'failed': failed,
+        'uptime_seconds': round(uptime, 1),
+        'throughput_per_minute': round((completed + failed) * 60 / uptime, 2) if uptime else 0.0,
+        'operations': operations,
+    }
+
+def shutdown_workers(drain=True, timeout=30.0):
+    """
+    Shut down worker pools gracefully.
+
+    Args:
+        drain (bool): Finish queued tasks before stopping; otherwise queued tasks
+                      are discarded and only in-flight tasks are completed
+        timeout (float): Maximum time in seconds to wait for the workers
+
+    Workers still busy when the timeout runs out are kept, together with the
+    process pool they may be using, and stop after their current task; call
+    again to wait for them.
+    """
+    global _process_pool, _stopping
+
+    with _workers_lock:
+        if not _worker_threads:
+            return
+
+        if not drain and not _stopping:
+            discarded = 0
+            for task_queue in task_queues.values():
+                while True:
+                    try:
+                        task_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    task_queue.task_done()
+                    discarded += 1
+            if discarded:
+                logger.warning(f"Discarded {discarded} queued tasks during shutdown")
+
+        # Shutdown signals go behind any queued tasks, so draining is just FIFO
+        # order. Each worker takes exactly one, so they are only sent once
+        if not _stopping:
+            for executor_kind, count in _worker_counts.items():
+                for _ in range(count):
+                    task_queues[executor_kind].put(None)
+            _stopping = True
+
+        deadline = time.monotonic() + timeout
+        for worker in _worker_threads:
+            worker.join(timeout=max(0.0, deadline - time.monotonic()))
+
+        _worker_threads[:] = [worker for worker in _worker_threads if worker.is_alive()]
+        if _worker_threads:
+            logger.warning(f"{len(_worker_threads)} task workers did not stop within {timeout}s")
+            return
+
+        _process_pool.shutdown(wait=drain, cancel_futures=not drain)
+        logger.info(f"Task workers stopped: {get_worker_stats()}")
 
-def shutdown_workers():
-    """Shut down worker threads gracefully."""
-    task_queue.put(None)  # Signal worker to shut down
-    worker_thread.join(timeout=5.0)
\ No newline at end of file
+        _worker_counts.clear()
+        _process_pool = None
+        _stopping = False
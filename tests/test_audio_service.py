@@ -0,0 +1,234 @@
+# tests/test_audio_service.py
+import os
+import json
+import wave
+import shutil
+import unittest
+import tempfile
+import subprocess
+import numpy as np
+from unittest import mock
+import config
+from services.audio_service import AudioService, PYDUB_AVAILABLE, probe_cache
+from utils.media_probe import AudioInfo, parse_ffprobe_output
+
+def read_samples(path):
+    """Return the samples of a 16-bit WAV file and its frame rate and channel count."""
+    with wave.open(path) as wav:
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        return samples.astype(float), wav.getframerate(), wav.getnchannels()
+
+@unittest.skipUnless(shutil.which('ffmpeg'), 'FFmpeg is not installed')
+class TestAudioService(unittest.TestCase):
+    """Test cases for audio service."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.service = AudioService(temp_dir=self.temp_dir, ffmpeg_dir=os.path.join(self.temp_dir, 'ffmpeg'))
+
+        # Ten seconds of a quiet stereo tone
+        self.input_path = os.path.join(self.temp_dir, 'tone.wav')
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', 'sine=frequency=440:duration=10:sample_rate=44100',
+            '-ac', '2', '-af', 'volume=-8dB', self.input_path
+        ], check=True)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_options_become_one_filter_graph(self):
+        """Test that every processing option is expressed as a streaming filter."""
+        options = {'normalize': True, 'fade_in': 1.5, 'fade_out': 2.0, 'channels': 1, 'sample_rate': 22050}
+
+        filters = self.service._build_audio_filters(self.input_path, options)
+
+        self.assertEqual([f.split('=')[0] for f in filters], ['volume', 'afade', 'afade', 'pan', 'aresample'])
+        self.assertIn('afade=t=out:st=8.000:d=2.0', filters)
+
+    def test_invalid_options_are_rejected(self):
+        """Test that options are coerced and bad values never reach an FFmpeg command."""
+        validated = self.service.validate_options({'volume': '3', 'channels': 2.0, 'normalize': 'true', 'extra': 'x'})
+        self.assertEqual(validated, {'volume': 3.0, 'channels': 2, 'normalize': True})
+
+        output_path = os.path.join(self.temp_dir, 'output.mp3')
+        bad_options = [
+            {'volume': '3dB:precision=fixed,asetrate=8000'},
+            {'volume': float('nan')},
+            {'fade_in': -1},
+            {'channels': 1.5},
+            {'sample_rate': 1},
+            {'normalize': 'yes'},
+            {'codec': '-map'},
+            ['volume'],
+        ]
+        for options in bad_options:
+            with mock.patch('subprocess.Popen') as popen, mock.patch('subprocess.run') as run:
+                with self.assertRaises(ValueError, msg=options):
+                    self.service.convert_audio(self.input_path, output_path, options)
+                with self.assertRaises(ValueError, msg=options):
+                    self.service.convert_audio_multi(self.input_path, [(output_path, options)])
+            popen.assert_not_called()
+            run.assert_not_called()
+
+    @unittest.skipUnless(PYDUB_AVAILABLE, 'pydub is not available')
+    def test_filter_graph_matches_pydub(self):
+        """Test that the streaming path gives the same levels as the pydub path."""
+        options = {'volume': 3, 'normalize': True, 'fade_in': 1.5, 'fade_out': 2.0, 'channels': 1, 'sample_rate': 22050}
+        streamed_path = os.path.join(self.temp_dir, 'streamed.wav')
+        decoded_path = os.path.join(self.temp_dir, 'decoded.wav')
+
+        self.service.convert_audio(self.input_path, streamed_path, options)
+        self.service._convert_with_pydub(self.input_path, decoded_path, dict(options))
+
+        streamed, rate, channels = read_samples(streamed_path)
+        decoded = read_samples(decoded_path)[0]
+        self.assertEqual((rate, channels, len(streamed)), (22050, 1, len(decoded)))
+
+        # Compare the envelope: peak level over a few milliseconds at points
+        # inside the fades and in between
+        for seconds in (0.5, 1.0, 5.0, 9.0):
+            center = int(seconds * rate)
+            streamed_peak = np.abs(streamed[center - 300:center + 300]).max()
+            decoded_peak = np.abs(decoded[center - 300:center + 300]).max()
+            self.assertAlmostEqual(streamed_peak / 32767, decoded_peak / 32767, delta=0.02)
+
+    def test_each_conversion_runs_one_encoder(self):
+        """Test that codec, bitrate and m4a/aac/flac targets are encoded in a single pass."""
+        cases = [
+            ('m4a', {}),
+            ('aac', {'bitrate': 96}),
+            ('flac', {'fade_in': 0.5}),
+            ('mp3', {'codec': 'libmp3lame', 'bitrate': 128, 'channels': 1}),
+            ('ogg', {'bitrate': 96, 'fade_out': 1.0}),
+        ]
+        # Without a known duration fade_out goes through pydub, which must
+        # still hand its samples to exactly one encoder
+        durations = [10.0, None] if PYDUB_AVAILABLE else [10.0]
+        real_popen = subprocess.Popen
+
+        for output_format, options in cases:
+            for duration in durations:
+                info = AudioInfo(duration=duration, codec='pcm_s16le', sample_rate=44100, channels=2)
+                output_path = os.path.join(self.temp_dir, f'output.{output_format}')
+                with mock.patch.object(self.service, 'probe_audio', return_value=info), \
+                        mock.patch('subprocess.Popen', side_effect=real_popen) as popen:
+                    self.service.convert_audio(self.input_path, output_path, dict(options))
+
+                # Probes and decodes write to '-'; everything else is an encode
+                commands = [call.args[0] for call in popen.call_args_list]
+                encoders = [command for command in commands
+                            if 'ffmpeg' in os.path.basename(command[0]) and command[-1] != '-' and command[-2] != '-i']
+                self.assertEqual(encoders and encoders[0][-1], output_path)
+                self.assertEqual(len(encoders), 1, f"{output_format} {options} {duration}: {encoders}")
+                self.assertGreater(os.path.getsize(output_path), 0)
+                os.remove(output_path)
+
+    def test_multiple_outputs_share_one_decode(self):
+        """Test that several outputs are written by one FFmpeg process with one peak measurement."""
+        outputs = [
+            (os.path.join(self.temp_dir, 'multi.mp3'), {'normalize': True, 'bitrate': 128}),
+            (os.path.join(self.temp_dir, 'multi.ogg'), {'normalize': True, 'channels': 1}),
+            (os.path.join(self.temp_dir, 'multi.m4a'), {'fade_in': 1.0}),
+        ]
+        real_popen = subprocess.Popen
+
+        with mock.patch('subprocess.Popen', side_effect=real_popen) as popen:
+            result = self.service.convert_audio_multi(self.input_path, outputs)
+
+        self.assertEqual(result, [output_path for output_path, _ in outputs])
+        # Probes end in '-i <file>'; the rest are the peak measurement and the encode
+        commands = [call.args[0] for call in popen.call_args_list
+                    if 'ffmpeg' in os.path.basename(call.args[0][0]) and call.args[0][-2] != '-i']
+        self.assertEqual(len(commands), 2)
+        self.assertEqual(commands[1].count('-map'), 3)
+
+        for output_path, options in outputs:
+            info = self.service.probe_audio(output_path)
+            self.assertEqual(info.channels, options.get('channels', 2))
+            self.assertAlmostEqual(info.duration, 10.0, delta=0.1)
+
+    def test_segmented_encode_matches_single_pass(self):
+        """Test that long audio encoded in parallel segments joins without gaps."""
+        with mock.patch.multiple(config.Config, AUDIO_SEGMENT_MIN_DURATION=5, AUDIO_SEGMENT_MIN_LENGTH=2):
+            with mock.patch.object(config.Config, 'AUDIO_SEGMENT_WORKERS', 3):
+                self.assertIsNone(self.service._plan_segments(self.input_path, 'output.flac', {}))
+
+            for output_format in ('mp3', 'm4a', 'aac'):
+                options = {'fade_in': 1.0, 'fade_out': 1.5}
+                single_path = os.path.join(self.temp_dir, f'single.{output_format}')
+                segmented_path = os.path.join(self.temp_dir, f'segmented.{output_format}')
+
+                with mock.patch.object(config.Config, 'AUDIO_SEGMENT_WORKERS', 1):
+                    self.service.convert_audio(self.input_path, single_path, dict(options))
+                with mock.patch.object(config.Config, 'AUDIO_SEGMENT_WORKERS', 3):
+                    self.assertEqual(len(self.service._plan_segments(self.input_path, segmented_path, options)), 3)
+                    self.service.convert_audio(self.input_path, segmented_path, dict(options))
+
+                single, segmented = [
+                    np.frombuffer(subprocess.run(
+                        ['ffmpeg', '-loglevel', 'error', '-i', path, '-f', 's16le', '-'],
+                        capture_output=True, check=True
+                    ).stdout, dtype=np.int16).astype(float)
+                    for path in (single_path, segmented_path)
+                ]
+
+                # Same length: no priming or padding left at the joins
+                self.assertEqual(len(segmented), len(single))
+                # Lossy encodes differ slightly, but a gap would misalign everything
+                error = np.sqrt(np.mean((segmented - single) ** 2)) / np.sqrt(np.mean(single ** 2))
+                self.assertLess(error, 0.05, output_format)
+
+    def test_probe_is_cached_until_file_changes(self):
+        """Test that probing an unchanged file reuses the result and a rewrite invalidates it."""
+        info = self.service.probe_audio(self.input_path)
+        self.assertEqual((info.codec, info.sample_rate, info.channels), ('pcm_s16le', 44100, 2))
+        self.assertAlmostEqual(info.duration, 10.0, places=1)
+
+        with mock.patch('services.audio_service.subprocess.run') as run:
+            self.assertIs(self.service.probe_audio(self.input_path), info)
+            run.assert_not_called()
+
+        subprocess.run([
+            'ffmpeg', '-loglevel', 'error', '-y',
+            '-f', 'lavfi', '-i', 'sine=duration=2', self.input_path
+        ], check=True)
+        changed = self.service.probe_audio(self.input_path)
+        self.assertEqual(changed.channels, 1)
+        self.assertAlmostEqual(changed.duration, 2.0, places=1)
+
+    def test_bulk_probe_keeps_order_and_admission(self):
+        """Test that bulk probing returns results in order and flags non-audio files."""
+        not_audio = os.path.join(self.temp_dir, 'notes.mp3')
+        with open(not_audio, 'w') as f:
+            f.write('not audio')
+        probe_cache.clear()
+
+        infos = self.service.probe_audio_files([self.input_path, not_audio, self.input_path], workers=2)
+
+        self.assertEqual([info.has_audio for info in infos], [True, False, True])
+        self.assertIsNone(self.service.get_admission_error(infos[0]))
+        self.assertTrue(self.service.get_admission_error(infos[1]))
+        self.assertIn('too long', self.service.get_admission_error(infos[0], max_duration=5))
+
+    def test_parse_ffprobe_output(self):
+        """Test that ffprobe JSON is turned into typed metadata."""
+        output = json.dumps({
+            'streams': [
+                {'codec_type': 'video', 'codec_name': 'mjpeg'},
+                {'codec_type': 'audio', 'codec_name': 'mp3', 'sample_rate': '44100', 'channels': 2,
+                 'tags': {'encoder': 'LAME3.100'}},
+            ],
+            'format': {'format_name': 'mp3', 'duration': '215.510204', 'bit_rate': '320000',
+                       'tags': {'TITLE': 'Song', 'artist': 'Band'}},
+        })
+
+        info = parse_ffprobe_output(output)
+
+        self.assertEqual(info, AudioInfo(
+            duration=215.510204, codec='mp3', sample_rate=44100, channels=2, bitrate=320,
+            format_name='mp3', tags={'encoder': 'LAME3.100', 'title': 'Song', 'artist': 'Band'}
+        ))
+        self.assertFalse(parse_ffprobe_output('{}').has_audio)
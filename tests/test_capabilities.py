@@ -0,0 +1,82 @@
+# tests/test_capabilities.py
+import os
+import unittest
+import tempfile
+from unittest import mock
+from utils.capabilities import CapabilityRegistry
+
+FAKE_FFMPEG = """#!/bin/sh
+echo run >> "${0%/*}/calls"
+case "$*" in
+    *-encoders*) echo "Encoders:"
+                 echo " A..... = Audio"
+                 echo " ------"
+                 echo " A....D aac                  AAC (Advanced Audio Coding)"
+                 echo " V....D libx264              H.264" ;;
+    *) echo "ffmpeg version 6.1 Copyright (c) 2000-2023" ;;
+esac
+"""
+
+@unittest.skipIf(os.name == 'nt', 'Fake tools are shell scripts')
+class TestCapabilityRegistry(unittest.TestCase):
+    """Test cases for the external tool registry."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.tools_dir = os.path.join(self.temp_dir, 'tools')
+        self.empty_dir = os.path.join(self.temp_dir, 'empty')
+        os.makedirs(self.tools_dir)
+        os.makedirs(self.empty_dir)
+        self.cache_path = os.path.join(self.temp_dir, 'cache', 'capabilities.json')
+
+        self.ffmpeg_path = os.path.join(self.tools_dir, 'ffmpeg')
+        with open(self.ffmpeg_path, 'w') as f:
+            f.write(FAKE_FFMPEG)
+        os.chmod(self.ffmpeg_path, 0o755)
+
+        # Only the fake tools can be found
+        self.path_patch = mock.patch.dict(os.environ, {'PATH': self.empty_dir})
+        self.path_patch.start()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        import shutil
+        self.path_patch.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def count_runs(self):
+        calls_path = os.path.join(self.tools_dir, 'calls')
+        if not os.path.exists(calls_path):
+            return 0
+        with open(calls_path) as f:
+            return len(f.readlines())
+
+    def test_tools_are_detected_once_and_persisted(self):
+        """Test that tools run once per process and not at all with a warm disk cache."""
+        registry = CapabilityRegistry(cache_path=self.cache_path, search_dirs=[self.tools_dir])
+
+        ffmpeg = registry.get('ffmpeg')
+        self.assertEqual(ffmpeg['path'], os.path.realpath(self.ffmpeg_path))
+        self.assertTrue(ffmpeg['version'].startswith('ffmpeg version 6.1'))
+        self.assertEqual(ffmpeg['audio_encoders'], ['aac'])
+        self.assertIsNone(registry.path('tesseract'))
+        self.assertFalse(registry.has('ffprobe'))
+        self.assertEqual(self.count_runs(), 2)
+
+        registry.get('ffmpeg')
+        CapabilityRegistry(cache_path=self.cache_path, search_dirs=[self.tools_dir]).get('ffmpeg')
+        self.assertEqual(self.count_runs(), 2)
+
+    def test_changed_binary_or_path_is_detected_again(self):
+        """Test that the disk cache is invalidated by a new binary or a different PATH."""
+        CapabilityRegistry(cache_path=self.cache_path, search_dirs=[self.tools_dir]).get('ffmpeg')
+
+        stat = os.stat(self.ffmpeg_path)
+        os.utime(self.ffmpeg_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        CapabilityRegistry(cache_path=self.cache_path, search_dirs=[self.tools_dir]).get('ffmpeg')
+        self.assertEqual(self.count_runs(), 4)
+
+        with mock.patch.dict(os.environ, {'PATH': os.pathsep.join([self.empty_dir, self.temp_dir])}):
+            CapabilityRegistry(cache_path=self.cache_path, search_dirs=[self.tools_dir]).get('ffmpeg')
+        self.assertEqual(self.count_runs(), 6)
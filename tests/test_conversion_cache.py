@@ -0,0 +1,93 @@
+# tests/test_conversion_cache.py
+import os
+import unittest
+import tempfile
+from unittest import mock
+from utils.conversion_cache import CACHE_VERSIONS, ConversionCache
+
+class TestConversionCache(unittest.TestCase):
+    """Test cases for ConversionCache."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ConversionCache(
+            os.path.join(self.temp_dir, 'cache'),
+            max_size=1024,
+            output_dir=self.temp_dir
+        )
+
+        self.input_path = os.path.join(self.temp_dir, 'input.txt')
+        with open(self.input_path, 'wb') as f:
+            f.write(b'input data')
+
+        self.calls = 0
+
+    def tearDown(self):
+        """Clean up after tests."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _convert(self, output_path, data=b'converted'):
+        """Fake conversion that counts how often it runs."""
+        def create():
+            self.calls += 1
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            return output_path
+        return create
+
+    def test_hit_skips_conversion(self):
+        """Test that a repeated conversion is served from the cache."""
+        first = os.path.join(self.temp_dir, 'first.txt')
+        second = os.path.join(self.temp_dir, 'second.txt')
+
+        self.cache.get_or_create(self.input_path, 'op', {'a': 1}, self._convert(first), 'txt', first)
+        result = self.cache.get_or_create(self.input_path, 'op', {'a': 1}, self._convert(second), 'txt', second)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(result, second)
+        with open(second, 'rb') as f:
+            self.assertEqual(f.read(), b'converted')
+        self.assertEqual(self.cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_key_depends_on_options_and_format(self):
+        """Test that different options or output formats are cached separately."""
+        key = self.cache.make_key(self.input_path, 'op', {'a': 1, 'b': (1, 2)}, 'png')
+
+        self.assertEqual(key, self.cache.make_key(self.input_path, 'op', {'b': [1, 2], 'a': 1}, 'png'))
+        self.assertNotEqual(key, self.cache.make_key(self.input_path, 'op', {'a': 2, 'b': (1, 2)}, 'png'))
+        self.assertNotEqual(key, self.cache.make_key(self.input_path, 'op', {'a': 1, 'b': (1, 2)}, 'webp'))
+        self.assertNotEqual(key, self.cache.make_key(self.input_path, 'other', {'a': 1, 'b': (1, 2)}, 'png'))
+
+    def test_version_bump_only_affects_its_operation(self):
+        """Test that bumping one operation's version leaves other operations' keys alone."""
+        image_key = self.cache.make_key(self.input_path, 'convert_image', {}, 'png')
+        pdf_key = self.cache.make_key(self.input_path, 'pdf_compress', {}, 'pdf')
+
+        with mock.patch.dict(CACHE_VERSIONS, {'convert_image': CACHE_VERSIONS['convert_image'] + 1}):
+            self.assertNotEqual(image_key, self.cache.make_key(self.input_path, 'convert_image', {}, 'png'))
+            self.assertEqual(pdf_key, self.cache.make_key(self.input_path, 'pdf_compress', {}, 'pdf'))
+
+    def test_eviction_keeps_cache_within_max_size(self):
+        """Test that least recently used entries are evicted."""
+        for i in range(4):
+            result_path = os.path.join(self.temp_dir, f'result_{i}.bin')
+            with open(result_path, 'wb') as f:
+                f.write(b'x' * 400)
+            self.cache.put(f'key{i}', 'bin', result_path)
+
+        total_size = sum(entry.stat().st_size for entry in os.scandir(self.cache.cache_dir))
+        self.assertLessEqual(total_size, 1024)
+        self.assertIsNotNone(self.cache.get('key3', 'bin'))
+        self.assertIsNone(self.cache.get('key0', 'bin'))
+
+    def test_disabled_cache_always_converts(self):
+        """Test that a disabled cache runs every conversion."""
+        cache = ConversionCache(os.path.join(self.temp_dir, 'disabled'), enabled=False)
+        output_path = os.path.join(self.temp_dir, 'out.txt')
+
+        cache.get_or_create(self.input_path, 'op', {}, self._convert(output_path), 'txt', output_path)
+        cache.get_or_create(self.input_path, 'op', {}, self._convert(output_path), 'txt', output_path)
+
+        self.assertEqual(self.calls, 2)
@@ -0,0 +1,96 @@
+# tests/test_file_utils.py
+import os
+import unittest
+import tempfile
+from flask import Flask
+from utils.file_utils import send_download, get_download_mimetype
+
+class TestSendDownload(unittest.TestCase):
+    """Test cases for the streaming download helper."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+
+        @self.app.route('/download/<name>')
+        def download(name):
+            return send_download(os.path.join(self.temp_dir, name), 'result.pdf')
+
+        @self.app.route('/keep/<name>')
+        def keep(name):
+            return send_download(os.path.join(self.temp_dir, name), 'result.pdf', delete_after=False)
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _create_file(self, name, data=b'0123456789' * 100):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_streams_and_deletes_after_send(self):
+        """Test that the file is sent in full and removed once the response closes."""
+        path = self._create_file('full.pdf')
+
+        response = self.client.get('/download/full.pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'0123456789' * 100)
+        self.assertEqual(response.headers['Content-Type'], 'application/pdf')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        self.assertIsNotNone(response.headers.get('ETag'))
+
+        response.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_range_request(self):
+        """Test that a byte range returns partial content."""
+        self._create_file('range.pdf')
+
+        response = self.client.get('/download/range.pdf', headers={'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, b'0123456789')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 10-19/1000')
+        response.close()
+
+    def test_if_none_match(self):
+        """Test that a matching ETag returns 304 until the file changes."""
+        path = self._create_file('kept.pdf')
+        first = self.client.get('/keep/kept.pdf')
+        etag = first.headers['ETag']
+        first.close()
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.client.get('/keep/kept.pdf', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response.close()
+
+        # A rewritten file gets a new ETag, whatever its content
+        os.remove(path)
+        self._create_file('kept.pdf', b'9876543210' * 100)
+        response = self.client.get('/keep/kept.pdf', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_not_modified_still_cleans_up(self):
+        """Test that a 304 for a temporary file still deletes it."""
+        path = self._create_file('temporary.pdf')
+        first = self.client.get('/keep/temporary.pdf')
+        etag = first.headers['ETag']
+        first.close()
+
+        response = self.client.get('/download/temporary.pdf', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response.close()
+        self.assertFalse(os.path.exists(path))
+
+    def test_download_mimetype_fallback(self):
+        """Test MIME type detection for extensions mimetypes may not know."""
+        self.assertEqual(get_download_mimetype('report.pdf'), 'application/pdf')
+        self.assertEqual(get_download_mimetype('archive.zip'), 'application/zip')
+        self.assertEqual(get_download_mimetype('unknown.xyz123'), 'application/octet-stream')
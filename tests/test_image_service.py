@@ -0,0 +1,162 @@
+# tests/test_image_service.py
+import os
+import unittest
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+from PIL import Image
+from services import image_service
+from services.image_service import ImageService
+
+class TestImageService(unittest.TestCase):
+    """Test cases for image service."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.service = ImageService(temp_dir=self.temp_dir)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_sepia_matches_per_pixel_formula(self):
+        """Test that the sepia filter maps every gray level like the per-pixel loop."""
+        gray = Image.new('L', (256, 1))
+        gray.putdata(list(range(256)))
+        img = gray.convert('RGBA')
+
+        result = self.service._apply_sepia(img)
+
+        self.assertEqual(result.mode, 'RGB')
+        self.assertEqual(result.size, img.size)
+        for level in range(256):
+            self.assertEqual(result.getpixel((level, 0)), (
+                min(255, int(level * 1.07)),
+                min(255, int(level * 0.74)),
+                min(255, int(level * 0.43)),
+            ))
+
+    def test_batch_convert_images_keeps_order_and_errors(self):
+        """Test that a parallel batch returns per-item results in input order."""
+        jobs = []
+        for index in range(5):
+            input_path = os.path.join(self.temp_dir, f'input_{index}.png')
+            if index == 2:
+                # Not an image; this item should fail without affecting the rest
+                with open(input_path, 'w') as f:
+                    f.write('not an image')
+            else:
+                Image.new('RGB', (20 + index, 10), (index * 40, 0, 0)).save(input_path)
+            jobs.append((input_path, os.path.join(self.temp_dir, f'output_{index}.jpg')))
+
+        results = self.service.batch_convert_images(jobs, {'filter': 'grayscale'}, workers=2, max_in_flight=2)
+
+        self.assertEqual([result['input_path'] for result in results], [job[0] for job in jobs])
+        for index, result in enumerate(results):
+            if index == 2:
+                self.assertIsNone(result['output_path'])
+                self.assertTrue(result['error'])
+            else:
+                self.assertIsNone(result['error'])
+                with Image.open(result['output_path']) as img:
+                    self.assertEqual(img.size, (20 + index, 10))
+
+    def test_batches_share_one_pool(self):
+        """Test that batches reuse the shared image pool instead of starting their own."""
+        input_path = os.path.join(self.temp_dir, 'input.png')
+        Image.new('RGB', (20, 10), (200, 0, 0)).save(input_path)
+        image_service.shutdown_image_pool()
+        self.addCleanup(image_service.shutdown_image_pool)
+
+        with mock.patch.object(image_service, 'ProcessPoolExecutor', wraps=ProcessPoolExecutor) as executor:
+            for batch in range(3):
+                jobs = [(input_path, os.path.join(self.temp_dir, f'output_{batch}_{index}.jpg')) for index in range(3)]
+                results = self.service.batch_convert_images(jobs, workers=2)
+                self.assertEqual([result['error'] for result in results], [None] * 3)
+        self.assertEqual(executor.call_count, 1)
+
+    def test_resize_large_jpeg_keeps_requested_size(self):
+        """Test that draft decoding does not change the computed output size."""
+        input_path = os.path.join(self.temp_dir, 'large.jpg')
+        output_path = os.path.join(self.temp_dir, 'small.png')
+        Image.new('RGB', (3001, 2000), (200, 100, 50)).save(input_path)
+
+        self.service.convert_image(input_path, output_path, {'resize': (300, None)})
+
+        with Image.open(output_path) as img:
+            self.assertEqual(img.size, (300, int(2000 * 300 / 3001)))
+            self.assertEqual(img.getpixel((150, 100))[:3], (200, 100, 50))
+
+    def test_processing_plan_fuses_steps(self):
+        """Test that crop, resize, rotate, flip, brightness and contrast are fused."""
+        img = Image.new('RGB', (400, 300), (120, 80, 40))
+        options = {
+            'resize': (200, None),
+            'crop': (10, 10, 110, 60),
+            'rotate': 90,
+            'flip': 'horizontal',
+            'brightness': 1.2,
+            'contrast': 0.8,
+            'sharpness': 1.0,
+        }
+
+        steps = self.service._plan_image_processing(img, options)
+        self.assertEqual([name for name, _, _ in steps], ['crop+resize', 'transpose', 'brightness+contrast'])
+
+        result = self.service._apply_image_processing(img, options)
+        self.assertEqual(result.size, (50, 100))
+
+        # Options that do not change the image are skipped entirely
+        no_op = {'resize': (400, 300), 'crop': (0, 0, 400, 300), 'rotate': 360, 'brightness': 1.0}
+        self.assertEqual(self.service._plan_image_processing(img, no_op), [])
+
+    def test_fused_steps_match_separate_operations(self):
+        """Test that transposes and tone curves give the same pixels as separate passes."""
+        from PIL import ImageEnhance, ImageChops, ImageOps
+        gradient = Image.radial_gradient('L').resize((64, 48))
+        img = Image.merge('RGB', [gradient, ImageOps.invert(gradient), gradient.rotate(90)])
+
+        for angle in (90, 180, 270, -90):
+            for flip in ('horizontal', 'vertical'):
+                expected = img.rotate(angle, expand=True, resample=Image.BICUBIC)
+                expected = ImageOps.mirror(expected) if flip == 'horizontal' else ImageOps.flip(expected)
+                result = self.service._apply_image_processing(img, {'rotate': angle, 'flip': flip})
+                self.assertEqual(result.tobytes(), expected.tobytes())
+
+        for mode in ('L', 'RGB', 'RGBA'):
+            source = img.convert(mode)
+            for brightness, contrast in ((1.3, 1.0), (1.0, 0.6), (0.8, 1.5)):
+                expected = ImageEnhance.Contrast(ImageEnhance.Brightness(source).enhance(brightness)).enhance(contrast)
+                result = self.service._apply_image_processing(source, {'brightness': brightness, 'contrast': contrast})
+                self.assertIsNone(ImageChops.difference(result, expected).getbbox())
+
+    def test_large_image_is_processed_in_strips(self):
+        """Test that images above the memory limit give the same output in strips."""
+        from PIL import ImageChops
+        gradient = Image.radial_gradient('L').resize((600, 400))
+        input_path = os.path.join(self.temp_dir, 'large.bmp')
+        Image.merge('RGB', [gradient, gradient.rotate(90), gradient.transpose(Image.FLIP_LEFT_RIGHT)]).save(input_path)
+
+        strip_service = ImageService(temp_dir=self.temp_dir, memory_limit=100 * 1024)
+        options = {'resize': (250, None), 'crop': (10, 10, 200, 150), 'brightness': 1.1, 'contrast': 0.9}
+
+        for name, service in (('whole.png', self.service), ('strips.png', strip_service)):
+            service.convert_image(input_path, os.path.join(self.temp_dir, name), options)
+            service.add_watermark(input_path, os.path.join(self.temp_dir, f'watermark_{name}'), 'Draft')
+
+        with Image.open(os.path.join(self.temp_dir, 'whole.png')) as whole, \
+                Image.open(os.path.join(self.temp_dir, 'strips.png')) as strips:
+            self.assertEqual(strips.size, (190, 140))
+            # Only float rounding of the resample box may differ, scaled by the brightness gain
+            self.assertLessEqual(max(high for _, high in ImageChops.difference(whole, strips).getextrema()), 2)
+
+        with Image.open(os.path.join(self.temp_dir, 'watermark_whole.png')) as whole, \
+                Image.open(os.path.join(self.temp_dir, 'watermark_strips.png')) as strips:
+            self.assertIsNone(ImageChops.difference(whole, strips).getbbox())
+
+        # Options that need the whole image are refused above the limit
+        with self.assertRaises(ValueError):
+            strip_service.convert_image(input_path, os.path.join(self.temp_dir, 'rotated.png'), {'rotate': 45})
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'rotated.png')))
@@ -0,0 +1,106 @@
+# tests/test_image_tiling.py
+import os
+import unittest
+import tempfile
+from unittest import mock
+from PIL import Image
+from utils.image_tiling import (StripReader, PngStripWriter, CanvasStripWriter, check_pixel_count, open_converted,
+                                open_image, open_strip_writer)
+
+class TestImageTiling(unittest.TestCase):
+    """Test cases for strip-by-strip image reading and writing."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        gradient = Image.radial_gradient('L').resize((120, 90))
+        self.image = Image.merge('RGB', [gradient, gradient.rotate(90), gradient.transpose(Image.FLIP_LEFT_RIGHT)])
+
+    def tearDown(self):
+        """Clean up after tests."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_reads_only_requested_rows(self):
+        """Test that uncompressed sources decode just the requested rows."""
+        for extension in ('bmp', 'tif', 'ppm'):
+            path = os.path.join(self.temp_dir, f'source.{extension}')
+            self.image.save(path)
+
+            with StripReader(path) as reader:
+                self.assertTrue(reader.row_decoding)
+                for top, bottom in ((0, 10), (37, 61), (80, 90)):
+                    strip = reader.read(top, bottom)
+                    self.assertEqual(strip.size, (120, bottom - top))
+                    self.assertEqual(strip.tobytes(), self.image.crop((0, top, 120, bottom)).tobytes())
+
+    def test_compressed_source_falls_back_to_whole_decode(self):
+        """Test that compressed sources still return the right rows."""
+        path = os.path.join(self.temp_dir, 'source.png')
+        self.image.save(path)
+
+        with StripReader(path) as reader:
+            self.assertFalse(reader.row_decoding)
+            self.assertEqual(reader.read(20, 30).tobytes(), self.image.crop((0, 20, 120, 30)).tobytes())
+
+    def test_compressed_source_above_memory_limit_is_rejected(self):
+        """Test that compressed sources are not decoded whole beyond the memory limit."""
+        path = os.path.join(self.temp_dir, 'source.png')
+        self.image.save(path)
+        with self.assertRaises(ValueError):
+            StripReader(path, memory_limit=120 * 90)
+
+        # A JPEG decoded at a reduced draft scale may fit where the full size does not
+        path = os.path.join(self.temp_dir, 'source.jpg')
+        self.image.resize((960, 720)).save(path)
+        with self.assertRaises(ValueError):
+            StripReader(path, memory_limit=960 * 720)
+        with StripReader(path, draft_size=(120, 90), memory_limit=960 * 720) as reader:
+            self.assertEqual(reader.size, (120, 90))
+            self.assertEqual(reader.read(0, 10).size, (120, 10))
+
+    def test_png_strip_writer(self):
+        """Test that a PNG written in strips decodes to the original pixels."""
+        path = os.path.join(self.temp_dir, 'output.png')
+        writer = PngStripWriter(path, self.image.size, 'RGB')
+        for top in range(0, 90, 25):
+            writer.write(self.image.crop((0, top, 120, min(90, top + 25))))
+        writer.close()
+
+        with Image.open(path) as result:
+            self.assertEqual(result.mode, 'RGB')
+            self.assertEqual(result.tobytes(), self.image.tobytes())
+
+    def test_pixel_count_limit(self):
+        """Test that images above the pixel limit are rejected before decoding."""
+        with self.assertRaises(ValueError):
+            check_pixel_count(self.image, max_pixels=1000)
+        check_pixel_count(self.image, max_pixels=120 * 90)
+
+    def test_open_image_only_lowers_pillow_limit(self):
+        """Test that the configured pixel limit applies on top of Pillow's, which is left alone."""
+        path = os.path.join(self.temp_dir, 'source.png')
+        self.image.save(path)
+
+        with open_image(path, max_pixels=120 * 90) as img:
+            self.assertEqual(img.size, (120, 90))
+        with self.assertRaises(ValueError):
+            open_image(path, max_pixels=1000)
+
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            with self.assertRaises(ValueError):
+                open_image(path, max_pixels=120 * 90)
+            self.assertEqual(Image.MAX_IMAGE_PIXELS, 1000)
+
+    def test_full_size_buffers_above_memory_limit_are_refused(self):
+        """Test that output canvases and converted images must fit in the memory limit."""
+        path = os.path.join(self.temp_dir, 'source.bmp')
+        self.image.save(path)
+
+        with self.assertRaises(ValueError):
+            open_strip_writer(os.path.join(self.temp_dir, 'output.jpg'), (120, 90), 'RGB', memory_limit=120 * 90)
+        self.assertIsInstance(open_strip_writer(os.path.join(self.temp_dir, 'output.jpg'), (120, 90), 'RGB',
+                                                memory_limit=4 * 120 * 90), CanvasStripWriter)
+        with self.assertRaises(ValueError):
+            open_converted(path, 'RGB', memory_limit=120 * 90)
+        self.assertEqual(open_converted(path, 'L', memory_limit=120 * 90).size, (120, 90))
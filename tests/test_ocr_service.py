@@ -0,0 +1,360 @@
+# tests/test_ocr_service.py
+import io
+import os
+import shutil
+import itertools
+import unittest
+import tempfile
+from unittest import mock
+from flask import Flask
+from flask_login import LoginManager
+from services import ocr_service
+from services.ocr_service import OCRService, _classify_page, _page_text, _parse_tsv, _render_page, _text_layer
+from utils.capabilities import get_registry
+from utils.conversion_cache import get_conversion_cache
+from utils.ocr_cache import OCRCache
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+try:
+    import pytesseract
+    OCR_AVAILABLE = PYMUPDF_AVAILABLE and get_registry().has('tesseract')
+except ImportError:
+    OCR_AVAILABLE = False
+
+@unittest.skipUnless(PYMUPDF_AVAILABLE, 'PyMuPDF is not installed')
+class TestOCRPages(unittest.TestCase):
+    """Test cases for preparing PDF pages for OCR."""
+
+    def make_mixed_pdf(self):
+        """Return a PDF with a born-digital page, a scan, a blank page and a page with a photo."""
+        pdf = fitz.open()
+        pdf.new_page().insert_text((72, 72), 'Born-digital text that can simply be extracted. ' * 3)
+
+        scan = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 850, 1100), False)
+        scan.clear_with(255)
+        scanned = pdf.new_page()
+        scanned.insert_image(scanned.rect, pixmap=scan)
+        scanned.insert_text((20, 20), 'Scanner v2', fontsize=6)  # A stamp is not a text layer
+
+        pdf.new_page()
+
+        illustrated = pdf.new_page()
+        illustrated.insert_image(illustrated.rect, pixmap=scan)
+        illustrated.insert_text((72, 720), 'A photo caption, long enough to count as the text layer of this page.')
+        return pdf
+
+    def test_only_scanned_pages_need_ocr(self):
+        """Test that pages are classified from their text layer and image coverage."""
+        pdf = self.make_mixed_pdf()
+
+        needs_ocr = [_classify_page(page)[0] for page in pdf]
+
+        self.assertEqual(needs_ocr, [False, True, False, False])
+        self.assertIn('Born-digital text', _classify_page(pdf[0])[1])
+
+    def test_pages_with_text_are_not_recognized(self):
+        """Test that a document without scans is reported as skipped and never reaches Tesseract."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        pdf = self.make_mixed_pdf()
+        pdf.delete_page(1)
+        pdf_path = os.path.join(temp_dir, 'digital.pdf')
+        pdf.save(pdf_path)
+        report = {}
+
+        with mock.patch('services.ocr_service._recognize') as recognize:
+            texts = OCRService(temp_dir, cache=OCRCache(temp_dir, enabled=False))._ocr_pdf_pages(pdf_path, report=report)
+
+        recognize.assert_not_called()
+        self.assertEqual(report, {'pages': 3, 'ocr_pages': 0, 'skipped_pages': 3})
+        self.assertEqual(len(texts), 3)
+
+    def test_page_is_rendered_in_memory(self):
+        """Test that pages are rendered to an uncompressed image at the requested DPI and colorspace."""
+        pdf = fitz.open()
+        page = pdf.new_page(width=72, height=36)  # One inch by half an inch
+
+        gray = _render_page(page, dpi=200, grayscale=True)
+        color = _render_page(page, dpi=100, grayscale=False)
+
+        self.assertTrue(gray.startswith(b'P5\n200 100\n255\n'))
+        self.assertEqual(len(gray), len(b'P5\n200 100\n255\n') + 200 * 100)
+        self.assertTrue(color.startswith(b'P6\n100 50\n255\n'))
+
+    def test_text_layer_is_added_to_scanned_pages(self):
+        """Test that recognized text is laid invisibly over the original pages, rotated ones included."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        pdf = self.make_mixed_pdf()
+        for rotation in (90, 270):
+            pdf.fullcopy_page(1)
+            pdf[-1].set_rotation(rotation)
+        input_path = os.path.join(temp_dir, 'mixed.pdf')
+        output_path = os.path.join(temp_dir, 'searchable.pdf')
+        pdf.save(input_path)
+
+        def recognize(image_data, language, tesseract_cmd, dpi):
+            # One word, here at the top left of the page as displayed
+            width, height = map(int, image_data.split(b'\n')[1].split())
+            bbox = [round(point * dpi / 72) for point in (30, 25, 130, 45)]
+            return {'width': width, 'height': height, 'words': [['recognized', bbox, None, [0, 0, 0]]]}
+
+        with mock.patch('services.ocr_service._recognize', side_effect=recognize):
+            service = OCRService(temp_dir, cache=OCRCache(os.path.join(temp_dir, 'cache')))
+            service._make_searchable_pdf(input_path, output_path, workers=1)
+
+        with fitz.open(output_path) as output:
+            self.assertEqual(len(output), 6)
+            for page in output:
+                words = [word for word in page.get_text('words') if word[4] == 'recognized']
+                self.assertEqual(len(words), 1 if page.number in (1, 4, 5) else 0)
+                if words:
+                    # Still in the displayed top left corner, and the scan is kept
+                    box = fitz.Rect(words[0][:4]) * page.rotation_matrix
+                    self.assertLess(max(box.x0, box.y0), 60)
+                    self.assertEqual(len(page.get_images()), 1)
+
+    def test_unchanged_pages_come_from_the_cache(self):
+        """Test that a rerun of an edited document only recognizes the changed page."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        service = OCRService(temp_dir, cache=OCRCache(os.path.join(temp_dir, 'cache')))
+
+        scan = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 850, 1100), False)
+        scan.clear_with(255)
+        pdf = fitz.open()
+        for number in range(4):
+            page = pdf.new_page()
+            page.insert_image(page.rect, pixmap=scan)
+            page.draw_rect(fitz.Rect(100, 100 + 50 * number, 300, 130 + 50 * number), fill=(0, 0, 0))
+        first_path = os.path.join(temp_dir, 'first.pdf')
+        pdf.save(first_path)
+        pdf[2].draw_circle((300, 500), 40, fill=(0, 0, 0))
+        edited_path = os.path.join(temp_dir, 'edited.pdf')
+        pdf.save(edited_path)
+
+        recognized = itertools.count()
+
+        def recognize(image_data, language, tesseract_cmd, dpi):
+            words = [['page', [100, 100, 180, 130], 125, [0, 0, 0]],
+                     [str(next(recognized)), [200, 100, 220, 130], 125, [0, 0, 0]],
+                     [language, [100, 150, 160, 180], None, [0, 0, 1]]]
+            return {'width': 1275, 'height': 1650, 'words': words}
+
+        with mock.patch('services.ocr_service._recognize', side_effect=recognize) as mocked:
+            first = service._ocr_pdf_pages(first_path, workers=1)
+            edited = service._ocr_pdf_pages(edited_path, workers=1)
+            self.assertEqual(mocked.call_count, 5)
+            self.assertEqual(service.cache.get_stats(), {'hits': 3, 'misses': 5})
+
+            # The text layer is built from the same entries
+            output_path = os.path.join(temp_dir, 'searchable.pdf')
+            service._make_searchable_pdf(edited_path, output_path, workers=1)
+            self.assertEqual(mocked.call_count, 5)
+            with fitz.open(output_path) as output:
+                self.assertEqual([bool(page.search_for('page 4')) for page in output], [False, False, True, False])
+
+            # Another language is another result
+            service._ocr_pdf_pages(first_path, language='deu', workers=1)
+            self.assertEqual(mocked.call_count, 9)
+
+        self.assertEqual(first, ['page 0\neng', 'page 1\neng', 'page 2\neng', 'page 3\neng'])
+        self.assertEqual(edited, ['page 0\neng', 'page 1\neng', 'page 4\neng', 'page 3\neng'])
+
+    def test_cache_evicts_least_recently_used_pages(self):
+        """Test that the cache stays within its size, dropping the pages used longest ago."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        cache = OCRCache(temp_dir, max_size=250)
+        keys = [cache.make_key(bytes([number]) * 10, 'eng', 150) for number in range(3)]
+        page = {'width': 10, 'height': 10, 'words': [['x' * 60, [0, 0, 10, 10], None, [0, 0, 0]]]}
+
+        for key in keys:
+            cache.put(key, page)
+            # Distinct access times without sleeping
+            os.utime(os.path.join(temp_dir, f'{key}.json'), (keys.index(key), keys.index(key)))
+        cache.get(keys[0])
+        cache.evict()
+
+        self.assertEqual(cache.get(keys[0]), page)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+        self.assertNotEqual(keys[0], cache.make_key(bytes([0]) * 10, 'eng', 300))
+
+class TestOCRWorkers(unittest.TestCase):
+    """Test cases for keeping OCR workers and language models warm."""
+
+    def tearDown(self):
+        """Clean up after tests."""
+        ocr_service.shutdown_ocr_pool()
+        ocr_service._engines.__dict__.clear()
+
+    def test_pool_is_reused_between_documents(self):
+        """Test that the OCR pool is started once and only replaced when its size changes."""
+        pool = ocr_service.get_ocr_pool(2, 1)
+
+        self.assertIs(ocr_service.get_ocr_pool(2, 1), pool)
+        self.assertIsNot(ocr_service.get_ocr_pool(3, 1), pool)
+
+    def test_engine_is_loaded_once_per_language(self):
+        """Test that pages reuse a loaded Tesseract engine instead of loading the model again."""
+        image_data = b'P5\n2 2\n255\n' + bytes(4)
+        engine = mock.MagicMock()
+
+        with mock.patch.object(ocr_service, 'tesserocr', create=True) as tesserocr, \
+                mock.patch.object(ocr_service, 'TESSEROCR_AVAILABLE', True):
+            tesserocr.PyTessBaseAPI.return_value = engine
+            tesserocr.iterate_level.return_value = []
+            results = [ocr_service._recognize(image_data, language, None, 150)
+                       for language in ('eng+deu', 'eng+deu', 'fra', 'eng+deu')]
+
+        self.assertEqual(results, [{'width': 2, 'height': 2, 'words': []}] * 4)
+        self.assertEqual(engine.Recognize.call_count, 4)
+        self.assertEqual([call.kwargs['lang'] for call in tesserocr.PyTessBaseAPI.call_args_list],
+                         ['eng+deu', 'fra'])
+
+    @unittest.skipUnless(PYMUPDF_AVAILABLE, 'PyMuPDF is not installed')
+    def test_word_boxes_become_invisible_text(self):
+        """Test that recognized word boxes are laid out as invisible text over the same area."""
+        words = [('Invoice', (150, 100, 450, 160), 150, (0, 0, 0)), ('total', (150, 300, 300, 340), None, (0, 0, 1))]
+
+        with fitz.open('pdf', _text_layer(words, 1275, 1650, 150)) as layer:
+            page = layer[0]
+            self.assertEqual((page.rect.width, page.rect.height), (612, 792))
+            found = {word[4]: fitz.Rect(word[:4]) for word in page.get_text('words')}
+            self.assertEqual(set(found), {'Invoice', 'total'})
+            for text, bbox, _, _ in words:
+                expected = fitz.Rect(bbox) * (72 / 150)
+                self.assertAlmostEqual(found[text].x0, expected.x0, delta=1)
+                self.assertAlmostEqual(found[text].x1, expected.x1, delta=2)
+            # Nothing is drawn
+            self.assertEqual(set(page.get_pixmap().samples), {255})
+
+    def test_tsv_output_becomes_lines_and_paragraphs(self):
+        """Test that Tesseract's TSV output is read into words whose text keeps the layout."""
+        rows = [
+            'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext',
+            '1\t1\t0\t0\t0\t0\t0\t0\t1275\t1650\t-1\t',
+            '2\t1\t1\t0\t0\t0\t100\t100\t400\t200\t-1\t',
+            '5\t1\t1\t1\t1\t1\t100\t100\t120\t40\t96.1\tInvoice',
+            '5\t1\t1\t1\t1\t2\t240\t100\t80\t40\t95.3\tno.',
+            '5\t1\t1\t1\t2\t1\t100\t150\t60\t40\t91.0\t42',
+            '5\t1\t1\t1\t2\t2\t170\t150\t10\t40\t-1\t ',
+            '5\t1\t2\t1\t1\t1\t100\t300\t90\t40\t93.7\tTotal',
+        ]
+
+        page = _parse_tsv('\n'.join(rows) + '\n')
+
+        self.assertEqual((page['width'], page['height']), (1275, 1650))
+        self.assertEqual(page['words'][0], ['Invoice', [100, 100, 220, 140], None, [1, 1, 1]])
+        self.assertEqual(_page_text(page), 'Invoice no.\n42\n\nTotal')
+
+@unittest.skipUnless(OCR_AVAILABLE, 'Tesseract, pytesseract or PyMuPDF is not installed')
+class TestOCRService(unittest.TestCase):
+    """Test cases for OCR service."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.service = OCRService(temp_dir=self.temp_dir, cache=OCRCache(self.temp_dir, enabled=False))
+
+        # A scanned-looking PDF: each page is only an image of its text
+        self.words = ['apple', 'river', 'candle', 'violin', 'meadow', 'harbor', 'pencil']
+        self.pdf_path = os.path.join(self.temp_dir, 'scan.pdf')
+        source = fitz.open()
+        for word in self.words:
+            page = source.new_page(width=400, height=200)
+            page.insert_text((40, 110), word, fontsize=48)
+        scan = fitz.open()
+        for page in source:
+            pix = page.get_pixmap(dpi=150)
+            scan.new_page(width=400, height=200).insert_image(fitz.Rect(0, 0, 400, 200), pixmap=pix)
+        scan.save(self.pdf_path)
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_parallel_pages_keep_page_order(self):
+        """Test that pages recognized on a process pool come back in page order."""
+        sequential = self.service._ocr_pdf_pages(self.pdf_path, workers=1)
+        parallel = self.service._ocr_pdf_pages(self.pdf_path, workers=3)
+
+        self.assertEqual(parallel, sequential)
+        self.assertEqual([text.strip().lower() for text in parallel], self.words)
+        self.assertEqual(os.listdir(self.temp_dir), ['scan.pdf'])
+
+    def test_searchable_pdf_keeps_pages(self):
+        """Test that the searchable PDF keeps the scanned pages and makes their words searchable."""
+        output_path = os.path.join(self.temp_dir, 'searchable.pdf')
+
+        self.service._make_searchable_pdf(self.pdf_path, output_path, workers=2)
+
+        with fitz.open(output_path) as output:
+            self.assertEqual(len(output), len(self.words))
+            for page, word in zip(output, self.words):
+                self.assertEqual(len(page.get_images()), 1)
+                self.assertTrue(page.search_for(word))
+
+@unittest.skipUnless(PYMUPDF_AVAILABLE, 'PyMuPDF is not installed')
+class TestOCRRoute(unittest.TestCase):
+    """Test cases for caching of the OCR route's results."""
+
+    def setUp(self):
+        """Set up test environment."""
+        from routes.pdf_routes import pdf_bp
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(TEMP_FOLDER=self.temp_dir, CONVERSION_CACHE_DIR=os.path.join(self.temp_dir, 'cache'))
+        self.app.register_blueprint(pdf_bp)
+        LoginManager(self.app).user_loader(lambda user_id: None)
+        self.client = self.app.test_client()
+
+        document = fitz.open()
+        document.new_page().insert_text((72, 72), 'scanned')
+        self.pdf_data = document.tobytes()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.temp_dir)
+
+    def post(self):
+        response = self.client.post('/pdf/ocr', data={
+            'file': (io.BytesIO(self.pdf_data), 'scan.pdf'), 'output_format': 'txt'
+        })
+        data = response.data
+        response.close()
+        return response.status_code, data
+
+    def test_failed_ocr_is_not_cached(self):
+        """Test that notices and error files are returned but never stored in the cache."""
+        def fail(input_path, output_format, language, report):
+            return OCRService(self.temp_dir, cache=OCRCache(self.temp_dir, enabled=False)).perform_ocr(
+                input_path, output_format, language, report)
+
+        def recognize(input_path, output_format, language, report):
+            report.update(pages=1, ocr_pages=1, skipped_pages=0)
+            output_path = os.path.join(self.temp_dir, 'recognized.txt')
+            with open(output_path, 'w') as f:
+                f.write('scanned')
+            return output_path
+
+        with mock.patch('routes.pdf_routes.pdf_service.perform_ocr', side_effect=fail), \
+                mock.patch.object(OCRService, '_check_tesseract', return_value=True), \
+                mock.patch.object(OCRService, '_ocr_pdf_pages', side_effect=RuntimeError('tesseract crashed')):
+            for _ in range(2):
+                self.assertEqual(self.post(), (200, b'OCR processing error: tesseract crashed'))
+
+        with mock.patch('routes.pdf_routes.pdf_service.perform_ocr', side_effect=recognize) as perform_ocr:
+            for _ in range(2):
+                self.assertEqual(self.post(), (200, b'scanned'))
+        self.assertEqual(perform_ocr.call_count, 1)
+
+        with self.app.app_context():
+            self.assertEqual(get_conversion_cache().get_stats(), {'hits': 1, 'misses': 3})
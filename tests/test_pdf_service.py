@@ -2,7 +2,17 @@
 import os
 import unittest
 import tempfile
-from services.pdf_service import PDFService
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+import config
+from services import pdf_service
+from services.pdf_service import PDFService, _get_watermark_overlay
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
 
 class TestPDFService(unittest.TestCase):
     """Test cases for PDFService."""
@@ -31,6 +41,35 @@ class TestPDFService(unittest.TestCase):
         self.assertEqual(len(output_paths), 1)
         self.assertTrue(os.path.exists(output_paths[0]))
     
+    @unittest.skipUnless(PYMUPDF_AVAILABLE, 'PyMuPDF is not installed')
+    def test_split_copies_shared_objects_once_per_part(self):
+        """Test that parts are written in order with one copy of a logo every page shows."""
+        logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+        logo.clear_with(128)
+        pdf = fitz.open()
+        logo_xref = 0
+        for number in range(20):
+            page = pdf.new_page(width=200, height=200)
+            logo_xref = page.insert_image(fitz.Rect(0, 0, 64, 64), pixmap=logo, xref=logo_xref)
+            page.insert_text((20, 100), f'Page {number + 1}')
+        pdf_path = os.path.join(self.temp_dir, 'logo.pdf')
+        pdf.save(pdf_path)
+        page_ranges = ['1-5', '6', '7-19', '20']
+
+        sequential = self.pdf_service.split_pdf(pdf_path, page_ranges)
+        parallel = list(self.pdf_service.iter_split_pdf(pdf_path, page_ranges, workers=2))
+
+        for paths in (sequential, parallel):
+            first_pages = []
+            for path in paths:
+                with fitz.open(path) as part:
+                    first_pages.append(part[0].get_text().strip())
+                    images = {image[0] for page in part for image in page.get_images()}
+                    self.assertEqual(len(images), 1)
+            self.assertEqual(first_pages, ['Page 1', 'Page 6', 'Page 7', 'Page 20'])
+        with self.assertRaises(ValueError):
+            self.pdf_service.iter_split_pdf(pdf_path, ['21'])
+
     def test_merge_pdfs(self):
         """Test merging PDFs."""
         # Create a second test PDF
@@ -54,4 +93,94 @@ class TestPDFService(unittest.TestCase):
         self.assertLessEqual(os.path.getsize(output_path), 
                            os.path.getsize(self.test_pdf_path) * 1.1)  # Allow 10% overhead
 
+    @unittest.skipUnless(PYMUPDF_AVAILABLE, 'PyMuPDF is not installed')
+    def test_pdf_to_images(self):
+        """Test rendering a subset of pages to each image format, in page order."""
+        pdf = fitz.open()
+        for number in range(6):
+            pdf.new_page(width=144, height=72).insert_text((10, 40), f'Page {number + 1}')
+        pdf_path = os.path.join(self.temp_dir, 'pages.pdf')
+        pdf.save(pdf_path)
+
+        for image_format, magic in (('png', b'\x89PNG'), ('jpg', b'\xff\xd8'), ('webp', b'RIFF')):
+            images = list(self.pdf_service.iter_pdf_to_images(pdf_path, image_format, 100, [5, 2, 3, 9], workers=2))
+
+            self.assertEqual([page_number for page_number, _ in images], [2, 3, 5])
+            for _, path in images:
+                with open(path, 'rb') as f:
+                    self.assertTrue(f.read().startswith(magic), image_format)
+
+        self.assertEqual(len(self.pdf_service.pdf_to_images(pdf_path, 'png', 72)), 6)
+        with self.assertRaises(ValueError):
+            self.pdf_service.iter_pdf_to_images(pdf_path, 'png', 72, [7])
+
+    @unittest.skipUnless(PYMUPDF_AVAILABLE, 'PyMuPDF is not installed')
+    def test_pdf_work_runs_on_the_shared_pool(self):
+        """Test that calls share one PDF pool and that pool workers render and split in process."""
+        pdf = fitz.open()
+        for number in range(4):
+            pdf.new_page(width=144, height=72).insert_text((10, 40), f'Page {number + 1}')
+        pdf_path = os.path.join(self.temp_dir, 'pages.pdf')
+        pdf.save(pdf_path)
+        pdf_service.shutdown_pdf_pool()
+        self.addCleanup(pdf_service.shutdown_pdf_pool)
+
+        with mock.patch.object(pdf_service, 'ProcessPoolExecutor', wraps=ProcessPoolExecutor) as executor:
+            for _ in range(2):
+                self.assertEqual(len(list(self.pdf_service.iter_pdf_to_images(pdf_path, 'png', 72, workers=2))), 4)
+                self.assertEqual(len(list(self.pdf_service.iter_split_pdf(pdf_path, ['1-2', '3', '4'], workers=2))), 3)
+        self.assertEqual(executor.call_count, 1)
+
+        with mock.patch.object(pdf_service, '_in_worker_process', return_value=True), \
+                mock.patch.object(pdf_service, 'get_pdf_pool') as get_pdf_pool:
+            self.assertEqual(len(list(self.pdf_service.iter_pdf_to_images(pdf_path, 'png', 72, workers=2))), 4)
+            self.assertEqual(len(list(self.pdf_service.iter_split_pdf(pdf_path, ['1-2', '3', '4'], workers=2))), 3)
+        get_pdf_pool.assert_not_called()
+
+    @unittest.skipUnless(PYMUPDF_AVAILABLE, 'PyMuPDF is not installed')
+    def test_pdf_to_images_caps_resolution(self):
+        """Test that the DPI is capped, and lowered further for pages above the pixel limit."""
+        pdf = fitz.open()
+        pdf.new_page(width=72, height=72)
+        pdf.new_page(width=720, height=720)
+        pdf_path = os.path.join(self.temp_dir, 'sizes.pdf')
+        pdf.save(pdf_path)
+
+        with mock.patch.multiple(config.Config, PDF_IMAGE_MAX_DPI=300, PDF_IMAGE_MAX_PIXELS=1000 * 1000):
+            paths = self.pdf_service.pdf_to_images(pdf_path, 'png', 600)
+
+        sizes = [fitz.Pixmap(path).width for path in paths]
+        self.assertEqual(sizes, [300, 1000])
+
+    @unittest.skipUnless(PYMUPDF_AVAILABLE, 'PyMuPDF is not installed')
+    def test_add_watermark(self):
+        """Test that every page references one shared watermark, placed on the page as displayed."""
+        pdf = fitz.open()
+        for number in range(50):
+            page = pdf.new_page(width=400, height=600)
+            page.insert_text((50, 300), f'Page {number + 1}')
+            page.set_rotation(90 * (number % 4))
+        pdf_path = os.path.join(self.temp_dir, 'pages.pdf')
+        pdf.save(pdf_path)
+
+        output_path = self.pdf_service.add_watermark(pdf_path, 'CONFIDENTIAL', 'top', 0.5)
+
+        xobjects = set()
+        with fitz.open(output_path) as output:
+            for page in output:
+                xobjects.update(xref for xref, *_ in page.get_xobjects())
+                words = [fitz.Rect(word[:4]) * page.rotation_matrix
+                         for word in page.get_text('words') if word[4] == 'CONFIDENTIAL']
+                self.assertEqual(len(words), 1)
+                # At the top of the page as displayed, and centered
+                self.assertLess(words[0].y1, 100)
+                self.assertAlmostEqual((words[0].x0 + words[0].x1) / 2, page.rect.width / 2, delta=2)
+                self.assertIn('Page', page.get_text())
+        # One per page layout, i.e. per rotation
+        self.assertEqual(len(xobjects), 4)
+        self.assertLess(os.path.getsize(output_path) - os.path.getsize(pdf_path), 50 * 200)
+        # The overlay is laid out once and reused by later requests
+        self.assertIs(_get_watermark_overlay('CONFIDENTIAL', 'top', 0.5, 400, 600),
+                      _get_watermark_overlay('CONFIDENTIAL', 'top', 0.5, 400, 600))
+
 # More test cases would be added for other services
\ No newline at end of file
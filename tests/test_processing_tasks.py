@@ -0,0 +1,150 @@
+# tests/test_processing_tasks.py
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from PIL import Image
+from tasks import processing_tasks
+from tasks.processing_tasks import OPERATION_EXECUTORS, get_worker_stats, queue_task, shutdown_workers, start_workers
+
+class TestProcessingTasks(unittest.TestCase):
+    """Test cases for the background task workers."""
+
+    def setUp(self):
+        """Set up test environment."""
+        # Fresh queues and statistics for each test
+        patches = [
+            mock.patch.dict(processing_tasks.task_queues, {'process': queue.Queue(), 'thread': queue.Queue()}),
+            mock.patch.dict(processing_tasks._stats, {
+                'started_at': None, 'in_flight': {'process': 0, 'thread': 0}, 'operations': {},
+            }),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutdown_workers, drain=False, timeout=5)
+
+        self.results = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def execute(self, task):
+        """Stand-in for execute_operation; waits for release, fails on request."""
+        self.started.set()
+        self.release.wait(5)
+        if task.get('fail'):
+            raise RuntimeError('conversion failed')
+        return task['output_path']
+
+    def task(self, name, operation='convert_document', **extra):
+        return dict(operation=operation, output_path=name, callback=self.results.append, **extra)
+
+    def test_operations_are_queued_by_executor_kind(self):
+        """Test that each operation goes to the queue of its executor, and unknown ones to threads."""
+        with mock.patch.object(processing_tasks, 'start_workers'):
+            for operation in OPERATION_EXECUTORS:
+                queue_task({'operation': operation})
+            queue_task({'operation': 'something_new'})
+
+        queued = {
+            kind: [task['operation'] for task in task_queue.queue]
+            for kind, task_queue in processing_tasks.task_queues.items()
+        }
+        self.assertEqual(queued['process'], [op for op, kind in OPERATION_EXECUTORS.items() if kind == 'process'])
+        self.assertEqual(queued['thread'][-1], 'something_new')
+        self.assertEqual(len(queued['process']) + len(queued['thread']), len(OPERATION_EXECUTORS) + 1)
+
+    def test_pooled_operations_do_not_run_in_worker_processes(self):
+        """Test that operations with a pool of their own are not routed to the process pool."""
+        for operation in ('pdf_split', 'pdf_ocr'):
+            self.assertEqual(OPERATION_EXECUTORS[operation], 'thread')
+
+    def test_shutdown_drains_queued_tasks(self):
+        """Test that a draining shutdown finishes every queued task and reports it."""
+        with mock.patch.object(processing_tasks, 'execute_operation', side_effect=self.execute):
+            start_workers(process_workers=1, thread_workers=1)
+            self.assertEqual(get_worker_stats()['workers'], {'process': 1, 'thread': 1})
+
+            self.release.clear()
+            queue_task(self.task('first'))
+            self.started.wait(5)
+            for name in ('second', 'third'):
+                queue_task(self.task(name))
+            queue_task(self.task('broken', fail=True))
+            self.assertEqual(get_worker_stats()['queue_depth'], {'process': 0, 'thread': 3})
+            self.assertEqual(get_worker_stats()['in_flight'], {'process': 0, 'thread': 1})
+
+            threading.Timer(0.2, self.release.set).start()
+            shutdown_workers(drain=True, timeout=5)
+
+        self.assertEqual(self.results, ['first', 'second', 'third'])
+        stats = get_worker_stats()
+        self.assertEqual((stats['completed'], stats['failed']), (3, 1))
+        self.assertEqual(stats['operations']['convert_document']['completed'], 3)
+        self.assertEqual(stats['in_flight'], {'process': 0, 'thread': 0})
+        self.assertEqual(stats['workers'], {})
+
+    def test_shutdown_without_drain_discards_queued_tasks(self):
+        """Test that a non-draining shutdown finishes the running task and drops the queue."""
+        with mock.patch.object(processing_tasks, 'execute_operation', side_effect=self.execute):
+            start_workers(process_workers=1, thread_workers=1)
+
+            self.release.clear()
+            queue_task(self.task('running'))
+            self.started.wait(5)
+            for name in ('queued', 'also queued'):
+                queue_task(self.task(name))
+
+            threading.Timer(0.2, self.release.set).start()
+            shutdown_workers(drain=False, timeout=5)
+
+        self.assertEqual(self.results, ['running'])
+        self.assertEqual(get_worker_stats()['queue_depth'], {'process': 0, 'thread': 0})
+
+    def test_workers_that_outlive_shutdown_are_kept(self):
+        """Test that workers still busy after the timeout stay registered and are not duplicated."""
+        with mock.patch.object(processing_tasks, 'execute_operation', side_effect=self.execute):
+            start_workers(process_workers=1, thread_workers=1)
+
+            self.release.clear()
+            queue_task(self.task('slow'))
+            self.started.wait(5)
+            shutdown_workers(drain=True, timeout=0.1)
+
+            self.assertEqual([worker.name for worker in processing_tasks._worker_threads], ['task-thread-0'])
+            start_workers(process_workers=1, thread_workers=1)
+            self.assertEqual(len(processing_tasks._worker_threads), 1)
+
+            self.release.set()
+            shutdown_workers(drain=True, timeout=5)
+
+        self.assertEqual(self.results, ['slow'])
+        self.assertEqual(processing_tasks._worker_threads, [])
+        self.assertEqual(get_worker_stats()['workers'], {})
+
+    def test_process_pool_runs_real_operation(self):
+        """Test that a process-routed task runs in the pool and its result reaches the callback."""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        input_path = os.path.join(temp_dir, 'input.png')
+        output_path = os.path.join(temp_dir, 'output.jpg')
+        Image.new('RGB', (40, 20), (0, 120, 255)).save(input_path)
+
+        start_workers(process_workers=1, thread_workers=1)
+        queue_task({
+            'operation': 'convert_image',
+            'input_path': input_path,
+            'output_path': output_path,
+            'options': {'resize': (20, None)},
+            'callback': self.results.append,
+        })
+        shutdown_workers(drain=True, timeout=30)
+
+        self.assertEqual(self.results, [output_path])
+        with Image.open(output_path) as img:
+            self.assertEqual((img.format, img.size), ('JPEG', (20, 10)))
+        self.assertEqual(get_worker_stats()['operations']['convert_image']['completed'], 1)
@@ -0,0 +1,55 @@
+# tests/test_workspace.py
+import os
+import unittest
+import tempfile
+from flask import Flask
+from utils.workspace import Workspace, get_workspace_dir
+
+class TestWorkspace(unittest.TestCase):
+    """Test cases for per-request temporary workspaces."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+
+        @self.app.route('/download')
+        def download():
+            with Workspace(self.temp_dir) as workspace:
+                path = workspace.path_for('result.txt')
+                with open(path, 'w') as f:
+                    f.write('result')
+                return workspace.send_file(path, 'result.txt')
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def test_workspace_is_active_and_removed(self):
+        """Test that services see the workspace and it is removed on exit."""
+        with Workspace(self.temp_dir) as workspace:
+            self.assertEqual(get_workspace_dir('fallback'), workspace.path)
+            with open(workspace.path_for('../escape.txt'), 'w') as f:
+                f.write('data')
+
+        self.assertEqual(get_workspace_dir('fallback'), 'fallback')
+        self.assertFalse(os.path.exists(workspace.path))
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_workspaces_are_isolated(self):
+        """Test that concurrent workspaces never share a directory."""
+        with Workspace(self.temp_dir) as first, Workspace(self.temp_dir) as second:
+            self.assertNotEqual(first.path, second.path)
+            self.assertEqual(get_workspace_dir('fallback'), second.path)
+
+    def test_sent_workspace_is_removed_after_response(self):
+        """Test that a handed-off workspace lives until the response is closed."""
+        response = self.client.get('/download')
+        self.assertEqual(response.data, b'result')
+        self.assertEqual(len(os.listdir(self.temp_dir)), 1)
+
+        response.close()
+        self.assertEqual(os.listdir(self.temp_dir), [])
@@ -0,0 +1,63 @@
+# tests/test_zip_stream.py
+import io
+import os
+import unittest
+import tempfile
+import zipfile
+from utils.zip_stream import iter_zip_stream
+
+class TestZipStream(unittest.TestCase):
+    """Test cases for the streaming ZIP builder."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up after tests."""
+        import shutil
+        shutil.rmtree(self.temp_dir)
+
+    def _create_file(self, name, data):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_stream_is_valid_zip(self):
+        """Test that the streamed chunks form a readable archive."""
+        pdf_path = self._create_file('part.pdf', b'%PDF-1.4 ' * 1000)
+        txt_path = self._create_file('notes.txt', b'hello world\n' * 1000)
+
+        chunks = list(iter_zip_stream([('part.pdf', pdf_path), ('notes.txt', txt_path)]))
+        self.assertGreater(len(chunks), 1)
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zip_file:
+            self.assertEqual(zip_file.namelist(), ['part.pdf', 'notes.txt'])
+            self.assertEqual(zip_file.read('part.pdf'), b'%PDF-1.4 ' * 1000)
+            self.assertEqual(zip_file.read('notes.txt'), b'hello world\n' * 1000)
+
+            # Already-compressed formats are stored, text is deflated
+            self.assertEqual(zip_file.getinfo('part.pdf').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zip_file.getinfo('notes.txt').compress_type, zipfile.ZIP_DEFLATED)
+
+        # Entries are deleted once they have been added
+        self.assertFalse(os.path.exists(pdf_path))
+        self.assertFalse(os.path.exists(txt_path))
+
+    def test_entries_are_consumed_lazily(self):
+        """Test that each entry is produced only when the stream reaches it."""
+        produced = []
+
+        def entries():
+            for i in range(3):
+                produced.append(i)
+                yield f'part_{i}.txt', self._create_file(f'part_{i}.txt', b'x' * 10)
+
+        stream = iter_zip_stream(entries())
+        next(stream)
+        self.assertEqual(produced, [0])
+
+        data = b''.join(stream)
+        self.assertEqual(produced, [0, 1, 2])
+        self.assertTrue(data)
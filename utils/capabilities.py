@@ -0,0 +1,270 @@
+# utils/capabilities.py
+"""
+Process-wide registry of the external binaries the services rely on.
+
+Each tool (ffmpeg, ffprobe, tesseract) is located, versioned and asked for
+its capabilities once per process. The result is stored on disk, keyed on
+PATH and the binaries' modification times, so later processes can skip
+running the tools at all until something is installed or upgraded.
+
+Nothing is ever downloaded here at request time; to fetch a static FFmpeg
+build run:
+
+    python -m utils.capabilities --download-ffmpeg
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import platform
+import tempfile
+import threading
+import subprocess
+import config
+
+logger = logging.getLogger(__name__)
+
+# Tools and the arguments that print their version
+TOOLS = {
+    'ffmpeg': ['-version'],
+    'ffprobe': ['-version'],
+    'tesseract': ['--version'],
+}
+
+# Bump when the shape of the detected details changes
+REGISTRY_VERSION = 1
+
+def _run(command):
+    """Run a detection command and return its combined output ('' on failure)."""
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=30, check=False)
+        return result.stdout + result.stderr
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Could not run {command[0]}: {str(e)}")
+        return ''
+
+def _parse_ffmpeg_encoders(output):
+    """Return the names of the audio encoders listed by ffmpeg -encoders."""
+    encoders = []
+    # The list starts after a legend that ends with a "------" line
+    _, _, listing = output.partition('------')
+    for line in listing.splitlines():
+        parts = line.split()
+        # Lines look like " A....D aac    AAC (Advanced Audio Coding)"
+        if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] == 'A':
+            encoders.append(parts[1])
+    return encoders
+
+def _parse_tesseract_languages(output):
+    """Return the languages listed by tesseract --list-langs."""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    return [line for line in lines if not line.lower().startswith('list of available languages')]
+
+class CapabilityRegistry:
+    """Locate external tools and detect their versions and capabilities once."""
+
+    def __init__(self, cache_path=None, search_dirs=None):
+        """
+        Args:
+            cache_path (str, optional): JSON file the detected tools are persisted
+                                        in; None keeps them in memory only
+            search_dirs (list, optional): Directories searched after PATH, e.g.
+                                          where a downloaded FFmpeg lives
+        """
+        self.cache_path = cache_path
+        self.search_dirs = list(search_dirs or [])
+        self._tools = None
+        self._lock = threading.Lock()
+
+    def _locate(self, name):
+        """Find a tool on PATH or in the search directories, without running it."""
+        found = shutil.which(name)
+        if found:
+            return os.path.realpath(found)
+        executable = f"{name}.exe" if platform.system() == 'Windows' else name
+        for directory in self.search_dirs:
+            candidate = os.path.join(directory, executable)
+            if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                return os.path.realpath(candidate)
+        return None
+
+    def _fingerprint(self, paths):
+        """Key the detection on PATH, the search dirs and each binary's mtime."""
+        hasher = hashlib.sha256()
+        hasher.update(f"v{REGISTRY_VERSION}|{os.environ.get('PATH', '')}|{os.pathsep.join(self.search_dirs)}".encode('utf-8'))
+        for name in sorted(paths):
+            path = paths[name]
+            mtime = os.stat(path).st_mtime_ns if path else 0
+            hasher.update(f"|{name}={path}@{mtime}".encode('utf-8'))
+        return hasher.hexdigest()
+
+    def _detect(self, name, path):
+        """Run a tool to find its version and capabilities."""
+        output = _run([path] + TOOLS[name])
+        first_line = output.strip().splitlines()[0] if output.strip() else ''
+        details = {'path': path, 'version': first_line}
+
+        if name == 'ffmpeg':
+            details['audio_encoders'] = _parse_ffmpeg_encoders(_run([path, '-hide_banner', '-encoders']))
+        elif name == 'tesseract':
+            details['languages'] = _parse_tesseract_languages(_run([path, '--list-langs']))
+        return details
+
+    def _load_cache(self, fingerprint):
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get('fingerprint') == fingerprint:
+                return data['tools']
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _save_cache(self, fingerprint, tools):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            # Write atomically; other processes may be reading it
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'tools': tools}, f, indent=2)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not save tool capabilities to {self.cache_path}: {str(e)}")
+
+    def _load(self, force=False):
+        with self._lock:
+            if self._tools is not None and not force:
+                return self._tools
+
+            paths = {name: self._locate(name) for name in TOOLS}
+            fingerprint = self._fingerprint(paths)
+
+            tools = None if force else self._load_cache(fingerprint)
+            if tools is None:
+                tools = {name: self._detect(name, path) if path else None for name, path in paths.items()}
+                self._save_cache(fingerprint, tools)
+                logger.info(f"Detected tools: { {name: bool(details) for name, details in tools.items()} }")
+
+            self._tools = tools
+            return tools
+
+    def get(self, name):
+        """
+        Get what is known about a tool.
+
+        Args:
+            name (str): 'ffmpeg', 'ffprobe' or 'tesseract'
+
+        Returns:
+            dict: path, version and tool specific details, or None if not installed
+        """
+        return self._load().get(name)
+
+    def path(self, name):
+        """Return the absolute path of a tool, or None if it is not installed."""
+        details = self.get(name)
+        return details['path'] if details else None
+
+    def has(self, name):
+        return self.get(name) is not None
+
+    def refresh(self):
+        """Detect the tools again, e.g. after installing one."""
+        return self._load(force=True)
+
+    def as_dict(self):
+        return dict(self._load())
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    """Return the registry shared by the whole process."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = CapabilityRegistry(
+                cache_path=config.Config.CAPABILITY_CACHE_PATH,
+                search_dirs=[config.Config.FFMPEG_DIR]
+            )
+        return _registry
+
+def download_ffmpeg(target_dir):
+    """
+    Download a static FFmpeg build for the current platform.
+
+    Args:
+        target_dir (str): Directory the ffmpeg binary is placed in
+
+    Returns:
+        str: Path to the ffmpeg binary
+    """
+    import requests
+    import zipfile
+
+    system = platform.system()
+    os.makedirs(target_dir, exist_ok=True)
+
+    if system == 'Windows':
+        ffmpeg_url = "https://github.com/BtbN/FFmpeg-Builds/releases/download/latest/ffmpeg-master-latest-win64-gpl.zip"
+        binary_path = os.path.join(target_dir, 'ffmpeg.exe')
+    elif system == 'Darwin':  # macOS
+        ffmpeg_url = "https://evermeet.cx/ffmpeg/getrelease/ffmpeg/zip"
+        binary_path = os.path.join(target_dir, 'ffmpeg')
+    else:  # Linux
+        ffmpeg_url = "https://johnvansickle.com/ffmpeg/releases/ffmpeg-release-amd64-static.tar.xz"
+        binary_path = os.path.join(target_dir, 'ffmpeg')
+
+    # Download and extract FFmpeg
+    try:
+        logger.info(f"Downloading FFmpeg from {ffmpeg_url}")
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+            with requests.get(ffmpeg_url, stream=True) as r:
+                r.raise_for_status()
+                for chunk in r.iter_content(chunk_size=8192):
+                    tmp_file.write(chunk)
+
+            tmp_file_path = tmp_file.name
+
+        # Extract downloaded archive
+        extract_dir = tempfile.mkdtemp()
+
+        if system == 'Windows' or system == 'Darwin':
+            with zipfile.ZipFile(tmp_file_path, 'r') as zip_ref:
+                zip_ref.extractall(extract_dir)
+        else:  # Linux
+            import tarfile
+            with tarfile.open(tmp_file_path) as tar:
+                tar.extractall(extract_dir)
+
+        # Move the FFmpeg binaries (static builds include ffprobe too)
+        for root, _, files in os.walk(extract_dir):
+            for file in files:
+                if file in ('ffmpeg', 'ffmpeg.exe', 'ffprobe', 'ffprobe.exe'):
+                    target_path = os.path.join(target_dir, file)
+                    shutil.move(os.path.join(root, file), target_path)
+                    os.chmod(target_path, 0o755)  # Make executable
+
+        # Clean up
+        os.unlink(tmp_file_path)
+        shutil.rmtree(extract_dir)
+
+        logger.info(f"FFmpeg installed at {binary_path}")
+        return binary_path
+
+    except Exception as e:
+        logger.error(f"Error downloading FFmpeg: {str(e)}")
+        raise
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if '--download-ffmpeg' in sys.argv:
+        download_ffmpeg(config.Config.FFMPEG_DIR)
+    print(json.dumps(get_registry().refresh(), indent=2))
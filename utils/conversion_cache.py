@@ -0,0 +1,245 @@
+# utils/conversion_cache.py
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from flask import current_app
+from utils.file_utils import evict_lru_files, hash_file
+from utils.workspace import get_workspace_dir
+
+logger = logging.getLogger(__name__)
+
+# Version of each operation's output, part of its cache keys. Bump an
+# operation's version when its output changes so its stale entries stop
+# matching; the entries of other operations stay valid. Operations not
+# listed here are at version 1.
+CACHE_VERSIONS = {
+    'convert_audio': 1,
+    'convert_image': 1,
+    'convert_document': 1,
+    'images_to_pdf': 1,
+    'pdf_compress': 1,
+    'pdf_merge': 1,
+    'pdf_ocr': 1,
+    'pdf_rotate': 1,
+    'pdf_watermark': 1,
+}
+
+def normalize_options(options):
+    """Normalize an options dict into a stable JSON string."""
+    def _normalize(value):
+        if isinstance(value, dict):
+            return {str(k): _normalize(v) for k, v in value.items() if v is not None}
+        if isinstance(value, (list, tuple)):
+            return [_normalize(v) for v in value]
+        return value
+
+    return json.dumps(_normalize(options or {}), sort_keys=True, default=str)
+
+
+class ConversionCache:
+    """Disk-backed, size-bounded LRU cache of conversion results keyed on content."""
+
+    def __init__(self, cache_dir, max_size=1024 * 1024 * 1024, output_dir='temp', enabled=True):
+        """
+        Initialize the conversion cache.
+
+        Args:
+            cache_dir (str): Directory where cached results are stored
+            max_size (int): Maximum total size of cached results in bytes
+            output_dir (str): Directory where cache hits are materialized when
+                              the caller does not supply an output path and
+                              no request workspace is active
+            enabled (bool): When False every lookup is a miss and nothing is stored
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, input_paths, operation, options=None, output_format=''):
+        """
+        Build the cache key for a conversion.
+
+        Args:
+            input_paths (str or list): Path(s) to the input file(s)
+            operation (str): Operation name, e.g. 'convert_image'; its
+                             version in CACHE_VERSIONS is part of the key
+            options (dict, optional): Conversion options
+            output_format (str): Output file extension
+
+        Returns:
+            str: Hex digest identifying the conversion result
+        """
+        if isinstance(input_paths, str):
+            input_paths = [input_paths]
+
+        hasher = hashlib.sha256()
+        version = CACHE_VERSIONS.get(operation, 1)
+        hasher.update(f"{operation}/v{version}|{output_format.lower().lstrip('.')}|".encode('utf-8'))
+        hasher.update(normalize_options(options).encode('utf-8'))
+        for path in input_paths:
+            hasher.update(b'|')
+            hash_file(path, hasher)
+        return hasher.hexdigest()
+
+    def _entry_path(self, key, output_format):
+        return os.path.join(self.cache_dir, f"{key}.{output_format.lower().lstrip('.')}")
+
+    def get(self, key, output_format, output_path=None):
+        """
+        Materialize a cached result.
+
+        Args:
+            key (str): Cache key from make_key()
+            output_format (str): Output file extension
+            output_path (str, optional): Where to place the result
+
+        Returns:
+            str: Path to the result, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        entry_path = self._entry_path(key, output_format)
+        if not os.path.exists(entry_path):
+            return None
+
+        if output_path is None:
+            output_dir = get_workspace_dir(self.output_dir)
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = os.path.join(output_dir, f"cached_{uuid.uuid4()}.{output_format.lstrip('.')}")
+
+        try:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            try:
+                # A hard link is free; fall back to a copy across filesystems
+                os.link(entry_path, output_path)
+            except OSError:
+                shutil.copyfile(entry_path, output_path)
+            # Touch the entry so eviction sees it as recently used
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # Evicted between the existence check and the copy
+            return None
+
+        return output_path
+
+    def put(self, key, output_format, result_path):
+        """
+        Store a conversion result in the cache.
+
+        Args:
+            key (str): Cache key from make_key()
+            output_format (str): Output file extension
+            result_path (str): Path to the conversion result
+        """
+        if not self.enabled:
+            return
+
+        try:
+            if os.path.getsize(result_path) > self.max_size:
+                return
+
+            entry_path = self._entry_path(key, output_format)
+            tmp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(result_path, tmp_path)
+            os.replace(tmp_path, entry_path)
+            self.evict()
+        except Exception as e:
+            logger.warning(f"Error storing conversion result in cache: {str(e)}")
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_size."""
+        evict_lru_files(self.cache_dir, self.max_size)
+
+    def lookup(self, input_paths, operation, options, output_format, output_path=None):
+        """
+        Look up a conversion result and count the hit or miss.
+
+        Args:
+            input_paths (str or list): Path(s) to the input file(s)
+            operation (str): Operation name used in the cache key
+            options (dict): Conversion options used in the cache key
+            output_format (str): Output file extension
+            output_path (str, optional): Where a cache hit should be placed
+
+        Returns:
+            tuple: (key, cached_path); cached_path is None on a miss and key is
+                   None when the result should not be stored afterwards
+        """
+        if not self.enabled:
+            return None, None
+
+        try:
+            key = self.make_key(input_paths, operation, options, output_format)
+            cached_path = self.get(key, output_format, output_path)
+        except Exception as e:
+            logger.warning(f"Conversion cache lookup failed: {str(e)}")
+            return None, None
+
+        with self._lock:
+            if cached_path:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if cached_path:
+            logger.info(f"Conversion cache hit for {operation} ({key[:12]})")
+        return key, cached_path
+
+    def get_or_create(self, input_paths, operation, options, create, output_format, output_path=None):
+        """
+        Return a cached conversion result, running the conversion on a miss.
+
+        Args:
+            input_paths (str or list): Path(s) to the input file(s)
+            operation (str): Operation name used in the cache key
+            options (dict): Conversion options used in the cache key
+            create (callable): Runs the conversion and returns the result path
+            output_format (str): Output file extension
+            output_path (str, optional): Where a cache hit should be placed
+
+        Returns:
+            str: Path to the conversion result
+        """
+        key, cached_path = self.lookup(input_paths, operation, options, output_format, output_path)
+        if cached_path:
+            return cached_path
+
+        result_path = create() or output_path
+        if key:
+            self.put(key, output_format, result_path)
+        return result_path
+
+    def get_stats(self):
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_conversion_cache():
+    """Return the conversion cache configured for the current Flask app."""
+    cache_dir = current_app.config.get('CONVERSION_CACHE_DIR')
+    with _caches_lock:
+        if cache_dir not in _caches:
+            _caches[cache_dir] = ConversionCache(
+                cache_dir,
+                max_size=current_app.config.get('CONVERSION_CACHE_MAX_SIZE', 1024 * 1024 * 1024),
+                output_dir=current_app.config['TEMP_FOLDER'],
+                enabled=bool(cache_dir) and current_app.config.get('CONVERSION_CACHE_ENABLED', True)
+            )
+        return _caches[cache_dir]
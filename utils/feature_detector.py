@@ -1,6 +1,7 @@
 # utils/feature_detector.py
 import importlib
 import logging
+from utils.capabilities import get_registry
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +36,8 @@ class FeatureDetector:
         if FeatureDetector.check_package('fitz'):
             features['advanced'] = True
         
-        # Check for pytesseract (required for OCR)
-        if FeatureDetector.check_package('pytesseract'):
+        # Check for pytesseract and the Tesseract binary (required for OCR)
+        if FeatureDetector.check_package('pytesseract') and get_registry().has('tesseract'):
             features['ocr'] = True
         
         # Check for pdfkit/wkhtmltopdf (required for HTML to PDF)
@@ -102,8 +103,8 @@ class FeatureDetector:
         if FeatureDetector.check_package('pydub'):
             features['basic'] = True
         
-        # Check for ffmpeg-python (required for advanced audio processing)
-        if FeatureDetector.check_package('ffmpeg'):
+        # Check for the FFmpeg binary (required for advanced audio processing)
+        if get_registry().has('ffmpeg'):
             features['advanced'] = True
         
         return features
\ No newline at end of file
@@ -1,6 +1,9 @@
 # utils/file_utils.py
 import os
+import io
 import uuid
+import shutil
+import hashlib
 import logging
 import mimetypes
 import magic  # python-magic library for better MIME type detection
@@ -27,6 +30,25 @@ def allowed_file(filename, allowed_extensions):
     """Check if a file is allowed based on its extension."""
     return '.' in filename and get_file_extension(filename) in allowed_extensions
 
+def hash_file(file_path, hasher=None, chunk_size=1024 * 1024):
+    """
+    Hash the contents of a file without reading it into memory at once.
+    
+    Args:
+        file_path (str): Path to the file
+        hasher (hashlib object, optional): Hasher to update, otherwise a new SHA-256
+        chunk_size (int): Number of bytes read per chunk
+    
+    Returns:
+        hashlib object: The updated hasher
+    """
+    if hasher is None:
+        hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher
+
 def generate_unique_filename(original_filename):
     """Generate a unique filename while preserving the original extension."""
     ext = get_file_extension(original_filename)
@@ -111,6 +133,45 @@ def clean_temp_files(directory_path, exclude_files=None):
         logger.error(f"Error cleaning temporary files: {str(e)}")
         return 0
 
+def evict_lru_files(directory_path, max_size):
+    """
+    Remove the least recently used files of a directory until it fits in max_size.
+    
+    Files are ordered by modification time, so caches touch an entry when it
+    is used. Files ending in .tmp are being written and are left alone.
+    
+    Args:
+        directory_path (str): Path to the directory
+        max_size (int): Maximum total size of the files in bytes
+    
+    Returns:
+        int: Number of files deleted
+    """
+    entries = []
+    total_size = 0
+    for entry in os.scandir(directory_path):
+        if not entry.is_file() or entry.name.endswith('.tmp'):
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size += stat.st_size
+    
+    count = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+            count += 1
+        except FileNotFoundError:
+            pass
+        total_size -= size
+    return count
+
 def save_uploaded_file(file, directory, filename=None, allowed_extensions=None):
     """
     Save an uploaded file to the specified directory.
@@ -151,4 +212,112 @@ def save_uploaded_file(file, directory, filename=None, allowed_extensions=None):
         return file_path
     except Exception as e:
         logger.error(f"Error saving uploaded file: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+# Fallback MIME types for extensions the mimetypes module may not know
+DOWNLOAD_MIME_TYPES = {
+    'mp3': 'audio/mp3',
+    'ogg': 'audio/ogg',
+    'wav': 'audio/wav',
+    'flac': 'audio/flac',
+    'aac': 'audio/aac',
+    'm4a': 'audio/m4a',
+    'webp': 'image/webp',
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'txt': 'text/plain',
+    'md': 'text/markdown',
+    'html': 'text/html',
+    'zip': 'application/zip',
+}
+
+def get_download_mimetype(filename):
+    """
+    Get the MIME type to send for a download based on its filename.
+    
+    Args:
+        filename (str): Name of the file being downloaded
+    
+    Returns:
+        str: MIME type for the Content-Type header
+    """
+    mime_type = mimetypes.guess_type(filename)[0]
+    if mime_type:
+        return mime_type
+    return DOWNLOAD_MIME_TYPES.get(get_file_extension(filename), 'application/octet-stream')
+
+class TemporaryDownloadFile(io.FileIO):
+    """Read-only file handle that deletes the file (and related paths) when closed."""
+    
+    def __init__(self, file_path, cleanup_paths=None):
+        super().__init__(file_path, 'rb')
+        self.cleanup_paths = [file_path] + list(cleanup_paths or [])
+    
+    def close(self):
+        if self.closed:
+            return
+        try:
+            super().close()
+        finally:
+            for path in self.cleanup_paths:
+                try:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    elif os.path.exists(path):
+                        os.remove(path)
+                except Exception as e:
+                    logger.error(f"Error removing temporary file: {str(e)}")
+
+def send_download(file_path, download_name=None, mimetype=None, delete_after=True, cleanup_paths=None):
+    """
+    Stream a file from disk as an attachment.
+    
+    The file is handed to the WSGI server's file wrapper, so it is sent in chunks
+    (with sendfile where the server supports it) instead of being read into
+    memory. Range and If-None-Match requests are honoured, and temporary files
+    are deleted only once the server closes the response. The ETag is a weak
+    one built from the file's size, modification time and inode, so the file
+    is not read an extra time just to hash it.
+    
+    Args:
+        file_path (str): Path to the file to send
+        download_name (str, optional): Filename presented to the client
+        mimetype (str, optional): MIME type, otherwise derived from download_name
+        delete_after (bool): Delete the file after the response has been sent
+        cleanup_paths (list, optional): Additional files or directories to delete
+                                        after the response has been sent
+    
+    Returns:
+        flask.Response: Streaming response
+    """
+    from flask import current_app, request
+    from werkzeug.exceptions import RequestedRangeNotSatisfiable
+    from werkzeug.wsgi import wrap_file
+    
+    if download_name is None:
+        download_name = os.path.basename(file_path)
+    
+    stat = os.stat(file_path)
+    etag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}-{stat.st_ino:x}"
+    
+    if delete_after:
+        file = TemporaryDownloadFile(file_path, cleanup_paths)
+    else:
+        file = open(file_path, 'rb')
+    
+    response = current_app.response_class(
+        wrap_file(request.environ, file),
+        mimetype=mimetype or get_download_mimetype(download_name),
+        direct_passthrough=True
+    )
+    response.content_length = stat.st_size
+    response.last_modified = stat.st_mtime
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.cache_control.no_cache = True
+    response.set_etag(etag, weak=True)
+    
+    try:
+        return response.make_conditional(request.environ, accept_ranges=True, complete_length=stat.st_size)
+    except RequestedRangeNotSatisfiable:
+        file.close()
+        raise
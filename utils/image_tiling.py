@@ -0,0 +1,350 @@
+# utils/image_tiling.py
+import os
+import zlib
+import struct
+import logging
+from PIL import Image, ImageChops
+import config
+
+logger = logging.getLogger(__name__)
+
+# Rough number of strip-sized buffers alive at once while a strip is processed
+# (decoded source, mode conversion, resample/adjustment and output)
+STRIP_MEMORY_FACTOR = 4
+
+PNG_COLOR_TYPES = {'L': 0, 'RGB': 2, 'RGBA': 6}
+
+def bytes_per_pixel(mode):
+    """Return how many bytes Pillow uses per pixel in memory for a mode."""
+    if mode in ('1', 'L', 'P'):
+        return 1
+    if mode.startswith('I;16'):
+        return 2
+    # Multi-band images are stored as 4 bytes per pixel, even RGB
+    return 4
+
+def decoded_size(img):
+    """Return the memory needed to hold an opened (not yet loaded) image, in bytes."""
+    return img.width * img.height * bytes_per_pixel(img.mode)
+
+def check_pixel_count(img, max_pixels=None):
+    """
+    Reject images whose pixel count is above the configured limit.
+
+    Args:
+        img (PIL.Image): Opened image; only its header has been read
+        max_pixels (int, optional): Limit, defaults to IMAGE_MAX_PIXELS
+
+    Raises:
+        ValueError: If the image has too many pixels
+    """
+    max_pixels = max_pixels or config.Config.IMAGE_MAX_PIXELS
+    if img.width * img.height > max_pixels:
+        raise ValueError(
+            f"Image is too large ({img.width}x{img.height}, limit is {max_pixels} pixels)"
+        )
+
+def open_image(path, max_pixels=None):
+    """
+    Open an image, checking its pixel count against the configured limit.
+
+    Pillow's own limit (twice Image.MAX_IMAGE_PIXELS) still applies first and
+    is left as it is, so max_pixels can only lower it; images either limit
+    rejects raise ValueError.
+
+    Args:
+        path (str): Path to the image file
+        max_pixels (int, optional): Limit, defaults to IMAGE_MAX_PIXELS
+
+    Returns:
+        PIL.Image: Opened image; only its header has been read
+
+    Raises:
+        ValueError: If the image has too many pixels
+    """
+    max_pixels = max_pixels or config.Config.IMAGE_MAX_PIXELS
+    try:
+        img = Image.open(path)
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Image is too large ({e})") from None
+
+    try:
+        check_pixel_count(img, max_pixels)
+    except ValueError:
+        img.close()
+        raise
+    return img
+
+def check_memory(size, mode, memory_limit, what='Image'):
+    """
+    Reject an image buffer of the given size and mode that would not fit in memory_limit.
+
+    Args:
+        size (tuple): (width, height)
+        mode (str): Pillow mode of the buffer
+        memory_limit (int): Limit in bytes
+        what (str): Description of the buffer for the error message
+
+    Raises:
+        ValueError: If the buffer needs more than memory_limit
+    """
+    needed = size[0] * size[1] * bytes_per_pixel(mode)
+    if needed > memory_limit:
+        raise ValueError(
+            f"{what} is too large to hold in memory ({size[0]}x{size[1]} {mode} needs "
+            f"{needed // (1024 * 1024)}MB, limit is {memory_limit // (1024 * 1024)}MB)"
+        )
+
+def strip_height(width, mode, memory_limit):
+    """Return how many rows of an image can be processed at once within memory_limit."""
+    return max(1, memory_limit // (STRIP_MEMORY_FACTOR * width * bytes_per_pixel(mode)))
+
+def _raw_row_bytes(img, tile_width, rawmode, stride):
+    if stride:
+        return abs(stride)
+    # Packed size of one row in the tile's raw mode
+    return len(Image.new(img.mode, (tile_width, 1)).tobytes('raw', rawmode))
+
+def _slice_raw_tiles(img, top, bottom):
+    """Return the raw tiles of img restricted to rows [top, bottom), or None if not possible."""
+    tiles = []
+    for codec, extents, offset, args in img.tile:
+        if codec != 'raw':
+            return None
+
+        x0, y0, x1, y1 = extents
+        row_top, row_bottom = max(y0, top), min(y1, bottom)
+        if row_top >= row_bottom:
+            continue
+
+        args = args if isinstance(args, tuple) else (args,)
+        rawmode = args[0]
+        stride = args[1] if len(args) > 1 else 0
+        orientation = args[2] if len(args) > 2 else 1
+
+        try:
+            row_bytes = _raw_row_bytes(img, x1 - x0, rawmode, stride)
+        except (ValueError, KeyError):
+            return None
+
+        # Bottom-up tiles (e.g. BMP) store their last row first
+        if orientation < 0:
+            offset += (y1 - row_bottom) * row_bytes
+        else:
+            offset += (row_top - y0) * row_bytes
+
+        tiles.append((codec, (x0, row_top - top, x1, row_bottom - top), offset, (rawmode, stride, orientation)))
+    return tiles
+
+def supports_row_decoding(img):
+    """Check whether any range of rows of an opened image can be decoded on its own."""
+    return bool(img.tile) and _slice_raw_tiles(img, 0, 1) is not None
+
+class StripReader:
+    """
+    Read an image as horizontal strips.
+
+    Uncompressed sources (BMP, PPM, uncompressed TIFF) are decoded only for
+    the rows asked for, so memory stays proportional to the strip. Compressed
+    sources have to be decoded as a whole; they are decoded once and the
+    strips are cut from that, so they are rejected when the decoded image
+    (at the draft scale, for JPEG) would not fit in memory_limit.
+    """
+
+    def __init__(self, path, draft_size=None, memory_limit=None, max_pixels=None):
+        """
+        Args:
+            path (str): Path to the image file
+            draft_size (tuple, optional): Let JPEG sources decode at a reduced
+                                          scale no smaller than this; size then
+                                          reports the reduced size
+            memory_limit (int, optional): Largest whole decode allowed for
+                                          compressed sources, defaults to
+                                          IMAGE_MEMORY_LIMIT
+            max_pixels (int, optional): Pixel limit, defaults to IMAGE_MAX_PIXELS
+
+        Raises:
+            ValueError: If the image has too many pixels, or is compressed and
+                        too large to decode within memory_limit
+        """
+        self.path = path
+        self.draft_size = draft_size
+        self.max_pixels = max_pixels
+        memory_limit = memory_limit or config.Config.IMAGE_MEMORY_LIMIT
+        with open_image(path, max_pixels) as img:
+            if draft_size:
+                img.draft(None, draft_size)
+            self.size = img.size
+            self.mode = img.mode
+            self.has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+            self.row_decoding = supports_row_decoding(img)
+            if not self.row_decoding:
+                check_memory(img.size, img.mode, memory_limit, 'Compressed image')
+        self._image = None
+
+    def read(self, top, bottom):
+        """Return rows [top, bottom) as a loaded image."""
+        if self.row_decoding:
+            img = open_image(self.path, self.max_pixels)
+            img.tile = _slice_raw_tiles(img, top, bottom)
+            img._size = (self.size[0], bottom - top)
+            if hasattr(img, '_tile_size'):
+                # TIFF allocates its image memory from this instead of size
+                img._tile_size = img._size
+            img.load()
+            if img.im.size != img.size:
+                return img.crop((0, 0) + img.size)
+            return img
+
+        if self._image is None:
+            logger.info(f"{self.path} is compressed; decoding it whole before processing in strips")
+            self._image = open_image(self.path, self.max_pixels)
+            if self.draft_size:
+                self._image.draft(None, self.draft_size)
+            self._image.load()
+        return self._image.crop((0, top, self.size[0], bottom))
+
+    def close(self):
+        if self._image is not None:
+            self._image.close()
+            self._image = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+class PngStripWriter:
+    """Write a PNG incrementally, one strip of rows at a time."""
+
+    def __init__(self, path, size, mode, compress_level=6):
+        self.size = size
+        self.mode = mode
+        self._file = open(path, 'wb')
+        self._compressor = zlib.compressobj(compress_level)
+        self._previous_row = None
+
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', size[0], size[1], 8, PNG_COLOR_TYPES[mode], 0, 0, 0))
+
+    def _write_chunk(self, chunk_type, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+    def write(self, strip):
+        """Append a strip; it must have the writer's width and mode."""
+        width, height = strip.size
+
+        # "Up" filter: each row minus the row above it, which compresses far
+        # better than raw rows for photographic content
+        above = Image.new(self.mode, strip.size)
+        if self._previous_row is not None:
+            above.paste(self._previous_row, (0, 0))
+        above.paste(strip.crop((0, 0, width, height - 1)), (0, 1))
+        self._previous_row = strip.crop((0, height - 1, width, height))
+
+        data = ImageChops.subtract_modulo(strip, above).tobytes()
+        row_bytes = len(data) // height
+        filtered = b''.join(
+            b'\x02' + data[offset:offset + row_bytes] for offset in range(0, len(data), row_bytes)
+        )
+
+        compressed = self._compressor.compress(filtered)
+        if compressed:
+            self._write_chunk(b'IDAT', compressed)
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            self._write_chunk(b'IDAT', self._compressor.flush())
+            self._write_chunk(b'IEND', b'')
+        finally:
+            self._file.close()
+
+class CanvasStripWriter:
+    """Assemble strips into one image and save it with Pillow at the end."""
+
+    def __init__(self, path, size, mode, save_kwargs=None):
+        self.path = path
+        self.save_kwargs = save_kwargs or {}
+        self.canvas = Image.new(mode, size)
+        self._top = 0
+
+    def write(self, strip):
+        self.canvas.paste(strip, (0, self._top))
+        self._top += strip.height
+
+    def close(self):
+        if self.canvas is not None:
+            self.canvas.save(self.path, **self.save_kwargs)
+            self.canvas = None
+
+def open_strip_writer(path, size, mode, save_kwargs=None, memory_limit=None):
+    """
+    Open the most memory-friendly writer for an output file.
+
+    PNG is written incrementally. Other formats have no streaming encoder in
+    Pillow, so their strips are assembled on a single output-sized canvas,
+    which has to fit in memory_limit.
+
+    Args:
+        path (str): Output file path
+        size (tuple): Output size (width, height)
+        mode (str): Mode of the strips that will be written
+        save_kwargs (dict, optional): Arguments for Image.save
+        memory_limit (int, optional): Largest canvas allowed, defaults to
+                                      IMAGE_MEMORY_LIMIT
+
+    Returns:
+        PngStripWriter or CanvasStripWriter: Writer with write(strip) and close()
+
+    Raises:
+        ValueError: If the output needs a canvas larger than memory_limit
+    """
+    if path.lower().endswith('.png') and mode in PNG_COLOR_TYPES:
+        return PngStripWriter(path, size, mode)
+
+    check_memory(size, mode, memory_limit or config.Config.IMAGE_MEMORY_LIMIT,
+                 f"Output canvas for {os.path.basename(path)}")
+    return CanvasStripWriter(path, size, mode, save_kwargs)
+
+def open_converted(path, mode, memory_limit=None):
+    """
+    Open an image and convert it to another mode.
+
+    Images whose decoded size exceeds memory_limit are converted strip by
+    strip into the result, so no full-size copy in the original mode is
+    needed next to it (uncompressed sources are never decoded whole, and
+    compressed ones that would not fit are rejected). The result itself has
+    to fit in memory_limit.
+
+    Args:
+        path (str): Path to the image file
+        mode (str): Mode to convert to, e.g. 'RGB'
+        memory_limit (int, optional): Defaults to IMAGE_MEMORY_LIMIT
+
+    Returns:
+        PIL.Image: Loaded image in the requested mode
+
+    Raises:
+        ValueError: If the image or the result is too large, see StripReader
+    """
+    memory_limit = memory_limit or config.Config.IMAGE_MEMORY_LIMIT
+
+    with open_image(path) as img:
+        check_memory(img.size, mode, memory_limit)
+        if decoded_size(img) <= memory_limit:
+            return img.convert(mode)
+
+    with StripReader(path, memory_limit=memory_limit) as reader:
+        result = Image.new(mode, reader.size)
+        rows = strip_height(reader.size[0], reader.mode, memory_limit)
+        for top in range(0, reader.size[1], rows):
+            strip = reader.read(top, min(reader.size[1], top + rows))
+            result.paste(strip.convert(mode), (0, top))
+        return result
@@ -0,0 +1,164 @@
+# utils/media_probe.py
+import os
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AudioInfo:
+    """Metadata of an audio file; fields are None when the probe could not tell."""
+    duration: float = None  # Seconds
+    codec: str = None
+    sample_rate: int = None  # Hz
+    channels: int = None
+    bitrate: int = None  # kb/s, for the whole file
+    format_name: str = None
+    tags: dict = field(default_factory=dict)
+
+    @property
+    def has_audio(self):
+        """Whether the file has a decodable audio stream."""
+        return self.codec is not None
+
+    def to_dict(self):
+        """Return the known fields as a dict, in the shape get_audio_info has always returned."""
+        info = {name: getattr(self, name) for name in ('duration', 'bitrate', 'codec', 'sample_rate', 'channels')
+                if getattr(self, name) is not None}
+        if self.tags:
+            info['tags'] = dict(self.tags)
+        return info
+
+def _to_number(value, kind):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_ffprobe_output(output):
+    """
+    Parse the output of ffprobe -print_format json -show_streams -show_format.
+
+    Args:
+        output (str): JSON printed by ffprobe
+
+    Returns:
+        AudioInfo: Metadata of the first audio stream and the container
+    """
+    data = json.loads(output or '{}')
+    container = data.get('format', {})
+    stream = next((s for s in data.get('streams', []) if s.get('codec_type') == 'audio'), {})
+
+    # Container tags (title, artist, ...) take precedence over stream tags
+    tags = {key.lower(): value for key, value in stream.get('tags', {}).items()}
+    tags.update({key.lower(): value for key, value in container.get('tags', {}).items()})
+
+    bitrate = _to_number(container.get('bit_rate') or stream.get('bit_rate'), int)
+    return AudioInfo(
+        duration=_to_number(container.get('duration') or stream.get('duration'), float),
+        codec=stream.get('codec_name'),
+        sample_rate=_to_number(stream.get('sample_rate'), int),
+        channels=_to_number(stream.get('channels'), int),
+        bitrate=bitrate // 1000 if bitrate else None,
+        format_name=container.get('format_name'),
+        tags=tags,
+    )
+
+def parse_ffmpeg_output(output):
+    """
+    Parse the stream summary ffmpeg -i prints to stderr.
+
+    Used when ffprobe is not available; tags are not extracted.
+
+    Args:
+        output (str): stderr of ffmpeg -i
+
+    Returns:
+        AudioInfo: Metadata of the first audio stream
+    """
+    info = AudioInfo()
+
+    # Extract duration
+    duration_match = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', output)
+    if duration_match:
+        h, m, s = duration_match.groups()
+        info.duration = float(h) * 3600 + float(m) * 60 + float(s)
+
+    # Extract bitrate
+    bitrate_match = re.search(r'bitrate: (\d+) kb/s', output)
+    if bitrate_match:
+        info.bitrate = int(bitrate_match.group(1))
+
+    input_match = re.search(r'Input #0, ([\w,]+)', output)
+    if input_match:
+        info.format_name = input_match.group(1)
+
+    # Extract audio stream info
+    audio_match = re.search(r'Stream.*Audio: (.*)', output)
+    if audio_match:
+        audio_info = audio_match.group(1)
+
+        # Extract codec
+        codec_match = re.search(r'^(\w+)', audio_info)
+        if codec_match:
+            info.codec = codec_match.group(1)
+
+        # Extract sample rate
+        sample_rate_match = re.search(r'(\d+) Hz', audio_info)
+        if sample_rate_match:
+            info.sample_rate = int(sample_rate_match.group(1))
+
+        # Extract channels
+        channels_match = re.search(r'(mono|stereo|(\d+) channels)', audio_info)
+        if channels_match:
+            if channels_match.group(1) == 'mono':
+                info.channels = 1
+            elif channels_match.group(1) == 'stereo':
+                info.channels = 2
+            else:
+                info.channels = int(channels_match.group(2))
+
+    return info
+
+class ProbeCache:
+    """Thread-safe in-memory LRU of probe results keyed on (path, size, mtime)."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(path):
+        """Return the cache key of a file; it changes whenever the file is rewritten."""
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    def get(self, key):
+        """Return the cached result for key, or None."""
+        with self._lock:
+            info = self._entries.get(key)
+            if info is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return info
+
+    def put(self, key, info):
+        """Store a result, evicting the least recently used entries over the limit."""
+        with self._lock:
+            self._entries[key] = info
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,158 @@
+# utils/ocr_cache.py
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+import config
+from utils.file_utils import evict_lru_files
+
+logger = logging.getLogger(__name__)
+
+# Bump when the way pages are rendered or recognized, or entries stored, changes
+OCR_CACHE_VERSION = 2
+
+class OCRCache:
+    """Disk-backed, size-bounded LRU cache of per-page OCR results keyed on page content.
+
+    An entry holds the recognized words of a page with their boxes, from
+    which both the plain text and the PDF text layer are built, so a page
+    is recognized once whatever the output format.
+    """
+
+    def __init__(self, cache_dir, max_size=256 * 1024 * 1024, enabled=True):
+        """
+        Initialize the OCR cache.
+
+        Entries are plain files, so pool workers can read and store pages
+        concurrently; hits and misses are counted by the process that owns
+        the cache object.
+
+        Args:
+            cache_dir (str): Directory where recognized pages are stored
+            max_size (int): Maximum total size of cached pages in bytes
+            enabled (bool): When False every lookup is a miss and nothing is stored
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, image_data, language, dpi):
+        """
+        Build the cache key for a rendered page.
+
+        The rendered pixels identify the page: the same scan in another
+        document, or an unchanged page of an edited document, gets the same
+        key. The PNM header carries the size and colorspace.
+
+        Args:
+            image_data (bytes): Page rendered by _render_page
+            language (str): OCR language code
+            dpi (int): Render resolution
+
+        Returns:
+            str: Hex digest identifying the OCR result
+        """
+        hasher = hashlib.sha256()
+        hasher.update(f"v{OCR_CACHE_VERSION}|{language}|{dpi}|".encode('utf-8'))
+        hasher.update(image_data)
+        return hasher.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        Read a cached page.
+
+        Args:
+            key (str): Cache key from make_key()
+
+        Returns:
+            dict: Recognized page as stored by put(), or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'rb') as f:
+                page = json.loads(f.read())
+            # Touch the entry so eviction sees it as recently used
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable OCR cache entry {entry_path}: {str(e)}")
+            return None
+        return page
+
+    def put(self, key, page):
+        """
+        Store a recognized page.
+
+        Eviction is left to evict(), which callers run once per document
+        rather than once per page.
+
+        Args:
+            key (str): Cache key from make_key()
+            page (dict): Recognized page: 'width' and 'height' of the image
+                         and its 'words', see ocr_service._recognize
+        """
+        if not self.enabled:
+            return
+
+        data = json.dumps(page, separators=(',', ':')).encode('utf-8')
+        if len(data) > self.max_size:
+            return
+
+        try:
+            entry_path = self._entry_path(key)
+            tmp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, entry_path)
+        except Exception as e:
+            logger.warning(f"Error storing OCR result in cache: {str(e)}")
+
+    def evict(self):
+        """Remove least recently used pages until the cache fits in max_size."""
+        if not self.enabled:
+            return
+        evict_lru_files(self.cache_dir, self.max_size)
+
+    def record(self, hits, misses):
+        """Add lookups made on behalf of this cache, e.g. by pool workers."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get_stats(self):
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_ocr_cache():
+    """Return the OCR cache configured in config.Config."""
+    cache_dir = config.Config.OCR_CACHE_DIR
+    with _caches_lock:
+        if cache_dir not in _caches:
+            _caches[cache_dir] = OCRCache(
+                cache_dir,
+                max_size=config.Config.OCR_CACHE_MAX_SIZE,
+                enabled=bool(cache_dir) and config.Config.OCR_CACHE_ENABLED
+            )
+        return _caches[cache_dir]
@@ -0,0 +1,119 @@
+# utils/workspace.py
+import os
+import uuid
+import shutil
+import logging
+import tempfile
+import contextvars
+from werkzeug.utils import secure_filename
+from utils.file_utils import generate_unique_filename, send_download
+from utils.zip_stream import send_zip_stream
+
+logger = logging.getLogger(__name__)
+
+# Workspace of the request being handled in the current thread/context
+_current_workspace = contextvars.ContextVar('current_workspace', default=None)
+
+def get_workspace_dir(default):
+    """
+    Return the directory of the active workspace.
+
+    Services call this instead of writing straight into their shared temp_dir,
+    so concurrent requests never share intermediate or output files.
+
+    Args:
+        default (str): Directory to use outside of a workspace
+
+    Returns:
+        str: Directory for temporary files
+    """
+    workspace = _current_workspace.get()
+    return workspace.path if workspace is not None else default
+
+class Workspace:
+    """Isolated temporary directory for a single request."""
+
+    def __init__(self, root):
+        """
+        Create a uniquely named workspace directory.
+
+        Args:
+            root (str): Directory the workspace is created in (e.g. TEMP_FOLDER
+                        or a tmpfs mount such as /dev/shm)
+        """
+        os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix='ws_', dir=root)
+        self._token = None
+        self._handed_off = False
+
+    def __enter__(self):
+        self._token = _current_workspace.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current_workspace.reset(self._token)
+        if not self._handed_off:
+            self.cleanup()
+        return False
+
+    def path_for(self, filename):
+        """Return a path inside the workspace for the given filename."""
+        return os.path.join(self.path, secure_filename(filename) or str(uuid.uuid4()))
+
+    def make_dir(self, name):
+        """Create a subdirectory inside the workspace and return its path."""
+        path = self.path_for(name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def save_upload(self, file, filename=None):
+        """
+        Save an uploaded file into the workspace.
+
+        Args:
+            file: Flask FileStorage object
+            filename (str, optional): Name to save under, otherwise a unique name
+                                      with the original extension
+
+        Returns:
+            str: Path to the saved file
+        """
+        file_path = self.path_for(filename or generate_unique_filename(file.filename))
+        file.save(file_path)
+        return file_path
+
+    def send_file(self, file_path, download_name=None):
+        """Stream a file and remove the whole workspace once it has been sent."""
+        response = send_download(file_path, download_name, cleanup_paths=[self.path])
+        self._handed_off = True
+        return response
+
+    def send_zip(self, entries, download_name):
+        """Stream entries as a ZIP and remove the whole workspace once it has been sent."""
+        response = send_zip_stream(entries, download_name, cleanup_paths=[self.path])
+        self._handed_off = True
+        return response
+
+    def cleanup(self):
+        """Remove the workspace directory and everything in it."""
+        try:
+            shutil.rmtree(self.path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error removing workspace {self.path}: {str(e)}")
+
+def request_workspace():
+    """
+    Create a workspace for the current request.
+
+    Workspaces live under WORKSPACE_ROOT when configured (for example a tmpfs
+    mount), otherwise under TEMP_FOLDER.
+
+    Returns:
+        Workspace: Context manager for the request's temporary files
+    """
+    from flask import current_app
+
+    root = current_app.config.get('WORKSPACE_ROOT') or current_app.config['TEMP_FOLDER']
+    return Workspace(root)
@@ -0,0 +1,129 @@
+# utils/zip_stream.py
+import os
+import io
+import time
+import shutil
+import logging
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+# Formats that are already compressed; deflating them again only costs CPU
+STORED_EXTENSIONS = {
+    'pdf', 'jpg', 'jpeg', 'png', 'gif', 'webp', 'tiff',
+    'mp3', 'ogg', 'm4a', 'aac', 'flac', 'zip', 'docx'
+}
+
+CHUNK_SIZE = 64 * 1024
+
+class _ChunkBuffer(io.RawIOBase):
+    """Unseekable write target that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        """Return and clear everything written since the last drain."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _compress_type_for(arcname):
+    extension = os.path.splitext(arcname)[1][1:].lower()
+    return zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+def _remove_path(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+    except Exception as e:
+        logger.error(f"Error removing temporary file: {str(e)}")
+
+def iter_zip_stream(entries, delete_entries=True):
+    """
+    Build a ZIP archive incrementally and yield it as byte chunks.
+
+    Entries are consumed lazily, so when ``entries`` is a generator each part
+    is added (and deleted) as soon as it has been produced, and the archive is
+    never written to disk or held in memory as a whole. Already-compressed
+    formats are stored, everything else is deflated.
+
+    Args:
+        entries (iterable): (arcname, file_path) pairs
+        delete_entries (bool): Delete each file once it has been added
+
+    Yields:
+        bytes: Chunks of the ZIP archive
+    """
+    buffer = _ChunkBuffer()
+    try:
+        with zipfile.ZipFile(buffer, 'w') as zip_file:
+            for arcname, file_path in entries:
+                zip_info = zipfile.ZipInfo(arcname, date_time=time.localtime(os.path.getmtime(file_path))[:6])
+                zip_info.compress_type = _compress_type_for(arcname)
+                zip_info.file_size = os.path.getsize(file_path)
+
+                with open(file_path, 'rb') as source, zip_file.open(zip_info, 'w') as dest:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                        dest.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+
+                if delete_entries:
+                    _remove_path(file_path)
+
+                data = buffer.drain()
+                if data:
+                    yield data
+
+        # Central directory
+        data = buffer.drain()
+        if data:
+            yield data
+    except GeneratorExit:
+        logger.warning("ZIP stream closed before completion")
+        raise
+    except Exception as e:
+        logger.error(f"Error building ZIP stream: {str(e)}")
+        raise
+
+def send_zip_stream(entries, download_name, delete_entries=True, cleanup_paths=None):
+    """
+    Create a response that streams a ZIP archive as it is built.
+
+    Args:
+        entries (iterable): (arcname, file_path) pairs
+        download_name (str): Filename presented to the client
+        delete_entries (bool): Delete each file once it has been added
+        cleanup_paths (list, optional): Files or directories to delete afterwards
+
+    Returns:
+        flask.Response: Streaming response
+    """
+    from flask import current_app
+
+    response = current_app.response_class(
+        iter_zip_stream(entries, delete_entries),
+        mimetype='application/zip'
+    )
+    response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.cache_control.no_cache = True
+
+    # Runs once the server closes the response, even if the stream never started
+    if cleanup_paths:
+        @response.call_on_close
+        def cleanup():
+            for path in cleanup_paths:
+                _remove_path(path)
+
+    return response